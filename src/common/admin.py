@@ -1,26 +1,105 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import Count
 
-from events.models import Candidacy
+from events.core import Role
+from events.models import CandidacyCandidate
 from tasks.models import Task
-from common.models import User
+from common.models import Job, User
 
 
-class CandidacyInLine(admin.TabularInline):
-    model = Candidacy.candidates.through
+class PaginatedTabularInline(admin.TabularInline):
+    """
+    Read-only inline listing one page of `per_page` related objects, chosen with the `<prefix>-page` GET parameter.
+    Rows are edited or added from their own admin pages (`show_change_link`), so that no row renders a choice widget.
+    """
+    template = 'admin/edit_inline/paginated_tabular.html'
+    per_page = 20
+    extra = 0
+    can_delete = False
+    show_change_link = True
+
+    def get_readonly_fields(self, request, obj=None):
+        return self.fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset_class = super().get_formset(request, obj, **kwargs)
+        per_page = self.per_page
+
+        class PaginatedFormSet(formset_class):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.page = Paginator(self.queryset, per_page).get_page(request.GET.get(f'{self.prefix}-page'))
+                self.queryset = self.page.object_list
+
+        return PaginatedFormSet
+
+
+@admin.display(description='roles')
+def role_names(candidacy_candidate: CandidacyCandidate) -> str:
+    return ', '.join(role for role, wished in Role.wishes(candidacy_candidate.roles).items() if wished)
+
+
+class CandidacyInLine(PaginatedTabularInline):
+    model = CandidacyCandidate
+    fk_name = 'candidate'
     verbose_name = 'candidacy'
     verbose_name_plural = 'candidacies'
-    extra = 0
+    fields = ('event', role_names, 'created_at')
+    ordering = ('-created_at',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('event', 'candidate')
 
 
-class TaskInLine(admin.TabularInline):
+class TaskInLine(PaginatedTabularInline):
     model = Task.contributers.through
     verbose_name = 'task'
-    extra = 0
+    fields = ('task',)
+    ordering = ('-task__created_at',)
+    show_change_link = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('task')
 
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
+    list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'nb_candidacies', 'nb_tasks')
+    search_fields = ('username', 'first_name', 'last_name', 'email')
+    ordering = ('username',)
     inlines = [
         CandidacyInLine,
         TaskInLine,
     ]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            nb_candidacies=Count('detailed_candidacies', distinct=True),
+            nb_tasks=Count('tasks', distinct=True),
+        )
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if db_field.name == 'user_permissions':
+            # Permissions are labelled with their content type.
+            kwargs['queryset'] = db_field.remote_field.model.objects.select_related('content_type')
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
+    @admin.display(description='candidacies', ordering='nb_candidacies')
+    def nb_candidacies(self, user: User) -> int:
+        return user.nb_candidacies
+
+    @admin.display(description='tasks', ordering='nb_tasks')
+    def nb_tasks(self, user: User) -> int:
+        return user.nb_tasks
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at')
+    list_filter = ('status', 'name')
+    ordering = ('run_after',)
+    readonly_fields = ('locked_by', 'locked_at', 'last_error')
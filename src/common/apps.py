@@ -1,5 +1,21 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save
 
 
 class CommonConfig(AppConfig):
     name = 'common'
+
+    def ready(self):
+        from .db import apply_sqlite_pragmas
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='common.apply_sqlite_pragmas')
+
+        from .middleware import install_query_recorder
+        connection_created.connect(install_query_recorder, dispatch_uid='common.install_query_recorder')
+
+        from .auth import cache_logged_in_user, invalidate_cached_user
+        User = self.get_model('User')
+        user_logged_in.connect(cache_logged_in_user, dispatch_uid='common.cache_logged_in_user')
+        post_save.connect(invalidate_cached_user, sender=User, dispatch_uid='common.invalidate_cached_user_on_save')
+        post_delete.connect(invalidate_cached_user, sender=User, dispatch_uid='common.invalidate_cached_user_on_delete')
@@ -0,0 +1,36 @@
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+
+USER_CACHE_TIMEOUT = 60 * 60
+
+
+def user_cache_key(user_pk) -> str:
+    return f'common:user:{user_pk}'
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend loading the user of a session from the cache, so that authenticated requests skip the user query.
+    Cached users are invalidated whenever they are saved or deleted, see `invalidate_cached_user`.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, timeout=USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+
+def cache_logged_in_user(sender, request, user, **kwargs) -> None:
+    # Runs after update_last_login, the first request of the session finds the user in the cache.
+    cache.set(user_cache_key(user.pk), user, timeout=USER_CACHE_TIMEOUT)
+
+
+def invalidate_cached_user(sender, instance, **kwargs) -> None:
+    # On commit, so that a concurrent request cannot cache the user again as it was before the transaction.
+    key = user_cache_key(instance.pk)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,90 @@
+from datetime import datetime
+from hashlib import sha256
+
+from attrs import frozen
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db import connection
+from django.db.models import Model
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+
+
+@frozen
+class Freshness:
+    etag: str
+
+
+def probe_tables(models: tuple[type[Model], ...]) -> list[tuple[datetime | None, int]]:
+    """
+    Greatest `updated_at` and row count of each of the `models` tables, read with a single aggregate query.
+    The counts catch deletions, which leave the greatest `updated_at` untouched.
+    """
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(
+            f'SELECT MAX({quote_name("updated_at")}), COUNT(*) FROM {quote_name(model._meta.db_table)}' for model in models
+        ))
+        rows = cursor.fetchall()
+    return [(to_aware_datetime(last_updated_at), count) for last_updated_at, count in rows]
+
+
+def to_aware_datetime(value) -> datetime | None:
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.utc)
+    return value
+
+
+def probe_freshness(request, models: tuple[type[Model], ...], extra_key: str = '') -> Freshness:
+    """
+    Validators of a page rendered for `request.user` from the rows of `models`.
+
+    The ETag covers the tables probe, the user as displayed in the header, the CSRF cookie the page forms embed,
+    the flash messages, and `extra_key` for anything else the page depends on.
+    There is no Last-Modified: no date moves when rows are deleted, or when anything but the tables changes.
+    """
+    tables = probe_tables(models)
+    user = request.user
+    user_key = f'{user.pk}:{user.username}:{user.is_staff}' if user.is_authenticated else ''
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    # Read here, they are shown by this response whether it is a 304 or not.
+    flash_messages = [str(message) for message in get_messages(request)]
+    fingerprint = f'{tables}:{user_key}:{csrf_cookie}:{flash_messages}:{extra_key}'
+    return Freshness(etag=f'"{sha256(fingerprint.encode()).hexdigest()[:32]}"')
+
+
+def get_not_modified_response(request, freshness: Freshness):
+    """
+    304 response when the request validators match `freshness`, None when the page must be rendered.
+    """
+    response = get_conditional_response(request, etag=freshness.etag)
+    if response is not None:
+        add_freshness_headers(response, freshness)
+    return response
+
+
+def add_freshness_headers(response, freshness: Freshness) -> None:
+    response['ETag'] = freshness.etag
+    # Pages are per user, and browsers must revalidate them instead of showing a stale copy.
+    patch_cache_control(response, private=True, no_cache=True)
+
+
+class ConditionalGetMixin:
+    """
+    View mixin answering GET requests with a 304, without rendering, while the rows of `freshness_models` are unchanged.
+    """
+    freshness_models: tuple[type[Model], ...] = ()
+
+    def get_freshness(self) -> Freshness:
+        return probe_freshness(self.request, self.freshness_models)
+
+    def get(self, request, *args, **kwargs):
+        freshness = self.get_freshness()
+        response = get_not_modified_response(request, freshness)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            add_freshness_headers(response, freshness)
+        return response
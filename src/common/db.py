@@ -0,0 +1,13 @@
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs) -> None:
+    """
+    connection_created receiver applying settings.SQLITE_PRAGMAS to every new SQLite connection.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRODUCTION_PROFILE:
+        return
+
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
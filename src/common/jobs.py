@@ -0,0 +1,158 @@
+"""
+Database-backed job queue.
+
+Jobs are rows of the `job` table, named after a handler registered with `job_handler`. Workers (`manage.py run_worker`)
+claim the due jobs by batches with a single UPDATE, so that two workers never claim the same job, and hand each handler
+the payloads of all its claimed jobs at once, e.g. to send many emails through one SMTP connection.
+
+A failed batch is retried with an exponential backoff until its jobs reach their `max_attempts`, then marked as failed.
+A handler which handled some of the payloads before failing raises `PartialBatchFailure`, so that only the others are retried.
+A job left running by a crashed worker is claimed again once its lock is older than `LOCK_TIMEOUT`, and the worker
+which held the lock leaves it alone afterwards. Handlers must still cope with payloads they already partly handled.
+"""
+import logging
+import traceback
+from collections import defaultdict
+from datetime import timedelta
+from typing import Callable
+from uuid import uuid4
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('ludigestion.jobs')
+
+JOB_HANDLERS: dict[str, Callable[[list[dict]], None]] = {}
+JOBS_BATCH_SIZE = 50
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=6)
+LOCK_TIMEOUT = timedelta(minutes=15)
+
+
+class UnknownJob(ValueError):
+    pass
+
+
+class PartialBatchFailure(Exception):
+    """
+    Raised by a handler which failed on some payloads of its batch, with the error of each of them by index.
+    The jobs of the other payloads are done.
+    """
+
+    def __init__(self, errors: dict[int, str]):
+        super().__init__(f'{len(errors)} payloads failed')
+        self.errors = errors
+
+
+def job_handler(name: str):
+    """
+    Register the decorated function as the handler of the jobs called `name`.
+    It is called with the list of the payloads of a batch of those jobs.
+    """
+    def register(handler: Callable[[list[dict]], None]):
+        if name in JOB_HANDLERS:
+            raise ValueError(f'A handler is already registered for the {name} jobs')
+        JOB_HANDLERS[name] = handler
+        return handler
+    return register
+
+
+def enqueue(name: str, payload: dict, delay: timedelta = timedelta(0), max_attempts: int | None = None) -> Job:
+    if name not in JOB_HANDLERS:
+        raise UnknownJob(f'No handler is registered for the {name} jobs')
+    job = Job(name=name, payload=payload, run_after=timezone.now() + delay)
+    if max_attempts is not None:
+        job.max_attempts = max_attempts
+    job.save()
+    return job
+
+
+def enqueue_many(name: str, payloads: list[dict]) -> list[Job]:
+    """
+    Enqueue one job per payload with a single INSERT.
+    """
+    if name not in JOB_HANDLERS:
+        raise UnknownJob(f'No handler is registered for the {name} jobs')
+    return Job.objects.bulk_create([Job(name=name, payload=payload) for payload in payloads])
+
+
+def enqueue_on_commit(name: str, payload: dict, **kwargs) -> None:
+    """
+    Enqueue the job once the current transaction commits, and not at all if it rolls back.
+    """
+    transaction.on_commit(lambda: enqueue(name, payload, **kwargs))
+
+
+def enqueue_many_on_commit(name: str, payloads: list[dict]) -> None:
+    transaction.on_commit(lambda: enqueue_many(name, payloads))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def claim_jobs(batch_size: int = JOBS_BATCH_SIZE) -> list[Job]:
+    """
+    Lock up to `batch_size` due jobs for the caller, oldest first.
+    """
+    now = timezone.now()
+    claimable = Q(status=Job.Status.PENDING, run_after__lte=now) | Q(status=Job.Status.RUNNING, locked_at__lt=now - LOCK_TIMEOUT)
+    token = uuid4().hex
+    # A single statement: SQLite runs the subquery and the update under the same write lock.
+    nb_claimed = Job.objects.filter(
+        pk__in=Job.objects.filter(claimable).order_by('run_after').values('pk')[:batch_size],
+    ).update(status=Job.Status.RUNNING, locked_by=token, locked_at=now, attempts=F('attempts') + 1)
+    return list(Job.objects.filter(locked_by=token).order_by('run_after')) if nb_claimed else []
+
+
+def run_jobs(jobs: list[Job]) -> None:
+    """
+    Run the claimed `jobs`, one handler call per job name, then delete the succeeded jobs and reschedule the failed ones.
+    Jobs claimed again by another worker since, once their lock expired, are left to it.
+    """
+    jobs_by_name = defaultdict(list)
+    for job in jobs:
+        jobs_by_name[job.name].append(job)
+
+    for name, named_jobs in jobs_by_name.items():
+        errors = {}
+        try:
+            handler = JOB_HANDLERS.get(name)
+            if handler is None:
+                raise UnknownJob(f'No handler is registered for the {name} jobs')
+            handler([job.payload for job in named_jobs])
+        except PartialBatchFailure as failure:
+            logger.error('%d of %d %s jobs failed', len(failure.errors), len(named_jobs), name)
+            errors = failure.errors
+        except Exception:
+            logger.exception('%d %s jobs failed', len(named_jobs), name)
+            error = traceback.format_exc()
+            errors = {index: error for index in range(len(named_jobs))}
+
+        succeeded_jobs = [job for index, job in enumerate(named_jobs) if index not in errors]
+        Job.objects.filter(pk__in=[job.pk for job in succeeded_jobs], locked_by=named_jobs[0].locked_by).delete()
+        for index, error in errors.items():
+            reschedule_failed_job(named_jobs[index], error)
+
+
+def reschedule_failed_job(job: Job, error: str) -> None:
+    now = timezone.now()
+    if job.attempts >= job.max_attempts:
+        status, run_after = Job.Status.FAILED, job.run_after
+    else:
+        status, run_after = Job.Status.PENDING, now + retry_delay(job.attempts)
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=status, run_after=run_after, last_error=error, locked_by='', locked_at=None, updated_at=now,
+    )
+
+
+def run_due_jobs(batch_size: int = JOBS_BATCH_SIZE) -> int:
+    """
+    Claim and run one batch of due jobs, return the number of jobs run.
+    """
+    jobs = claim_jobs(batch_size)
+    run_jobs(jobs)
+    return len(jobs)
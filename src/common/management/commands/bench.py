@@ -0,0 +1,140 @@
+import json
+from math import ceil
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+from django.utils import timezone
+
+from common.models import User
+from events import urls as events_urls
+from events.models import Event, CandidacyCandidate
+from tasks import urls as tasks_urls
+
+BENCHED_URLCONFS = (events_urls, tasks_urls)
+POST_DATA_BY_URL_NAME = {
+    'events:register-member': {'player': 'on'},
+    'events:unregister-candidacy': {},
+}
+# Words of the names generated by seed_load.
+GET_DATA_BY_URL_NAME = {
+    'events:search-events': {'q': 'match'},
+    'tasks:search-tasks': {'q': 'tache'},
+}
+
+
+def percentile(values: list[float], rank: int) -> float:
+    sorted_values = sorted(values)
+    return sorted_values[max(ceil(rank / 100 * len(sorted_values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time every URL of the events and tasks apps with the test client and report p50/p95 latencies and SQL query counts. '
+        'Every request runs in a rolled back transaction, so that runs stay comparable between commits.'
+    )
+    columns = ('url', 'method', 'status', 'p50_ms', 'p95_ms', 'queries')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--username', help='User to log in as, defaults to a candidate of the next event with seats left')
+        parser.add_argument('--cold-cache', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--json', action='store_true', help='Output the results as JSON')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('At least one iteration is required')
+
+        user, url_kwargs = self.get_bench_samples(options['username'])
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        client.force_login(user)
+
+        results = [
+            self.bench_url(client, url_name, kwargs, options)
+            for url_name, kwargs in self.get_url_names_and_kwargs(url_kwargs)
+        ]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=4))
+        else:
+            self.write_table(results)
+
+    def get_bench_samples(self, username: str | None) -> tuple[User, dict]:
+        event = Event.objects.filter(
+            date_and_time__gte=timezone.now(),
+            seats_taken__lt=F('max_participants'),
+            candidacies__isnull=False,
+        ).order_by('date_and_time').first()
+        if event is None:
+            raise CommandError('No upcoming event with candidacies and seats left, run seed_load first')
+
+        candidacy_candidates = CandidacyCandidate.objects.filter(event=event).select_related('candidate')
+        if username:
+            candidacy_candidates = candidacy_candidates.filter(candidate__username=username)
+        candidacy_candidate = candidacy_candidates.first()
+        if candidacy_candidate is None:
+            raise CommandError(f'{username} has no candidacy on {event}')
+
+        return candidacy_candidate.candidate, {
+            'event_uuid': event.pk,
+            'candidacy_uuid': candidacy_candidate.candidacy_id,
+            'calendar_token': candidacy_candidate.candidate.calendar_token,
+        }
+
+    def get_url_names_and_kwargs(self, url_kwargs: dict):
+        for urlconf in BENCHED_URLCONFS:
+            yield from self.iter_url_patterns(urlconf.urlpatterns, urlconf.app_name, url_kwargs)
+
+    def iter_url_patterns(self, url_patterns, namespace: str, url_kwargs: dict):
+        for pattern in url_patterns:
+            if isinstance(pattern, URLResolver):
+                yield from self.iter_url_patterns(pattern.url_patterns, f'{namespace}:{pattern.namespace}', url_kwargs)
+            else:
+                kwargs = {name: url_kwargs[name] for name in pattern.pattern.converters}
+                yield f'{namespace}:{pattern.name}', kwargs
+
+    def bench_url(self, client: Client, url_name: str, kwargs: dict, options: dict) -> dict:
+        path = reverse(url_name, kwargs=kwargs)
+        is_post = url_name in POST_DATA_BY_URL_NAME
+        timings, query_counts = [], []
+
+        for iteration in range(options['warmup'] + options['iterations']):
+            if options['cold_cache']:
+                cache.clear()
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    start = perf_counter()
+                    if is_post:
+                        response = client.post(path, POST_DATA_BY_URL_NAME[url_name])
+                    else:
+                        response = client.get(path, GET_DATA_BY_URL_NAME.get(url_name))
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    elapsed = perf_counter() - start
+                transaction.set_rollback(True)
+
+            if iteration >= options['warmup']:
+                timings.append(elapsed * 1000)
+                query_counts.append(len(queries))
+
+        return {
+            'url': url_name,
+            'method': 'POST' if is_post else 'GET',
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'queries': max(query_counts),
+        }
+
+    def write_table(self, results: list[dict]) -> None:
+        widths = {column: max(len(column), *(len(str(result[column])) for result in results)) for column in self.columns}
+        self.stdout.write('  '.join(column.ljust(widths[column]) for column in self.columns))
+        for result in results:
+            self.stdout.write('  '.join(str(result[column]).ljust(widths[column]) for column in self.columns))
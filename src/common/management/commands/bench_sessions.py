@@ -0,0 +1,45 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.test import Client, override_settings
+
+from .bench import Command as BenchCommand
+
+BENCHED_URL_NAME = 'events:all-events'
+# How every request read its session and user before the cache tier.
+UNCACHED_SETTINGS = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+}
+
+
+class Command(BenchCommand):
+    help = (
+        'Time the events page with database sessions and uncached users, then with the configured cached ones, '
+        'and report p50/p95 latencies and SQL query counts of both.'
+    )
+    columns = ('configuration', 'url', 'status', 'p50_ms', 'p95_ms', 'queries')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('At least one iteration is required')
+
+        user, url_kwargs = self.get_bench_samples(options['username'])
+        kwargs = dict(self.get_url_names_and_kwargs(url_kwargs))[BENCHED_URL_NAME]
+        results = []
+        for configuration, overridden_settings in (('uncached', UNCACHED_SETTINGS), ('cached', {})):
+            with override_settings(**overridden_settings):
+                # A new client loads the middlewares, and logs in, with the overridden settings.
+                client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+                client.force_login(user)
+                results.append({
+                    'configuration': configuration,
+                    **self.bench_url(client, BENCHED_URL_NAME, kwargs, options),
+                })
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=4))
+        else:
+            self.write_table(results)
+
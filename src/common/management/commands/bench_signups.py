@@ -0,0 +1,120 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from time import perf_counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from common.models import User
+from events.models import Event
+from .bench import percentile
+
+# Django 4.0's AsyncClient cannot read multipart bodies, both modes post the form urlencoded.
+SIGN_UP_DATA = 'player=on'
+SIGN_UP_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the throughput of concurrent sign-ups through the sync views under WSGI '
+        'and the async views under ASGI. Creates its own users and events and deletes them afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--signups', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['signups'] < 1 or options['concurrency'] < 1:
+            raise CommandError('The number of sign-ups and the concurrency must be positive')
+
+        run_id = uuid4().hex[:8]
+        users = User.objects.bulk_create(
+            User(username=f'bench_{run_id}_{index}') for index in range(options['signups'])
+        )
+        events = [
+            Event.factory(
+                name=f'Bench {run_id} {mode}',
+                description='Sign-ups benchmark',
+                date_and_time=timezone.now() + timedelta(days=1),
+                location='Bench',
+                max_participants=options['signups'],
+            ) for mode in ('wsgi', 'asgi')
+        ]
+        try:
+            # The test clients are served as "testserver", whatever the client class.
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                results = [
+                    self.bench_wsgi(users, events[0], options['concurrency']),
+                    self.bench_asgi(users, events[1], options['concurrency']),
+                ]
+        finally:
+            Event.objects.filter(pk__in=[event.pk for event in events]).delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        self.write_table(results)
+
+    def bench_wsgi(self, users: list[User], event: Event, concurrency: int) -> dict:
+        path = reverse('events:register-member', kwargs={'event_uuid': event.pk})
+        clients = [self.logged_in_client(Client, user) for user in users]
+
+        def sign_up(client: Client):
+            start = perf_counter()
+            response = client.post(path, SIGN_UP_DATA, content_type=SIGN_UP_CONTENT_TYPE)
+            return perf_counter() - start, response.status_code
+
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            timings_and_statuses = list(executor.map(sign_up, clients))
+        return self.result('WSGI', event, concurrency, perf_counter() - start, timings_and_statuses)
+
+    def bench_asgi(self, users: list[User], event: Event, concurrency: int) -> dict:
+        with override_settings(ROOT_URLCONF='ludigestion.async_urls'):
+            path = reverse('events:register-member', kwargs={'event_uuid': event.pk})
+            clients = [self.logged_in_client(AsyncClient, user) for user in users]
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def sign_up(client: AsyncClient):
+                async with semaphore:
+                    start = perf_counter()
+                    response = await client.post(path, SIGN_UP_DATA, content_type=SIGN_UP_CONTENT_TYPE)
+                    return perf_counter() - start, response.status_code
+
+            async def sign_up_everyone():
+                return await asyncio.gather(*(sign_up(client) for client in clients))
+
+            start = perf_counter()
+            timings_and_statuses = asyncio.run(sign_up_everyone())
+            return self.result('ASGI', event, concurrency, perf_counter() - start, timings_and_statuses)
+
+    def logged_in_client(self, client_class, user: User):
+        client = client_class()
+        client.force_login(user)
+        return client
+
+    def result(self, mode: str, event: Event, concurrency: int, elapsed: float, timings_and_statuses: list) -> dict:
+        timings = [timing * 1000 for timing, _ in timings_and_statuses]
+        event.refresh_from_db()
+        return {
+            'mode': mode,
+            'signups': len(timings),
+            'concurrency': concurrency,
+            'total_s': round(elapsed, 3),
+            'signups_per_s': round(len(timings) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'errors': sum(1 for _, status in timings_and_statuses if status != 302),
+            'registered': event.seats_taken,
+        }
+
+    def write_table(self, results: list[dict]) -> None:
+        columns = list(results[0])
+        widths = {column: max(len(column), *(len(str(result[column])) for result in results)) for column in columns}
+        self.stdout.write('  '.join(column.ljust(widths[column]) for column in columns))
+        for result in results:
+            self.stdout.write('  '.join(str(result[column]).ljust(widths[column]) for column in columns))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from events.search import EVENT_SEARCH_INDEX
+from tasks.search import TASK_SEARCH_INDEX
+
+SEARCH_INDEXES = (EVENT_SEARCH_INDEX, TASK_SEARCH_INDEX)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search indexes of the events and tasks, which triggers otherwise keep in sync'
+
+    @transaction.atomic()
+    def handle(self, *args, **options):
+        for index in SEARCH_INDEXES:
+            nb_rows = index.rebuild()
+            self.stdout.write(self.style.SUCCESS(f'Indexed {nb_rows} rows in {index.table}'))
@@ -0,0 +1,60 @@
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from common.jobs import JOBS_BATCH_SIZE, logger, run_due_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run the background jobs of the job table with a pool of worker threads, until interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help='Number of worker threads')
+        parser.add_argument('--batch-size', type=int, default=JOBS_BATCH_SIZE, help='Jobs claimed at once by a worker')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when no job is due')
+        parser.add_argument('--once', action='store_true', help='Stop once no job is due, instead of polling')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['batch_size'] < 1:
+            raise CommandError('The concurrency and the batch size must be positive')
+
+        stopping = threading.Event()
+        counts = [0] * options['concurrency']
+        workers = [
+            threading.Thread(target=self.work, args=(index, counts, stopping, options), name=f'worker-{index}')
+            for index in range(options['concurrency'])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                # Joined with a timeout so that the main thread still receives KeyboardInterrupt.
+                while worker.is_alive():
+                    worker.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping once the running batches are done')
+            stopping.set()
+            for worker in workers:
+                worker.join()
+
+        self.stdout.write(self.style.SUCCESS(f'Ran {sum(counts)} jobs'))
+
+    def work(self, index: int, counts: list[int], stopping: threading.Event, options: dict) -> None:
+        try:
+            while not stopping.is_set():
+                try:
+                    nb_jobs = run_due_jobs(options['batch_size'])
+                except OperationalError:
+                    # e.g. the database stayed locked longer than the busy timeout, try again later.
+                    logger.exception('Worker %d could not run its jobs', index)
+                    stopping.wait(options['poll_interval'])
+                    continue
+                counts[index] += nb_jobs
+                if not nb_jobs:
+                    if options['once']:
+                        return
+                    stopping.wait(options['poll_interval'])
+        finally:
+            # Every thread has its own database connection.
+            connection.close()
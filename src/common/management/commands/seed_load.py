@@ -0,0 +1,118 @@
+import random
+from datetime import timedelta
+from uuid import uuid4
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from common.models import User
+from events.models import Event, Candidacy, CandidacyCandidate
+from tasks.models import Task
+
+SEED_PASSWORD = 'seed_password'
+GROUP_SIZES = (1, 1, 1, 2, 2, 3, 4)
+
+
+class Command(BaseCommand):
+    help = 'Bulk generate users, events, candidacies and tasks to measure performance on a realistic volume'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--events', type=int, default=100)
+        parser.add_argument('--candidacies-per-event', type=int, default=10, help='At most, as a user holds one candidacy per event')
+        parser.add_argument('--tasks', type=int, default=100)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help=(
+                'Random seed, to generate the same volumes, dates and group sizes between runs. '
+                'Usernames embed a per-run id, so that the command can be run several times on the same database'
+            ),
+        )
+
+    @transaction.atomic()
+    def handle(self, *args, **options):
+        randomizer = random.Random(options['seed'])
+        # Not drawn from the randomizer: two runs with the same seed must not generate the same usernames.
+        run_id = uuid4().hex[:8]
+
+        users = self.generate_users(options['users'], run_id)
+        events, candidacies, candidacy_candidates = self.generate_events(
+            randomizer, users, options['events'], options['candidacies_per_event'],
+        )
+        tasks, contributions = self.generate_tasks(randomizer, users, options['tasks'])
+
+        User.objects.bulk_create(users)
+        Event.objects.bulk_create(events)
+        Candidacy.objects.bulk_create(candidacies)
+        CandidacyCandidate.objects.bulk_create(candidacy_candidates)
+        Event.objects.filter(pk__in=[event.pk for event in events]).recount_seats()
+        Task.objects.bulk_create(tasks)
+        Task.contributers.through.objects.bulk_create(contributions)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} users (password: {SEED_PASSWORD}), {len(events)} events, '
+            f'{len(candidacies)} candidacies, {len(candidacy_candidates)} candidacy candidates and {len(tasks)} tasks'
+        ))
+
+    def generate_users(self, nb_users: int, run_id: str) -> list[User]:
+        # Hashing is slow on purpose, every seeded user shares the same password hash.
+        password = make_password(SEED_PASSWORD)
+        return [
+            User(
+                username=f'seed_{run_id}_{index}',
+                first_name=f'Prénom{index}',
+                last_name=f'Nom{index}',
+                email=f'seed_{run_id}_{index}@example.com',
+                password=password,
+            ) for index in range(nb_users)
+        ]
+
+    def generate_events(self, randomizer: random.Random, users: list[User], nb_events: int, candidacies_per_event: int):
+        now = timezone.now()
+        events, candidacies, candidacy_candidates = [], [], []
+        for index in range(nb_events):
+            event = Event(
+                name=f'Match {index}',
+                description=f'Match d\'impro numéro {index}',
+                date_and_time=now + timedelta(days=randomizer.randint(-90, 180), hours=randomizer.randint(18, 21)),
+                location=f'Salle {randomizer.randint(1, 20)}',
+                max_participants=randomizer.randint(10, 60),
+            )
+            events.append(event)
+
+            seats_taken = 0
+            # A user holds at most one candidacy per event.
+            available_users = randomizer.sample(users, len(users))
+            for _ in range(candidacies_per_event):
+                if not available_users:
+                    break
+                candidacy = Candidacy(event=event)
+                candidacies.append(candidacy)
+                group = [available_users.pop() for _ in range(min(randomizer.choice(GROUP_SIZES), len(available_users)))]
+                candidacy_candidates.extend(
+                    self.generate_candidacy_candidate(randomizer, candidacy, candidate) for candidate in group
+                )
+                seats_taken += len(group)
+            event.max_participants = max(event.max_participants, seats_taken)
+
+        return events, candidacies, candidacy_candidates
+
+    def generate_candidacy_candidate(self, randomizer: random.Random, candidacy: Candidacy, candidate: User) -> CandidacyCandidate:
+        roles = {role: randomizer.random() < 0.4 for role in CandidacyCandidate.ROLES}
+        if not any(roles.values()):
+            roles['player'] = True
+        return CandidacyCandidate(candidacy=candidacy, event=candidacy.event, candidate=candidate, **roles)
+
+    def generate_tasks(self, randomizer: random.Random, users: list[User], nb_tasks: int):
+        tasks = [
+            Task(name=f'Tâche {index}', description=f'Description de la tâche {index}')
+            for index in range(nb_tasks)
+        ]
+        contributions = [
+            Task.contributers.through(task=task, user=contributer)
+            for task in tasks
+            for contributer in randomizer.sample(users, min(randomizer.randint(0, 3), len(users)))
+        ]
+        return tasks, contributions
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha1
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connection
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger('ludigestion.performance')
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper recording the number, the duration and the SQL of every query.
+    Queries are fingerprinted on their SQL without parameters, so that N+1 patterns show up as duplicates.
+    """
+
+    def __init__(self):
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.sql_by_fingerprint = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - start
+            fingerprint = sha1(sql.encode()).hexdigest()[:12]
+            self.fingerprints[fingerprint] += 1
+            self.sql_by_fingerprint.setdefault(fingerprint, sql)
+
+    @property
+    def count(self) -> int:
+        return sum(self.fingerprints.values())
+
+    def duplicates(self) -> list[dict]:
+        return [
+            {'fingerprint': fingerprint, 'count': count, 'sql': self.sql_by_fingerprint[fingerprint][:200]}
+            for fingerprint, count in self.fingerprints.most_common()
+            if count > 1
+        ]
+
+
+current_measure: ContextVar['RequestMeasure | None'] = ContextVar('current_measure', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    connection.execute_wrapper handing the query to the request measured in the current context, if any.
+    Context variables follow sync_to_async, so the queries of async views, which run on the connections
+    of the executor threads, are counted as well.
+    """
+    measure = current_measure.get()
+    if measure is None:
+        return execute(sql, params, many, context)
+    return measure.queries(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver installing record_query on every connection, whichever thread opens it."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestMeasure:
+    def __init__(self):
+        self.queries = QueryRecorder()
+        self.start = perf_counter()
+        self.duration = 0.0
+
+    @contextmanager
+    def recording(self):
+        # The connection of the current thread may have been opened before the receiver was connected.
+        install_query_recorder(sender=None, connection=connection)
+        token = current_measure.set(self)
+        try:
+            yield
+        finally:
+            current_measure.reset(token)
+        self.duration = perf_counter() - self.start
+
+    def report(self, request, response) -> None:
+        response['Server-Timing'] = (
+            f'total;dur={self.duration * 1000:.1f}, '
+            f'sql;dur={self.queries.duration * 1000:.1f};desc="{self.queries.count} queries"'
+        )
+
+        duplicates = self.queries.duplicates()
+        if (
+            self.duration * 1000 > settings.PERFORMANCE_SLOW_REQUEST_MS
+            or self.queries.count > settings.PERFORMANCE_MAX_QUERIES
+            or any(duplicate['count'] > settings.PERFORMANCE_MAX_DUPLICATED_QUERIES for duplicate in duplicates)
+        ):
+            logger.warning(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(self.duration * 1000, 1),
+                'sql_queries': self.queries.count,
+                'sql_ms': round(self.queries.duration * 1000, 1),
+                'duplicated_queries': duplicates,
+            }))
+
+
+@sync_and_async_middleware
+def performance_middleware(get_response):
+    """
+    Measure the wall time, SQL query count, SQL time and duplicated queries of every request.
+    Adds a Server-Timing header and logs a structured line on ludigestion.performance when
+    the PERFORMANCE_* thresholds are exceeded.
+    Queries run while a streaming response is consumed happen after the measure and are not counted.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            measure = RequestMeasure()
+            with measure.recording():
+                response = await get_response(request)
+            measure.report(request, response)
+            return response
+    else:
+        def middleware(request):
+            measure = RequestMeasure()
+            with measure.recording():
+                response = get_response(request)
+            measure.report(request, response)
+            return response
+
+    return middleware
@@ -0,0 +1,32 @@
+from uuid import uuid4
+
+from django.db import migrations, models
+
+
+def generate_calendar_tokens(apps, schema_editor):
+    User = apps.get_model('common', 'User')
+    users = list(User.objects.only('pk'))
+    for user in users:
+        user.calendar_token = uuid4()
+    User.objects.bulk_update(users, ['calendar_token'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_user_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='calendar_token',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(generate_calendar_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='calendar_token',
+            field=models.UUIDField(default=uuid4, editable=False, unique=True),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from uuid import uuid4
 
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 
 
@@ -17,3 +19,45 @@ class BaseModel(models.Model):
 
 class User(AbstractUser):
     uuid = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    # Secret of the user's calendar feed URL, read by calendar apps that cannot log in.
+    calendar_token = models.UUIDField(default=uuid4, unique=True, editable=False)
+
+    class Meta(AbstractUser.Meta):
+        # Prefix searches of the users search endpoint.
+        indexes = [
+            models.Index(Lower('username'), name='user_lower_username_idx'),
+            models.Index(Lower('first_name'), name='user_lower_first_name_idx'),
+            models.Index(Lower('last_name'), name='user_lower_last_name_idx'),
+        ]
+
+
+class Job(BaseModel):
+    """
+    Unit of background work run by `manage.py run_worker`, see common.jobs.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        RUNNING = 'running'
+        FAILED = 'failed'
+
+    uuid = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    run_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    locked_by = models.CharField(max_length=32, blank=True, db_index=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        db_table = 'job'
+        indexes = [
+            # Due jobs lookup of the workers.
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.name} ({self.status}, attempt {self.attempts}/{self.max_attempts})'
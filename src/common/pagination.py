@@ -0,0 +1,175 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from attrs import frozen
+from django.core.exceptions import ValidationError
+from django.db.models import Model, Q, QuerySet
+from django.http import Http404
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@frozen
+class KeysetPage:
+    object_list: list
+    previous_cursor: str | None = None
+    next_cursor: str | None = None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_previous() or self.has_next()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Seek based paginator: a page is fetched with a WHERE on the keyset of the row it starts after
+    (or ends before) instead of an OFFSET, so that every page costs the same whatever its position.
+
+    The keyset must uniquely identify a row and be either fully ascending or fully descending,
+    e.g. ('date_and_time', 'uuid') or ('-created_at', '-uuid').
+    """
+
+    def __init__(self, queryset: QuerySet, keyset: tuple[str, ...], per_page: int):
+        if not keyset:
+            raise ValueError('A keyset is required to paginate a queryset')
+        directions = {field.startswith('-') for field in keyset}
+        if len(directions) > 1:
+            raise ValueError('The keyset fields must all be ordered in the same direction')
+
+        self.queryset = queryset
+        self.descending = directions.pop()
+        self.fields = [field.lstrip('-') for field in keyset]
+        self.per_page = per_page
+
+    def get_page(self, after: str | None = None, before: str | None = None, start=None) -> KeysetPage:
+        """
+        Return the page following the `after` cursor, or preceding the `before` cursor.
+        Without cursor, return the first page, starting at `start` on the first keyset field if given.
+        """
+        if after and before:
+            raise InvalidCursor('A page cannot be requested both after and before a cursor')
+
+        forward = not before
+        queryset = self._ordered(forward)
+        if before:
+            queryset = queryset.filter(self._seek(self.decode_cursor(before), forward=False))
+        elif after:
+            queryset = queryset.filter(self._seek(self.decode_cursor(after), forward=True))
+        elif start is not None:
+            queryset = queryset.filter(**{f'{self.fields[0]}__{self._lookup(forward=True)}e': start})
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+        if not rows:
+            previous_cursor = self._cursor_before_start(start) if forward and not after else None
+            return KeysetPage(object_list=rows, previous_cursor=previous_cursor)
+
+        if forward:
+            has_previous = bool(after or start is not None) and self._has_rows_beyond(rows[0], forward=False)
+            has_next = has_more
+        else:
+            has_previous = has_more
+            has_next = self._has_rows_beyond(rows[-1], forward=True)
+
+        return KeysetPage(
+            object_list=rows,
+            previous_cursor=self.encode_cursor(rows[0]) if has_previous else None,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next else None,
+        )
+
+    def encode_cursor(self, obj: Model) -> str:
+        values = [obj._meta.get_field(field).value_to_string(obj) for field in self.fields]
+        return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor: str) -> list:
+        try:
+            values = json.loads(urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise InvalidCursor(f'Invalid cursor: {cursor}')
+            return [
+                self.queryset.model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (binascii.Error, UnicodeDecodeError, ValueError, ValidationError) as e:
+            raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+    def _lookup(self, forward: bool) -> str:
+        return 'gt' if forward != self.descending else 'lt'
+
+    def _ordered(self, forward: bool) -> QuerySet:
+        prefix = '' if forward != self.descending else '-'
+        return self.queryset.order_by(*(f'{prefix}{field}' for field in self.fields))
+
+    def _seek(self, values: list, forward: bool) -> Q:
+        # (a, b) > (x, y) written as a >= x AND (a > x OR b > y), so that the index range on `a` is used.
+        lookup = self._lookup(forward)
+        condition = Q(**{f'{self.fields[-1]}__{lookup}': values[-1]})
+        for field, value in zip(reversed(self.fields[:-1]), reversed(values[:-1])):
+            condition = Q(**{f'{field}__{lookup}e': value}) & (Q(**{f'{field}__{lookup}': value}) | condition)
+        return condition
+
+    def _cursor_before_start(self, start) -> str | None:
+        """
+        Cursor of the page ending right before `start`, when rows come before it,
+        so that an empty first page (e.g. only past events) still links back to them.
+        """
+        if start is None:
+            return None
+        last_row = self._ordered(forward=False).filter(**{f'{self.fields[0]}__{self._lookup(forward=False)}': start}).first()
+        if last_row is None:
+            return None
+        # Rows before `start` all come before this boundary, whatever its other keyset values.
+        boundary = self.queryset.model(**{self.fields[0]: start, **{field: getattr(last_row, field) for field in self.fields[1:]}})
+        return self.encode_cursor(boundary)
+
+    def _has_rows_beyond(self, obj: Model, forward: bool) -> bool:
+        values = [getattr(obj, field) for field in self.fields]
+        return self.queryset.filter(self._seek(values, forward)).exists()
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin paginating with a KeysetPaginator.
+    Pages are requested through the `after` and `before` GET parameters.
+    """
+    keyset: tuple[str, ...] = ()
+    paginate_by = 20
+
+    def get_keyset_start(self):
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.keyset, page_size)
+        page = get_requested_page(self.request, paginator, start=self.get_keyset_start())
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+def get_requested_page(request, paginator: KeysetPaginator, start=None) -> KeysetPage:
+    """
+    Return the page requested through the `after` and `before` GET parameters, raising Http404 on invalid cursors.
+    """
+    try:
+        return paginator.get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            start=start,
+        )
+    except InvalidCursor as e:
+        raise Http404(str(e))
@@ -0,0 +1,77 @@
+import re
+
+from attrs import frozen
+from django.db import connection
+from django.db.models import Model
+
+SEARCH_RESULTS_LIMIT = 50
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def to_match_expression(text: str, fields: tuple[str, ...]) -> str | None:
+    """
+    FTS5 MATCH expression finding the rows containing every word of `text` in `fields`, the last word as a prefix.
+    Words are quoted so that user input never reaches the FTS5 query syntax. None when `text` has no word.
+    """
+    words = WORD_PATTERN.findall(text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return f'{{{" ".join(fields)}}} : ({" ".join(terms)})'
+
+
+@frozen
+class FullTextIndex:
+    """
+    SQLite FTS5 table indexing the text `fields` of `model`, keyed by the model primary key.
+
+    The table and the triggers keeping it in sync with the model table are created by a RunSQL migration of the model app,
+    e.g. events 0007_event_search_index.
+    The key column is indexed too, so that the triggers find the row of an updated or deleted object without a scan;
+    searches are restricted to `fields` so that it never matches.
+    """
+    table: str
+    model: type[Model]
+    fields: tuple[str, ...]
+    weights: tuple[float, ...]
+
+    @property
+    def model_table(self) -> str:
+        return self.model._meta.db_table
+
+    @property
+    def key(self) -> str:
+        return self.model._meta.pk.column
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        return self.key, *self.fields
+
+    def search(self, text: str, limit: int = SEARCH_RESULTS_LIMIT) -> list[Model]:
+        """
+        At most `limit` objects matching `text`, best ranked first, fetched with a single query.
+        """
+        expression = to_match_expression(text, self.fields)
+        if expression is None:
+            return []
+        # bm25 is negative, the lower the better; the key column weighs nothing.
+        rank = f'bm25({self.table}, 0, {", ".join(str(weight) for weight in self.weights)})'
+        return list(self.model.objects.raw(
+            f'SELECT {self.model_table}.* FROM {self.table} '
+            f'INNER JOIN {self.model_table} ON {self.model_table}.{self.key} = {self.table}.{self.key} '
+            f'WHERE {self.table} MATCH %s ORDER BY {rank} LIMIT %s',
+            [expression, limit],
+        ))
+
+    def rebuild(self) -> int:
+        """
+        Reindex every row of the model table, return the number of indexed rows.
+        """
+        columns = ', '.join(self.columns)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(f'INSERT INTO {self.table} ({columns}) SELECT {columns} FROM {self.model_table}')
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+            cursor.execute(f'SELECT COUNT(*) FROM {self.table}')
+            return cursor.fetchone()[0]
@@ -0,0 +1,18 @@
+"""
+SQLite backend starting its transactions with settings.SQLITE_TRANSACTION_MODE.
+
+Django opens atomic blocks with a plain (deferred) BEGIN: a transaction reading before it writes only asks
+for the write lock on its first write. In WAL mode, when another connection committed in between,
+SQLite refuses that upgrade with SQLITE_BUSY right away, without waiting for the busy timeout.
+BEGIN IMMEDIATE takes the write lock upfront, so such transactions wait for each other instead.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+
+
+class DatabaseWrapper(SQLiteDatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        if settings.SQLITE_PRODUCTION_PROFILE:
+            self.cursor().execute(f'BEGIN {settings.SQLITE_TRANSACTION_MODE}')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,697 @@
+import json
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Count
+from django.db.utils import OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from common.middleware import performance_middleware
+from common.views import users_matching_prefix
+from common.jobs import JOB_HANDLERS, PartialBatchFailure, UnknownJob, claim_jobs, enqueue, enqueue_on_commit, run_due_jobs, run_jobs
+from common.models import Job, User
+from events.core import Role
+from events.models import Event, Candidacy, CandidacyCandidate
+from events.search import EVENT_SEARCH_INDEX
+from tasks.models import Task
+from tasks.search import TASK_SEARCH_INDEX
+
+
+def new_sqlite_connection(database_path: Path):
+    settings_dict = {
+        **connections[DEFAULT_DB_ALIAS].settings_dict,
+        'NAME': str(database_path),
+    }
+    return connections[DEFAULT_DB_ALIAS].__class__(settings_dict, alias='sqlite_profile_test')
+
+
+class TestSqliteProductionProfile(SimpleTestCase):
+    def setUp(self) -> None:
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.database_path = Path(self.temporary_directory.name) / 'db.sqlite3'
+        connection = new_sqlite_connection(self.database_path)
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE sign_up (id INTEGER PRIMARY KEY, thread INTEGER)')
+        connection.close()
+
+    def tearDown(self) -> None:
+        self.temporary_directory.cleanup()
+
+    def pragma(self, connection, pragma: str):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {pragma}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_on_every_new_connection(self):
+        connection = new_sqlite_connection(self.database_path)
+
+        self.assertEqual(self.pragma(connection, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(connection, 'synchronous'), 1)
+        self.assertEqual(self.pragma(connection, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(connection, 'temp_store'), 2)
+        self.assertEqual(self.pragma(connection, 'cache_size'), -32 * 1024)
+        connection.close()
+
+    @override_settings(SQLITE_PRODUCTION_PROFILE=False)
+    def test_profile_can_be_disabled(self):
+        connection = new_sqlite_connection(self.database_path)
+
+        self.assertEqual(self.pragma(connection, 'cache_size'), -2000)
+        connection.close()
+
+    def test_parallel_readers_and_writers_do_not_hit_lock_errors(self):
+        nb_writers, nb_readers, nb_writes = 4, 4, 50
+        errors = []
+
+        def write(thread: int):
+            connection = new_sqlite_connection(self.database_path)
+            try:
+                for _ in range(nb_writes):
+                    with connection.cursor() as cursor:
+                        cursor.execute('INSERT INTO sign_up (thread) VALUES (%s)', [thread])
+            except OperationalError as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        def read():
+            connection = new_sqlite_connection(self.database_path)
+            try:
+                for _ in range(nb_writes):
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT COUNT(*) FROM sign_up')
+                        cursor.fetchone()
+            except OperationalError as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=write, args=(thread,)) for thread in range(nb_writers)]
+        threads += [threading.Thread(target=read) for _ in range(nb_readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        connection = new_sqlite_connection(self.database_path)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM sign_up')
+            self.assertEqual(cursor.fetchone()[0], nb_writers * nb_writes)
+        connection.close()
+
+    def count_then_insert_concurrently(self) -> list[OperationalError]:
+        """
+        Run two transactions reading then writing, the second starting while the first one has not written yet.
+        """
+        errors = []
+        first_has_read = threading.Event()
+
+        def count_then_insert(thread: int, delay: float):
+            connection = new_sqlite_connection(self.database_path)
+            try:
+                # What atomic() runs to open its transaction.
+                connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT COUNT(*) FROM sign_up')
+                    first_has_read.set()
+                    time.sleep(delay)
+                    cursor.execute('INSERT INTO sign_up (thread) VALUES (%s)', [thread])
+                connection.commit()
+            except OperationalError as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=count_then_insert, args=(0, 0.2))]
+        threads[0].start()
+        first_has_read.wait()
+        threads.append(threading.Thread(target=count_then_insert, args=(1, 0.4)))
+        threads[1].start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_transactions_reading_before_writing_wait_for_each_other(self):
+        self.assertEqual(self.count_then_insert_concurrently(), [])
+
+    @override_settings(SQLITE_TRANSACTION_MODE='DEFERRED')
+    def test_deferred_transactions_cannot_upgrade_to_a_write_after_a_concurrent_commit(self):
+        errors = self.count_then_insert_concurrently()
+
+        self.assertEqual(len(errors), 1)
+        self.assertIn('database is locked', str(errors[0]))
+
+
+class TestSeedLoad(TestCase):
+    def test_generates_the_requested_volume(self):
+        call_command('seed_load', users=20, events=5, candidacies_per_event=3, tasks=4, stdout=StringIO())
+
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Event.objects.count(), 5)
+        self.assertEqual(Candidacy.objects.count(), 15)
+        self.assertEqual(Task.objects.count(), 4)
+        for event in Event.objects.all():
+            self.assertEqual(event.seats_taken, CandidacyCandidate.objects.filter(candidacy__event=event).count())
+            self.assertLessEqual(event.seats_taken, event.max_participants)
+
+    def test_can_be_run_several_times(self):
+        call_command('seed_load', users=5, events=1, candidacies_per_event=1, tasks=0, stdout=StringIO())
+        call_command('seed_load', users=5, events=1, candidacies_per_event=1, tasks=0, stdout=StringIO())
+
+        self.assertEqual(User.objects.count(), 10)
+
+
+class TestBench(TestCase):
+    def test_reports_every_events_and_tasks_url(self):
+        call_command('seed_load', users=20, events=5, candidacies_per_event=3, tasks=4, stdout=StringIO())
+        Event.objects.update(date_and_time=Event.objects.first().date_and_time.replace(year=2100))
+        # The roster and the lineup would redirect anyone else to the login page.
+        User.objects.update(is_staff=True)
+        output = StringIO()
+
+        call_command('bench', iterations=2, warmup=0, json=True, stdout=output)
+
+        results = {result['url']: result for result in json.loads(output.getvalue())}
+        self.assertEqual(set(results), {
+            'events:all-events',
+            'events:search-events',
+            'events:user-calendar',
+            'events:api:events',
+            'events:api:candidacies',
+            'events:register-bulk-candidacies',
+            'events:register-member',
+            'events:unregister-candidacy',
+            'events:export-roster',
+            'events:event-lineup',
+            'tasks:all-tasks',
+            'tasks:search-tasks',
+        })
+        for result in results.values():
+            self.assertLess(result['status'], 400)
+            # The group registration form is static, and the session and its user come from the cache.
+            if result['url'] != 'events:register-bulk-candidacies':
+                self.assertGreater(result['queries'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+        self.assertEqual(Candidacy.objects.count(), 15)
+
+    def test_requires_data(self):
+        with self.assertRaises(CommandError):
+            call_command('bench', stdout=StringIO())
+
+
+class TestBenchSignups(TransactionTestCase):
+    def test_compares_wsgi_and_asgi_sign_ups_and_cleans_up(self):
+        output = StringIO()
+
+        call_command('bench_signups', signups=4, concurrency=1, stdout=output)
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines], ['mode', 'WSGI', 'ASGI'])
+        errors_column = lines[0].split().index('errors')
+        registered_column = lines[0].split().index('registered')
+        for line in lines[1:]:
+            self.assertEqual(line.split()[errors_column], '0')
+            self.assertEqual(line.split()[registered_column], '4')
+        self.assertEqual(User.objects.count(), 0)
+        self.assertEqual(Event.objects.count(), 0)
+
+
+class TestPerformanceMiddleware(TestCase):
+    def repeated_queries_view(self, nb_queries: int):
+        def view(request):
+            for _ in range(nb_queries):
+                User.objects.filter(username='test_user').exists()
+            return HttpResponse()
+        return view
+
+    def test_adds_server_timing_header(self):
+        response = self.client.get('/tasks/')
+
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[0-9.]+, sql;dur=[0-9.]+;desc="[0-9]+ queries"$')
+
+    def test_counts_queries(self):
+        middleware = performance_middleware(self.repeated_queries_view(3))
+
+        response = middleware(RequestFactory().get('/'))
+
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+
+    async def test_counts_queries_of_async_views(self):
+        view = sync_to_async(self.repeated_queries_view(3))
+        middleware = performance_middleware(view)
+
+        response = await middleware(RequestFactory().get('/'))
+
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+
+    async def test_adds_server_timing_header_under_asgi(self):
+        response = await self.async_client.get('/tasks/')
+
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[0-9.]+, sql;dur=[0-9.]+;desc="[1-9][0-9]* queries"$')
+
+    @override_settings(PERFORMANCE_MAX_DUPLICATED_QUERIES=2)
+    def test_logs_duplicated_queries(self):
+        middleware = performance_middleware(self.repeated_queries_view(3))
+
+        with self.assertLogs('ludigestion.performance', level='WARNING') as logs:
+            middleware(RequestFactory().get('/n-plus-one/'))
+
+        [line] = logs.records
+        report = json.loads(line.getMessage())
+        self.assertEqual(report['path'], '/n-plus-one/')
+        self.assertEqual(report['sql_queries'], 3)
+        [duplicate] = report['duplicated_queries']
+        self.assertEqual(duplicate['count'], 3)
+        self.assertIn('SELECT', duplicate['sql'])
+
+    def test_does_not_log_requests_within_thresholds(self):
+        middleware = performance_middleware(self.repeated_queries_view(1))
+
+        with self.assertNoLogs('ludigestion.performance', level='WARNING'):
+            middleware(RequestFactory().get('/'))
+
+
+class TestUserSearch(TestCase):
+    def setUp(self) -> None:
+        self.user = User(username='test_user')
+        self.user.set_password('test_password')
+        self.user.save()
+        User.objects.bulk_create([
+            User(username='alice', first_name='Alice', last_name='Martin'),
+            User(username='amartin', first_name='Arnaud', last_name='Martinez'),
+            User(username='bob', first_name='Robert', last_name='Alibert'),
+            User(username='carol', first_name='Carole', last_name='Dupont'),
+            User(username='albert', first_name='Albert', last_name='Camus', is_active=False),
+        ])
+        self.client.login(username=self.user.username, password='test_password')
+
+    def search(self, **params) -> list[str]:
+        response = self.client.get('/users/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.json()['results']]
+
+    def test_matches_the_prefix_of_usernames_first_and_last_names(self):
+        self.assertEqual(self.search(q='Al'), ['alice', 'bob'])
+        self.assertEqual(self.search(q='martin'), ['alice', 'amartin'])
+        self.assertEqual(self.search(q='ROB'), ['bob'])
+
+    def test_matches_accented_names_whatever_the_case_of_their_first_letter(self):
+        User.objects.bulk_create([
+            User(username='emilie', first_name='Émilie', last_name='Durand'),
+            User(username='helene', first_name='hélène', last_name='Éric'),
+        ])
+
+        self.assertEqual(self.search(q='émi'), ['emilie'])
+        self.assertEqual(self.search(q='ÉMI'), ['emilie'])
+        self.assertEqual(self.search(q='Hél'), ['helene'])
+        self.assertEqual(self.search(q='éric'), ['helene'])
+
+    def test_does_not_match_inside_the_names(self):
+        self.assertEqual(self.search(q='ice'), [])
+
+    def test_results_are_limited(self):
+        self.assertEqual(self.search(q='a', limit=2), ['alice', 'amartin'])
+        self.assertEqual(len(self.search(q='a', limit=1000)), 3)
+
+    def test_empty_prefix_matches_no_one(self):
+        # The session and its user come from the cache.
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search(q=' '), [])
+
+    def test_results_hold_the_user_uuid(self):
+        response = self.client.get('/users/search/', {'q': 'carol'})
+
+        self.assertEqual(response.json(), {'results': [
+            {'uuid': str(User.objects.get(username='carol').uuid), 'username': 'carol', 'first_name': 'Carole', 'last_name': 'Dupont'},
+        ]})
+
+    def test_invalid_limit(self):
+        self.assertEqual(self.client.get('/users/search/', {'q': 'a', 'limit': 'all'}).status_code, 400)
+        self.assertEqual(self.client.get('/users/search/', {'q': 'a', 'limit': 0}).status_code, 400)
+
+    def test_login_required(self):
+        self.client.logout()
+
+        response = self.client.get('/users/search/', {'q': 'a'})
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_prefix_search_uses_the_name_indexes(self):
+        query_plan = users_matching_prefix('al', 10).explain()
+
+        for index_name in ('user_lower_username_idx', 'user_lower_first_name_idx', 'user_lower_last_name_idx'):
+            self.assertIn(index_name, query_plan)
+
+
+class TestAdminQueryBudget(TestCase):
+    def setUp(self) -> None:
+        self.admin_user = User.objects.create_superuser(username='test_admin', password='test_password')
+        self.client.login(username='test_admin', password='test_password')
+
+    def seed(self, **options) -> None:
+        call_command('seed_load', stdout=StringIO(), **options)
+
+    def count_page_queries(self, path: str) -> int:
+        # The content types cache is process wide, start every page cold.
+        ContentType.objects.clear_cache()
+        with CaptureQueriesContext(connection) as captured_queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(captured_queries)
+
+    def busiest_object_paths(self) -> list[str]:
+        event = Event.objects.annotate(nb=Count('candidacies')).latest('nb')
+        candidacy = Candidacy.objects.annotate(nb=Count('detailed_candidates')).latest('nb')
+        # An empty inline page skips its query, the user fills both inlines.
+        user = User.objects.filter(tasks__isnull=False).annotate(nb=Count('detailed_candidacies', distinct=True)).latest('nb')
+        task = Task.objects.annotate(nb=Count('contributers')).latest('nb')
+        return [
+            reverse('admin:events_event_change', args=[event.pk]),
+            reverse('admin:events_candidacy_change', args=[candidacy.pk]),
+            reverse('admin:events_candidacycandidate_change', args=[CandidacyCandidate.objects.filter(candidacy=candidacy).first().pk]),
+            reverse('admin:common_user_change', args=[user.pk]),
+            reverse('admin:tasks_task_change', args=[task.pk]),
+        ]
+
+    def admin_page_query_counts(self) -> dict:
+        changelist_paths = [
+            reverse(f'admin:{url_name}_changelist')
+            for url_name in ('events_event', 'events_candidacy', 'events_candidacycandidate', 'common_user', 'tasks_task')
+        ]
+        return {path: self.count_page_queries(path) for path in changelist_paths + self.busiest_object_paths()}
+
+    def test_query_counts_do_not_depend_on_the_number_of_rows(self):
+        self.seed(users=5, events=2, candidacies_per_event=2, tasks=3)
+        small_counts = self.admin_page_query_counts()
+        self.seed(users=60, events=40, candidacies_per_event=30, tasks=120)
+        large_counts = self.admin_page_query_counts()
+
+        self.assertEqual(
+            [small_counts[path] for path in sorted(small_counts)],
+            [large_counts[path] for path in sorted(large_counts)],
+            f'Admin query counts vary with the number of rows: {small_counts} != {large_counts}',
+        )
+
+    def test_inlines_are_paginated(self):
+        self.seed(users=40, events=1, candidacies_per_event=30, tasks=0)
+        event = Event.objects.get()
+        path = reverse('admin:events_event_change', args=[event.pk])
+
+        first_page = self.client.get(path)
+        second_page = self.client.get(path, {'candidacies-page': 2})
+
+        self.assertEqual(len(first_page.context['inline_admin_formsets'][0].formset.forms), 20)
+        self.assertContains(first_page, '?candidacies-page=2')
+        self.assertEqual(
+            len(second_page.context['inline_admin_formsets'][0].formset.forms),
+            Candidacy.objects.filter(event=event).count() - 20,
+        )
+
+
+class TestCandidacyCandidateAdmin(TestCase):
+    def setUp(self) -> None:
+        User.objects.create_superuser(username='test_admin', password='test_password')
+        self.client.login(username='test_admin', password='test_password')
+        call_command('seed_load', users=5, events=1, candidacies_per_event=1, tasks=0, stdout=StringIO())
+        self.candidacy_candidate = CandidacyCandidate.objects.select_related('candidacy', 'event').first()
+        self.path = reverse('admin:events_candidacycandidate_change', args=[self.candidacy_candidate.pk])
+
+    def test_roles_are_edited_as_checkboxes(self):
+        response = self.client.post(self.path, {'candidate': str(self.candidacy_candidate.candidate_id), 'roles': ['1', '4']})
+
+        self.assertEqual(response.status_code, 302)
+        self.candidacy_candidate.refresh_from_db()
+        self.assertEqual(self.candidacy_candidate.roles, Role.PLAYER | Role.ARBITER)
+        response = self.client.get(self.path)
+        self.assertContains(response, 'type="checkbox" name="roles" value="4"')
+        self.assertContains(response, 'arbitre')
+
+    def test_at_least_one_role_is_required(self):
+        response = self.client.post(self.path, {'candidate': str(self.candidacy_candidate.candidate_id)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['adminform'].form.errors['roles'])
+
+    def test_candidacy_and_event_cannot_be_changed(self):
+        other_event = Event.objects.create(name='Autre', date_and_time=timezone.now(), max_participants=10)
+        self.client.post(self.path, {
+            'candidate': str(self.candidacy_candidate.candidate_id), 'roles': ['1'], 'event': str(other_event.pk),
+            'candidacy': str(Candidacy.objects.create(event=other_event).pk),
+        })
+
+        self.candidacy_candidate.refresh_from_db()
+        self.assertEqual(self.candidacy_candidate.event_id, Candidacy.objects.get(pk=self.candidacy_candidate.candidacy_id).event_id)
+        self.assertNotEqual(self.candidacy_candidate.event_id, other_event.pk)
+
+    def test_the_event_of_a_candidacy_cannot_be_changed(self):
+        candidacy = self.candidacy_candidate.candidacy
+        other_event = Event.objects.create(name='Autre', date_and_time=timezone.now(), max_participants=10)
+        path = reverse('admin:events_candidacy_change', args=[candidacy.pk])
+
+        response = self.client.post(path, {
+            'event': str(other_event.pk),
+            'detailed_candidates-TOTAL_FORMS': '0', 'detailed_candidates-INITIAL_FORMS': '0',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        candidacy.refresh_from_db()
+        self.assertEqual(candidacy.event_id, self.candidacy_candidate.event_id)
+        self.assertContains(self.client.get(path), '<div class="readonly">')
+
+    def test_candidates_are_neither_added_nor_deleted_from_the_admin(self):
+        self.assertEqual(self.client.get(reverse('admin:events_candidacycandidate_add')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('admin:events_candidacycandidate_delete', args=[self.candidacy_candidate.pk])).status_code, 403)
+        response = self.client.get(reverse('admin:events_candidacy_change', args=[self.candidacy_candidate.candidacy_id]))
+        self.assertNotContains(response, '-DELETE')
+
+
+class TestRebuildSearchIndex(TestCase):
+    def test_reindexes_events_and_tasks(self):
+        call_command('seed_load', users=5, events=3, candidacies_per_event=1, tasks=2, stdout=StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM event_search')
+            cursor.execute('DELETE FROM task_search')
+        output = StringIO()
+
+        call_command('rebuild_search_index', stdout=output)
+
+        self.assertIn('Indexed 3 rows in event_search', output.getvalue())
+        self.assertIn('Indexed 2 rows in task_search', output.getvalue())
+        self.assertEqual(len(EVENT_SEARCH_INDEX.search('match')), 3)
+        self.assertEqual(len(TASK_SEARCH_INDEX.search('tâche')), 2)
+
+
+class TestCachedUserLoader(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User(username='test_user')
+        self.user.set_password('test_password')
+        self.user.save()
+        self.client.login(username='test_user', password='test_password')
+
+    def get_header_user(self) -> User:
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        return response.context['user']
+
+    def test_session_and_user_are_read_from_the_cache(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_header_user().pk, self.user.pk)
+
+    def test_user_is_reloaded_once_saved(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Alice'
+            self.user.save()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_header_user().first_name, 'Alice')
+        with self.assertNumQueries(0):
+            self.get_header_user()
+
+    def test_deactivated_user_is_logged_out(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertFalse(self.get_header_user().is_authenticated)
+
+
+class TestBenchSessions(TestCase):
+    def test_reports_the_events_page_with_and_without_the_cache(self):
+        call_command('seed_load', users=20, events=5, candidacies_per_event=3, tasks=0, stdout=StringIO())
+        Event.objects.update(date_and_time=Event.objects.first().date_and_time.replace(year=2100))
+        output = StringIO()
+
+        call_command('bench_sessions', iterations=2, warmup=1, json=True, stdout=output)
+
+        uncached, cached = json.loads(output.getvalue())
+        self.assertEqual((uncached['configuration'], cached['configuration']), ('uncached', 'cached'))
+        self.assertEqual((uncached['status'], cached['status']), (200, 200))
+        self.assertEqual(uncached['queries'] - cached['queries'], 2)
+
+
+class TestJobQueue(TestCase):
+    def setUp(self) -> None:
+        self.handled_batches = []
+        self.failures = 0
+        handlers = patch.dict(JOB_HANDLERS, {
+            'tests.record': self.handled_batches.append,
+            'tests.fail': self.fail_job,
+            'tests.fail_odd': self.fail_odd_jobs,
+        })
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def fail_job(self, payloads: list[dict]) -> None:
+        self.failures += 1
+        raise RuntimeError('SMTP server unreachable')
+
+    def fail_odd_jobs(self, payloads: list[dict]) -> None:
+        self.handled_batches.append(payloads)
+        raise PartialBatchFailure({
+            index: 'Recipient refused' for index, payload in enumerate(payloads) if payload['index'] % 2
+        })
+
+    def test_due_jobs_are_run_by_batches_then_deleted(self):
+        for index in range(3):
+            enqueue('tests.record', {'index': index})
+        enqueue('tests.record', {'index': 'later'}, delay=timedelta(hours=1))
+
+        self.assertEqual(run_due_jobs(batch_size=2), 2)
+        self.assertEqual(run_due_jobs(batch_size=2), 1)
+        self.assertEqual(run_due_jobs(batch_size=2), 0)
+
+        self.assertEqual(self.handled_batches, [[{'index': 0}, {'index': 1}], [{'index': 2}]])
+        self.assertEqual(list(Job.objects.values_list('payload', flat=True)), [{'index': 'later'}])
+
+    def test_failed_jobs_are_retried_with_an_exponential_backoff(self):
+        job = enqueue('tests.fail', {}, max_attempts=3)
+
+        delays = []
+        for _ in range(2):
+            before_run = timezone.now()
+            with self.assertLogs('ludigestion.jobs', level='ERROR'):
+                run_due_jobs()
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.Status.PENDING)
+            self.assertIn('SMTP server unreachable', job.last_error)
+            delays.append(job.run_after - before_run)
+            Job.objects.update(run_after=timezone.now())
+
+        with self.assertLogs('ludigestion.jobs', level='ERROR') as logs:
+            run_due_jobs()
+        job.refresh_from_db()
+
+        self.assertEqual(logs.output[0].splitlines()[0], 'ERROR:ludigestion.jobs:1 tests.fail jobs failed')
+        self.assertEqual(self.failures, 3)
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(run_due_jobs(), 0)
+        self.assertGreaterEqual(delays[0], timedelta(seconds=30))
+        self.assertGreaterEqual(delays[1], timedelta(seconds=60))
+        self.assertLess(delays[1], timedelta(seconds=61))
+
+    def test_only_the_failed_jobs_of_a_partially_failed_batch_are_retried(self):
+        for index in range(4):
+            enqueue('tests.fail_odd', {'index': index})
+
+        with self.assertLogs('ludigestion.jobs', level='ERROR') as logs:
+            self.assertEqual(run_due_jobs(), 4)
+
+        self.assertEqual(logs.output, ['ERROR:ludigestion.jobs:2 of 4 tests.fail_odd jobs failed'])
+        self.assertEqual(
+            sorted(Job.objects.values_list('payload__index', 'status', 'last_error')),
+            [(1, Job.Status.PENDING, 'Recipient refused'), (3, Job.Status.PENDING, 'Recipient refused')],
+        )
+
+    def test_jobs_claimed_again_by_another_worker_are_left_to_it(self):
+        enqueue('tests.record', {'index': 0})
+        enqueue('tests.fail', {'index': 1})
+        expired_jobs = claim_jobs()
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        reclaimed_jobs = claim_jobs()
+
+        with self.assertLogs('ludigestion.jobs', level='ERROR'):
+            run_jobs(expired_jobs)
+
+        self.assertEqual(
+            sorted(Job.objects.values_list('locked_by', 'status')),
+            [(reclaimed_jobs[0].locked_by, Job.Status.RUNNING)] * 2,
+        )
+
+    def test_jobs_of_a_crashed_worker_are_claimed_again(self):
+        job = enqueue('tests.record', {'index': 0})
+        self.assertEqual(claim_jobs(), [job])
+        self.assertEqual(claim_jobs(), [])
+
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(run_due_jobs(), 1)
+        self.assertEqual(self.handled_batches, [[{'index': 0}]])
+
+    def test_jobs_are_enqueued_once_the_transaction_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            enqueue_on_commit('tests.record', {'index': 0})
+            self.assertFalse(Job.objects.exists())
+        for callback in callbacks:
+            callback()
+
+        self.assertTrue(Job.objects.exists())
+
+    def test_unknown_jobs_are_refused(self):
+        with self.assertRaises(UnknownJob):
+            enqueue('tests.unknown', {})
+
+
+class TestRunWorker(TransactionTestCase):
+    def setUp(self) -> None:
+        self.handled_payloads = []
+        self.lock = threading.Lock()
+        handlers = patch.dict(JOB_HANDLERS, {'tests.record': self.record})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def record(self, payloads: list[dict]) -> None:
+        with self.lock:
+            self.handled_payloads.extend(payloads)
+
+    def test_pool_runs_every_job_once(self):
+        for index in range(40):
+            enqueue('tests.record', {'index': index})
+        output = StringIO()
+
+        # The in-memory test database fails on concurrent writes instead of waiting for its lock,
+        # the batches are serialized here: claim_jobs covers the concurrent claims.
+        database_lock = threading.Lock()
+
+        def run_due_jobs_serialized(batch_size):
+            with database_lock:
+                return run_due_jobs(batch_size)
+
+        with patch('common.management.commands.run_worker.run_due_jobs', run_due_jobs_serialized):
+            call_command('run_worker', concurrency=4, batch_size=3, once=True, poll_interval=0.01, stdout=output)
+
+        self.assertIn('Ran 40 jobs', output.getvalue())
+        self.assertEqual(sorted(payload['index'] for payload in self.handled_payloads), list(range(40)))
+        self.assertFalse(Job.objects.exists())
+
+    def test_rejects_an_empty_pool(self):
+        with self.assertRaises(CommandError):
+            call_command('run_worker', concurrency=0, stdout=StringIO())
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import search_users
+
+app_name = 'common'
+
+urlpatterns = [
+    path('search/', search_users, name='search-users'),
+]
@@ -1,3 +1,70 @@
-from django.shortcuts import render
+import string
 
-# Create your views here.
+from django.contrib.auth.decorators import login_required
+from django.db.models import Q, QuerySet
+from django.db.models.functions import Lower
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from django.views.generic import ListView
+
+from .models import User
+from .search import FullTextIndex
+
+USER_SEARCH_FIELDS = ('username', 'first_name', 'last_name')
+USER_SEARCH_LIMIT = 10
+USER_SEARCH_MAX_LIMIT = 50
+# Greater than any character, so that `prefix <= value < prefix + PREFIX_UPPER_BOUND` matches every value starting with prefix.
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+# SQLite LOWER() only folds the ASCII letters, prefixes are folded the same way to compare with the indexed values.
+ASCII_LOWERCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def users_matching_prefix(prefix: str, limit: int) -> QuerySet:
+    """
+    Active users whose username, first name or last name starts with `prefix`, case-insensitively.
+    Each prefix is matched as a range on the lowercased column so that it runs off the functional indexes of the user table.
+
+    Non-ASCII letters keep their case in those indexes: the prefix is looked up as typed and with a capital first letter,
+    so that "émi" finds "Émilie", but a non-ASCII capital past the first letter must be typed as such.
+    """
+    prefixes = {prefix.translate(ASCII_LOWERCASE), prefix.capitalize().translate(ASCII_LOWERCASE)}
+    condition = Q()
+    for field in USER_SEARCH_FIELDS:
+        for folded_prefix in prefixes:
+            condition |= Q(**{f'lower_{field}__gte': folded_prefix, f'lower_{field}__lt': folded_prefix + PREFIX_UPPER_BOUND})
+    return User.objects.alias(**{
+        f'lower_{field}': Lower(field) for field in USER_SEARCH_FIELDS
+    }).filter(condition, is_active=True).order_by('username').values('uuid', *USER_SEARCH_FIELDS)[:limit]
+
+
+@require_GET
+@login_required
+def search_users(request):
+    prefix = request.GET.get('q', '').strip()
+    try:
+        limit = min(int(request.GET.get('limit', USER_SEARCH_LIMIT)), USER_SEARCH_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    if limit < 1:
+        return JsonResponse({'error': 'limit must be positive'}, status=400)
+
+    results = list(users_matching_prefix(prefix, limit)) if prefix else []
+    return JsonResponse({'results': results})
+
+
+class FullTextSearchView(ListView):
+    """
+    ListView of the objects of `search_index` best matching the `q` GET parameter.
+    """
+    search_index: FullTextIndex
+
+    def get_search_text(self) -> str:
+        return self.request.GET.get('q', '').strip()
+
+    def get_queryset(self):
+        return self.search_index.search(self.get_search_text())
+
+    def get_context_data(self, **kwargs):
+        return {**super().get_context_data(**kwargs), 'search_text': self.get_search_text()}
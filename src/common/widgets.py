@@ -0,0 +1,37 @@
+from django import forms
+from django.urls import reverse
+
+
+class UserAutocompleteWidget(forms.Widget):
+    """
+    Search input suggesting users lazily from the users search endpoint, submitting the primary key of the picked user.
+    Unlike a select, it renders without loading any user.
+    """
+    template_name = 'common/widgets/user_autocomplete.html'
+
+    class Media:
+        js = ('js/user_autocomplete.js',)
+
+    def __init__(self, attrs=None):
+        super().__init__(attrs)
+        self.search_text = ''
+
+    def value_from_datadict(self, data, files, name):
+        # The search text is posted along the primary key, to show it again when the form is rendered back with errors.
+        # Fields deep copy their widget for every form, so it does not leak between forms.
+        self.search_text = data.get(self.search_name(name), '')
+        return super().value_from_datadict(data, files, name)
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['search_url'] = reverse('common:search-users')
+        context['widget']['search_name'] = self.search_name(name)
+        context['widget']['search_text'] = self.search_text
+        return context
+
+    @staticmethod
+    def search_name(name: str) -> str:
+        return f'{name}_search'
+
+    def id_for_label(self, id_):
+        return f'{id_}_search' if id_ else id_
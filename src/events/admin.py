@@ -1,31 +1,111 @@
+from django import forms
 from django.contrib import admin
+from django.db.models import Count
 
-from .models import Event, Candidacy
+from common.admin import PaginatedTabularInline, role_names
 
+from .forms import RolesField
+from .models import Event, Candidacy, CandidacyCandidate
 
-class CandidateInLine(admin.TabularInline):
-    model = Candidacy.candidates.through
+
+class CandidateInLine(PaginatedTabularInline):
+    model = CandidacyCandidate
     verbose_name = 'candidate'
     verbose_name_plural = 'candidates'
-    extra = 0
+    fields = ('candidate', role_names, 'created_at')
+    ordering = ('created_at',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('event', 'candidate')
+
 
 class CandidacyAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'event', 'nb_candidates', 'is_waitlisted', 'created_at')
+    list_filter = ('is_waitlisted',)
+    list_select_related = ('event',)
+    autocomplete_fields = ('event',)
     inlines = [
         CandidateInLine,
     ]
 
+    def get_readonly_fields(self, request, obj=None):
+        # Its candidates are denormalised on the event, and hold its seats.
+        return ('event',) if obj is not None else ()
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(nb_candidates=Count('detailed_candidates')).prefetch_related('candidates')
+
+    @admin.display(description='candidates', ordering='nb_candidates')
+    def nb_candidates(self, candidacy: Candidacy) -> int:
+        return candidacy.nb_candidates
+
 admin.site.register(Candidacy, CandidacyAdmin)
 
 
-class CandidacyInline(admin.TabularInline):
+class CandidacyCandidateAdminForm(forms.ModelForm):
+    roles = RolesField()
+
+    class Meta:
+        model = CandidacyCandidate
+        fields = ('candidate', 'roles')
+
+
+class CandidacyCandidateAdmin(admin.ModelAdmin):
+    """
+    Candidates are added and removed with their candidacy, which keeps the seats of the event in step.
+    """
+    form = CandidacyCandidateAdminForm
+    list_display = ('__str__', 'candidate', 'event', role_names)
+    list_select_related = ('event', 'candidate')
+    fields = ('candidacy', 'event', 'candidate', 'roles')
+    readonly_fields = ('candidacy', 'event')
+    autocomplete_fields = ('candidate',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+admin.site.register(CandidacyCandidate, CandidacyCandidateAdmin)
+
+
+class CandidacyInline(PaginatedTabularInline):
     model = Candidacy
     verbose_name = 'candidacy'
     verbose_name_plural = 'candidacies'
-    extra = 0
+    fields = ('candidate_names', 'nb_candidates', 'created_at')
+    ordering = ('created_at',)
+
+    def get_queryset(self, request):
+        return (
+            super().get_queryset(request)
+            .select_related('event')
+            .annotate(nb_candidates=Count('detailed_candidates'))
+            .prefetch_related('candidates')
+        )
+
+    @admin.display(description='candidates')
+    def candidate_names(self, candidacy: Candidacy) -> str:
+        return ', '.join(candidate.username for candidate in candidacy.candidates.all())
+
+    @admin.display(description='size')
+    def nb_candidates(self, candidacy: Candidacy) -> int:
+        return candidacy.nb_candidates
 
 
 class EventAdmin(admin.ModelAdmin):
+    list_display = ('name', 'date_and_time', 'location', 'seats_taken', 'max_participants', 'nb_candidacies')
+    search_fields = ('name', 'location')
+    ordering = ('-date_and_time',)
     inlines = [CandidacyInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(nb_candidacies=Count('candidacies'))
+
+    @admin.display(description='candidacies', ordering='nb_candidacies')
+    def nb_candidacies(self, event: Event) -> int:
+        return event.nb_candidacies
+
 
 admin.site.register(Event, EventAdmin)
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from .views import candidacies, events
+
+app_name = 'api'
+
+urlpatterns = [
+    path('events/', events, name='events'),
+    path('candidacies/', candidacies, name='candidacies'),
+]
@@ -0,0 +1,156 @@
+import json
+from itertools import groupby
+from uuid import UUID
+
+from django.contrib.auth.decorators import login_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
+
+from events.core import Role
+from events.models import Event, Candidacy, CandidacyCandidate
+
+CHUNK_SIZE = 2000
+EVENT_FIELDS = (
+    'uuid',
+    'name',
+    'description',
+    'date_and_time',
+    'location',
+    'max_participants',
+    'seats_taken',
+    'created_at',
+    'updated_at',
+)
+CANDIDACY_FIELDS = ('uuid', 'event', 'is_waitlisted', 'created_at', 'updated_at', 'candidates')
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def parse_since(request):
+    since = request.GET.get('since')
+    if not since:
+        return None
+    parsed_since = parse_datetime(since)
+    if parsed_since is None:
+        raise InvalidQuery(f'Invalid since datetime: {since}')
+    if timezone.is_naive(parsed_since):
+        parsed_since = timezone.make_aware(parsed_since)
+    return parsed_since
+
+
+def parse_event(request):
+    event = request.GET.get('event')
+    if not event:
+        return None
+    try:
+        return UUID(event)
+    except ValueError:
+        raise InvalidQuery(f'Invalid event uuid: {event}')
+
+
+def parse_fields(request, allowed_fields: tuple[str, ...]) -> tuple[str, ...]:
+    fields = request.GET.get('fields')
+    if not fields:
+        return allowed_fields
+    requested_fields = tuple(field.strip() for field in fields.split(',') if field.strip())
+    unknown_fields = set(requested_fields) - set(allowed_fields)
+    if unknown_fields:
+        raise InvalidQuery(f'Unknown fields: {", ".join(sorted(unknown_fields))}')
+    return requested_fields
+
+
+def stream_json_array(items):
+    yield '['
+    for index, item in enumerate(items):
+        yield (',' if index else '') + json.dumps(item, cls=DjangoJSONEncoder)
+    yield ']'
+
+
+def streaming_json_response(items) -> StreamingHttpResponse:
+    return StreamingHttpResponse(stream_json_array(items), content_type='application/json')
+
+
+@require_GET
+@login_required
+def events(request):
+    """
+    Stream every event as a JSON array, ordered by date.
+    Query parameters: `since` (only the events updated since this ISO datetime) and `fields` (comma separated).
+    """
+    try:
+        since = parse_since(request)
+        fields = parse_fields(request, EVENT_FIELDS)
+    except InvalidQuery as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    queryset = Event.objects.order_by('date_and_time', 'uuid')
+    if since:
+        queryset = queryset.filter(updated_at__gte=since)
+
+    return streaming_json_response(queryset.values(*fields).iterator(chunk_size=CHUNK_SIZE))
+
+
+@require_GET
+@login_required
+def candidacies(request):
+    """
+    Stream every candidacy with the role wishes of its candidates as a JSON array, waitlisted ones flagged by `is_waitlisted`.
+    Query parameters: `event` (event uuid), `since` (only the candidacies or wishes updated since this ISO datetime)
+    and `fields` (comma separated).
+    """
+    try:
+        event = parse_event(request)
+        since = parse_since(request)
+        fields = parse_fields(request, CANDIDACY_FIELDS)
+    except InvalidQuery as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    candidacies = Candidacy.objects.all()
+    if event:
+        candidacies = candidacies.filter(event=event)
+    if since:
+        candidacies = candidacies.filter(Q(updated_at__gte=since) | Q(detailed_candidates__updated_at__gte=since))
+
+    # One row per candidate, ordered by candidacy, regrouped on the fly to keep a flat memory usage.
+    rows = CandidacyCandidate.objects.filter(
+        candidacy__in=candidacies.values('pk'),
+    ).order_by('candidacy__created_at', 'candidacy', 'created_at').values(
+        'candidacy',
+        'event',
+        'candidacy__is_waitlisted',
+        'candidacy__created_at',
+        'candidacy__updated_at',
+        'candidate__username',
+        'roles',
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+    return streaming_json_response(
+        serialize_candidacy(candidacy_rows, fields)
+        for _, candidacy_rows in groupby(rows, key=lambda row: row['candidacy'])
+    )
+
+
+def serialize_candidacy(candidacy_rows, fields: tuple[str, ...]) -> dict:
+    candidacy_rows = list(candidacy_rows)
+    first_row = candidacy_rows[0]
+    candidacy = {
+        'uuid': first_row['candidacy'],
+        'event': first_row['event'],
+        # Waitlisted candidacies hold no seat yet.
+        'is_waitlisted': first_row['candidacy__is_waitlisted'],
+        'created_at': first_row['candidacy__created_at'],
+        'updated_at': first_row['candidacy__updated_at'],
+        'candidates': [
+            {
+                'username': row['candidate__username'],
+                **Role.wishes(row['roles']),
+            } for row in candidacy_rows
+        ],
+    }
+    return {field: candidacy[field] for field in fields}
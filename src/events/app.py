@@ -1,13 +1,104 @@
-from .models import Event, Candidacy
-from .core import CandidateCandidacyRequest
+from collections import defaultdict
+
+from django.db import transaction
+
+from common.models import User
+from .models import Event, Candidacy, CandidacyCandidate
+from .core import CandidateCandidacyRequest, UserCandidacy, UserCandidacyIndex
+from .notifications import (
+    notify_cancelled_candidacy_on_commit, notify_registered_candidacies_on_commit, notify_registered_candidacy_on_commit,
+)
+
+CANDIDACIES_BATCH_SIZE = 100
 
 
 def register_new_candidacy(
     event: Event,
     candidate_candidacy_requests: list[CandidateCandidacyRequest],
-) -> None:
-    Candidacy.from_event_and_candidate_candidacy_requests(event, candidate_candidacy_requests)
+    waitlist_when_full: bool = False,
+) -> Candidacy:
+    candidacy = Candidacy.from_event_and_candidate_candidacy_requests(
+        event, candidate_candidacy_requests, waitlist_when_full=waitlist_when_full,
+    )
+    notify_registered_candidacy_on_commit(candidacy)
+    return candidacy
+
 
+def register_new_candidacies(
+    events_and_candidate_candidacy_requests: list[tuple[Event, list[CandidateCandidacyRequest]]],
+    batch_size: int = CANDIDACIES_BATCH_SIZE,
+) -> list[Candidacy]:
+    """
+    Register many candidacies at once, one transaction per batch of `batch_size` candidacies.
+    A batch is written entirely or not at all.
+    """
+    if batch_size < 1:
+        raise ValueError('The batch size must be a positive integer')
 
+    candidacies = []
+    for batch_start in range(0, len(events_and_candidate_candidacy_requests), batch_size):
+        batch = events_and_candidate_candidacy_requests[batch_start:batch_start + batch_size]
+        batch_candidacies = Candidacy.from_events_and_candidate_candidacy_requests(batch)
+        notify_registered_candidacies_on_commit(batch_candidacies)
+        candidacies.extend(batch_candidacies)
+    return candidacies
+
+
+@transaction.atomic()
 def remove_candidacy(candidacy: Candidacy) -> None:
+    """
+    Delete the candidacy. Its candidates deletion gives the free seats to the waitlist of its event,
+    once for the whole group, see `release_deleted_candidacy_seats`.
+    """
+    candidate_pks = list(candidacy.detailed_candidates.values_list('candidate', flat=True))
     candidacy.delete()
+    notify_cancelled_candidacy_on_commit(candidacy.event_id, candidate_pks)
+
+
+def find_registered_candidates(event: Event, candidates: list[User]) -> set:
+    """
+    Return the primary keys of the given candidates already holding a candidacy on the event.
+    """
+    return set(CandidacyCandidate.objects.filter(event=event, candidate__in=candidates).values_list('candidate', flat=True))
+
+
+def build_user_candidacy_index(user: User, event_pks) -> UserCandidacyIndex:
+    """
+    Index the candidacies of `user` on the given events, fetching every candidate of those candidacies in one query.
+    """
+    event_pks = list(event_pks)
+    if not event_pks or not user.is_authenticated:
+        return UserCandidacyIndex(candidacies_by_event={})
+
+    user_candidacies = Candidacy.objects.filter(event__in=event_pks, candidates=user).values('pk')
+    detailed_candidates = CandidacyCandidate.objects.filter(
+        candidacy__in=user_candidacies,
+    ).select_related('candidacy', 'candidate').order_by('candidacy__created_at', 'created_at')
+
+    detailed_candidates_by_candidacy = defaultdict(list)
+    for detailed_candidate in detailed_candidates:
+        detailed_candidates_by_candidacy[detailed_candidate.candidacy].append(detailed_candidate)
+
+    candidacies_by_event = defaultdict(list)
+    for candidacy, candidacy_detailed_candidates in detailed_candidates_by_candidacy.items():
+        user_wishes = next(
+            detailed_candidate for detailed_candidate in candidacy_detailed_candidates
+            if detailed_candidate.candidate_id == user.pk
+        )
+        candidacies_by_event[candidacy.event_id].append(UserCandidacy(
+            candidacy_uuid=candidacy.pk,
+            detailed_candidates=tuple(candidacy_detailed_candidates),
+            as_player=user_wishes.player,
+            as_arbiter=user_wishes.arbiter,
+            as_disk_jockey=user_wishes.disk_jockey,
+            as_speaker=user_wishes.speaker,
+            is_waitlisted=candidacy.is_waitlisted,
+        ))
+
+    return UserCandidacyIndex(
+        candidacies_by_event={event_pk: tuple(candidacies) for event_pk, candidacies in candidacies_by_event.items()},
+        solo_candidacy_events=frozenset(
+            event_pk for event_pk, candidacies in candidacies_by_event.items()
+            if any(candidacy.is_solo for candidacy in candidacies)
+        ),
+    )
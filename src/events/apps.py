@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class EventsConfig(AppConfig):
     name = 'events'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # Registers the notification job handlers run by the workers.
+        from . import notifications  # noqa: F401
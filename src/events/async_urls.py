@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import urls
+from .async_views import all_events, register_candidacy, unregister_candidacy
+
+app_name = 'events'
+
+urlpatterns = [
+    path('', all_events, name='all-events'),
+    path('<str:event_uuid>/candidacies/', register_candidacy, name='register-member'),
+    path('<str:event_uuid>/candidacies/<str:candidacy_uuid>/cancel', unregister_candidacy, name='unregister-candidacy'),
+    *urls.urlpatterns,
+]
@@ -0,0 +1,72 @@
+"""
+Async-native versions of the events views, served by ludigestion.async_urls under ASGI.
+
+The locked Django version (4.0) has no async ORM API yet (aget, acreate, async iteration arrived in 4.1),
+so every blocking block (queries, transactions, index building) runs in a single sync_to_async call,
+which is how the async ORM API is implemented in later Django versions.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+
+from common.conditional import add_freshness_headers, get_not_modified_response
+from common.pagination import KeysetPaginator, get_requested_page
+from .app import remove_candidacy
+from .models import Event
+from .views import (
+    AllEventsView, get_events_freshness, get_events_page_context, get_member_candidacy, register_member_candidacy, start_of_today,
+)
+
+
+async def is_authenticated(request) -> bool:
+    # request.user is lazily loaded from the database, resolve it outside of the event loop.
+    return await sync_to_async(lambda: request.user.is_authenticated)()
+
+
+def get_events_page(request) -> dict:
+    paginator = KeysetPaginator(Event.objects.all(), AllEventsView.keyset, AllEventsView.paginate_by)
+    page = get_requested_page(request, paginator, start=start_of_today())
+    return {
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'events': page.object_list,
+        **get_events_page_context(request, page.object_list),
+    }
+
+
+async def all_events(request):
+    if not await is_authenticated(request):
+        return redirect_to_login(request.get_full_path())
+
+    freshness = await sync_to_async(get_events_freshness)(request)
+    response = get_not_modified_response(request, freshness)
+    if response is not None:
+        return response
+
+    context = await sync_to_async(get_events_page)(request)
+    response = TemplateResponse(request, AllEventsView.template_name, context)
+    add_freshness_headers(response, freshness)
+    return response
+
+
+async def register_candidacy(request, event_uuid: str):
+    if request.method != 'POST':
+        raise ValueError('Only POST requests are allowed')
+    if not await is_authenticated(request):
+        return redirect_to_login(request.get_full_path())
+
+    await sync_to_async(register_member_candidacy)(request, event_uuid)
+    return redirect('events:all-events')
+
+
+async def unregister_candidacy(request, event_uuid: str, candidacy_uuid: str):
+    if request.method != 'POST':
+        raise ValueError('Only POST requests are allowed')
+    if not await is_authenticated(request):
+        return redirect_to_login(request.get_full_path())
+
+    candidacy = await sync_to_async(get_member_candidacy)(request, event_uuid, candidacy_uuid)
+    await sync_to_async(remove_candidacy)(candidacy)
+    return redirect('events:all-events')
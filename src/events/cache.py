@@ -0,0 +1,98 @@
+from hashlib import sha256
+from time import time_ns
+
+from django.core.cache import cache
+
+EVENT_FRAGMENT_TIMEOUT = 60 * 60
+FRAGMENT_HITS_KEY = 'events:fragments:hits'
+FRAGMENT_MISSES_KEY = 'events:fragments:misses'
+ALL_EVENTS_VERSION_KEY = 'events:version'
+CANDIDATE_NAMES_VERSION_KEY = 'events:candidate-names:version'
+CALENDAR_TIMEOUT = 24 * 60 * 60
+
+
+def event_version_key(event_pk) -> str:
+    return f'events:{event_pk}:version'
+
+
+def new_version() -> int:
+    # Versions start from the clock so that a version evicted from the cache never comes back
+    # to a value that older fragments were cached with.
+    return time_ns()
+
+
+def get_event_versions(event_pks) -> dict:
+    """
+    Return the current fragment version of each event, as a mapping from event pk to version.
+    """
+    keys = {event_version_key(event_pk): event_pk for event_pk in event_pks}
+    versions = cache.get_many([ALL_EVENTS_VERSION_KEY, *keys])
+
+    missing_versions = {key: new_version() for key in [ALL_EVENTS_VERSION_KEY, *keys] if key not in versions}
+    cache.set_many(missing_versions, timeout=None)
+    versions.update(missing_versions)
+
+    all_events_version = versions[ALL_EVENTS_VERSION_KEY]
+    return {event_pk: f'{all_events_version}.{versions[key]}' for key, event_pk in keys.items()}
+
+
+def bump_event_version(event_pk) -> None:
+    cache.set(event_version_key(event_pk), new_version(), timeout=None)
+
+
+def bump_all_event_versions() -> None:
+    cache.set(ALL_EVENTS_VERSION_KEY, new_version(), timeout=None)
+
+
+def get_candidate_names_version() -> int:
+    """
+    Version of the usernames of the candidates, bumped when one of them is renamed: the events page shows them,
+    but the tables it probes for freshness do not change.
+    """
+    return cache.get_or_set(CANDIDATE_NAMES_VERSION_KEY, new_version, timeout=None)
+
+
+def bump_candidate_names_version() -> None:
+    cache.set(CANDIDATE_NAMES_VERSION_KEY, new_version(), timeout=None)
+
+
+def event_fragment_key(event_pk, version: str, user_pk, csrf_cookie: str) -> str:
+    # The fragment embeds forms with a CSRF token, it is only valid for the CSRF cookie it was rendered with.
+    csrf_digest = sha256(csrf_cookie.encode()).hexdigest()[:16]
+    return f'events:{event_pk}:fragment:{version}:{user_pk}:{csrf_digest}'
+
+
+def calendar_cache_key(user_pk) -> str:
+    return f'events:calendar:{user_pk}'
+
+
+def invalidate_user_calendars(user_pks) -> None:
+    cache.delete_many([calendar_cache_key(user_pk) for user_pk in user_pks])
+
+
+def record_fragment_hit() -> None:
+    _increment(FRAGMENT_HITS_KEY)
+
+
+def record_fragment_miss() -> None:
+    _increment(FRAGMENT_MISSES_KEY)
+
+
+def get_fragment_stats() -> dict[str, int]:
+    stats = cache.get_many([FRAGMENT_HITS_KEY, FRAGMENT_MISSES_KEY])
+    return {
+        'hits': stats.get(FRAGMENT_HITS_KEY, 0),
+        'misses': stats.get(FRAGMENT_MISSES_KEY, 0),
+    }
+
+
+def reset_fragment_stats() -> None:
+    cache.delete_many([FRAGMENT_HITS_KEY, FRAGMENT_MISSES_KEY])
+
+
+def _increment(key: str) -> None:
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
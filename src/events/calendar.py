@@ -0,0 +1,109 @@
+from datetime import datetime
+from hashlib import sha256
+
+from attrs import frozen
+from django.core.cache import cache
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from common.models import User
+from .cache import CALENDAR_TIMEOUT, calendar_cache_key
+from .core import Role
+from .models import CandidacyCandidate
+
+CALENDAR_PRODUCT_ID = '-//Ludi Gestion Toulouse//Candidatures//FR'
+# Content lines are folded past 75 octets (RFC 5545, 3.1).
+MAX_LINE_OCTETS = 75
+
+
+@frozen
+class CalendarFeed:
+    body: str
+    etag: str
+
+
+def get_user_calendar(user: User) -> CalendarFeed:
+    """
+    Calendar feed of the candidacies of `user`, rendered once and cached until one of them changes,
+    see `events.cache.invalidate_user_calendars`.
+    """
+    key = calendar_cache_key(user.pk)
+    feed = cache.get(key)
+    if feed is None:
+        feed = build_user_calendar(user)
+        cache.set(key, feed, timeout=CALENDAR_TIMEOUT)
+    return feed
+
+
+def build_user_calendar(user: User) -> CalendarFeed:
+    """
+    Render the calendar feed of `user` from a single query over its candidacy candidates, their candidacies and events,
+    leaving out the candidacies still on a waitlist.
+    The ETag changes whenever one of those rows is updated, and whenever a row joins or leaves the feed.
+    There is no Last-Modified: the latest update of the remaining rows does not move when a row leaves the feed.
+    """
+    candidacy_candidates = list(
+        CandidacyCandidate.objects.filter(candidate=user, candidacy__is_waitlisted=False)
+        .select_related('event')
+        .annotate(row_updated_at=Greatest('updated_at', 'candidacy__updated_at', 'event__updated_at'))
+        .order_by('event__date_and_time', 'uuid')
+    )
+    last_modified = max((candidacy_candidate.row_updated_at for candidacy_candidate in candidacy_candidates), default=None)
+    fingerprint = f'{user.pk}:{len(candidacy_candidates)}:{last_modified.isoformat() if last_modified else ""}'
+    return CalendarFeed(
+        body=render_calendar(candidacy_candidates, last_modified or timezone.now()),
+        etag=f'"{sha256(fingerprint.encode()).hexdigest()[:32]}"',
+    )
+
+
+def render_calendar(candidacy_candidates: list[CandidacyCandidate], stamp: datetime) -> str:
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{CALENDAR_PRODUCT_ID}',
+        'CALSCALE:GREGORIAN',
+        'X-WR-CALNAME:Mes candidatures',
+    ]
+    for candidacy_candidate in candidacy_candidates:
+        event = candidacy_candidate.event
+        roles = Role.labels(candidacy_candidate.roles)
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:{candidacy_candidate.pk}@ludigestion',
+            f'DTSTAMP:{format_datetime(stamp)}',
+            f'DTSTART:{format_datetime(event.date_and_time)}',
+            f'SUMMARY:{escape_text(event.name)}',
+            f'LOCATION:{escape_text(event.location)}',
+            f'DESCRIPTION:{escape_text(event.description)}\\n\\nRôles : {escape_text(roles)}',
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return ''.join(f'{fold_line(line)}\r\n' for line in lines)
+
+
+def format_datetime(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def escape_text(value: str) -> str:
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def fold_line(line: str) -> str:
+    """
+    Split `line` in chunks of at most 75 octets, without cutting a UTF-8 character, continued by a space.
+    """
+    chunks, chunk, chunk_octets = [], '', 0
+    for character in line:
+        octets = len(character.encode())
+        # Continuation lines start with a space, which counts in their 75 octets.
+        if chunk_octets + octets > MAX_LINE_OCTETS - (1 if chunks else 0):
+            chunks.append(chunk)
+            chunk, chunk_octets = '', 0
+        chunk += character
+        chunk_octets += octets
+    chunks.append(chunk)
+    return '\r\n '.join(chunks)
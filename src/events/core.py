@@ -1,8 +1,51 @@
+from enum import IntFlag
+from uuid import UUID
+
 from attrs import frozen
 
 from common.models import User
 
 
+class Role(IntFlag):
+    """
+    Roles a candidate wishes to take, stored as a bitmask on the candidacy candidates.
+    """
+    PLAYER = 1
+    SPEAKER = 2
+    ARBITER = 4
+    DISK_JOCKEY = 8
+
+    @property
+    def field_name(self) -> str:
+        return self.name.lower()
+
+    def masks(self) -> tuple[int, ...]:
+        """
+        Every roles bitmask including all of these roles, to filter on an indexed `roles IN (...)`.
+        """
+        return tuple(mask for mask in range(sum(Role) + 1) if mask & self == self)
+
+    @classmethod
+    def from_wishes(cls, **wishes: bool) -> "Role":
+        return cls(sum(role for role in cls if wishes.get(role.field_name)))
+
+    @classmethod
+    def wishes(cls, roles: int) -> dict[str, bool]:
+        return {role.field_name: bool(roles & role) for role in cls}
+
+    @classmethod
+    def labels(cls, roles: int) -> str:
+        return ', '.join(label for role, label in ROLE_LABELS.items() if roles & role)
+
+
+ROLE_LABELS = {
+    Role.PLAYER: 'joueur',
+    Role.SPEAKER: 'MC',
+    Role.ARBITER: 'arbitre',
+    Role.DISK_JOCKEY: 'DJ',
+}
+
+
 @frozen
 class CandidateCandidacyRequest:
     candidate: User
@@ -14,3 +57,53 @@ class CandidateCandidacyRequest:
     def __attrs_post_init__(self):
         if not any([self.as_player, self.as_arbiter, self.as_disk_jockey, self.as_speaker]):
             raise ValueError('At least one role is required to create a candidacy request')
+
+    @property
+    def roles(self) -> Role:
+        return Role.from_wishes(
+            player=self.as_player,
+            speaker=self.as_speaker,
+            arbiter=self.as_arbiter,
+            disk_jockey=self.as_disk_jockey,
+        )
+
+
+class EventIsFull(ValueError):
+    pass
+
+
+class CandidateAlreadyRegistered(ValueError):
+    pass
+
+
+@frozen
+class UserCandidacy:
+    """
+    A candidacy of the current user on an event, with the wishes of every candidate of the candidacy.
+    """
+    candidacy_uuid: UUID
+    detailed_candidates: tuple
+    as_player: bool = False
+    as_arbiter: bool = False
+    as_disk_jockey: bool = False
+    as_speaker: bool = False
+    is_waitlisted: bool = False
+
+    @property
+    def is_solo(self) -> bool:
+        return len(self.detailed_candidates) == 1
+
+
+@frozen
+class UserCandidacyIndex:
+    """
+    The candidacies of a user, indexed by event, so that templates only need dictionary lookups.
+    """
+    candidacies_by_event: dict
+    solo_candidacy_events: frozenset = frozenset()
+
+    def candidacies_of(self, event_pk) -> tuple[UserCandidacy, ...]:
+        return self.candidacies_by_event.get(event_pk, ())
+
+    def is_candidating_alone(self, event_pk) -> bool:
+        return event_pk in self.solo_candidacy_events
@@ -1,6 +1,10 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.utils.functional import cached_property
 
 from common.models import User
+from common.widgets import UserAutocompleteWidget
+from .core import ROLE_LABELS, Role
 
 
 class MainCandidacyForm(forms.Form):
@@ -16,7 +20,107 @@ class MainCandidacyForm(forms.Form):
         return cleaned_data
 
 
+class CandidateChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField picking its user among `resolved_users` when the formset fetched them beforehand,
+    instead of running a query per form.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.resolved_users = None
+
+    def to_python(self, value):
+        if self.resolved_users is None or value in self.empty_values:
+            return super().to_python(value)
+        try:
+            return self.resolved_users[User._meta.pk.to_python(value)]
+        except (KeyError, ValidationError):
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+
+
 class IndividualCandidacyForm(MainCandidacyForm):
-    candidate = forms.ModelChoiceField(queryset=User.objects.all(), label='Candidat ?=>')
+    candidate = CandidateChoiceField(queryset=User.objects.all(), label='Candidat ?=>', widget=UserAutocompleteWidget)
+
+
+class BaseGroupCandidacyFormSet(forms.BaseFormSet):
+    """
+    Co-candidates of a group candidacy.
+    Once bound, only the submitted rows are built, and their candidates are fetched with a single query.
+    """
+
+    def __init__(self, *args, main_candidate: User | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.main_candidate = main_candidate
+
+    def submitted_form_indexes(self) -> list[int]:
+        # Browsers post the hidden and text inputs of the untouched rows too, empty.
+        submitted_prefixes = {key.rpartition('-')[0] for key, value in self.data.items() if value}
+        return [index for index in range(self.total_form_count()) if self.add_prefix(index) in submitted_prefixes]
+
+    @cached_property
+    def forms(self):
+        if not self.is_bound:
+            return super().forms
+
+        indexes = self.submitted_form_indexes()
+        forms = [self._construct_form(index, **self.get_form_kwargs(index)) for index in indexes]
+        users_by_pk = self.resolve_candidates(forms)
+        for form in forms:
+            form.fields['candidate'].resolved_users = users_by_pk
+        return forms
+
+    @staticmethod
+    def resolve_candidates(forms) -> dict:
+        candidate_pks = set()
+        for form in forms:
+            try:
+                candidate_pks.add(User._meta.pk.to_python(form['candidate'].data))
+            except ValidationError:
+                pass
+        candidate_pks.discard(None)
+        return User.objects.in_bulk(candidate_pks) if candidate_pks else {}
+
+    def clean(self):
+        seen_candidates = {self.main_candidate.pk} if self.main_candidate else set()
+        for form in self.forms:
+            candidate = form.cleaned_data.get('candidate')
+            if candidate is None:
+                continue
+            if candidate.pk in seen_candidates:
+                form.add_error('candidate', 'Candidat sélectionné plusieurs fois')
+            seen_candidates.add(candidate.pk)
+
+
+GroupCandidacyFormSet = forms.formset_factory(IndividualCandidacyForm, formset=BaseGroupCandidacyFormSet, extra=10)
+
+
+class RolesField(forms.TypedMultipleChoiceField):
+    """
+    Roles bitmask edited as one checkbox per role, at least one of them.
+    """
+    widget = forms.CheckboxSelectMultiple
+
+    def __init__(self, **kwargs):
+        super().__init__(choices=[(role.value, label) for role, label in ROLE_LABELS.items()], coerce=int, **kwargs)
+
+    def prepare_value(self, value):
+        if isinstance(value, int):
+            return [role.value for role in Role if value & role]
+        return value
+
+    def has_changed(self, initial, data):
+        return super().has_changed(self.prepare_value(initial), data)
+
+    def clean(self, value):
+        return sum(super().clean(value))
+
+
+class LineupTargetsForm(forms.Form):
+    player = forms.IntegerField(label='Joueurs', min_value=0, initial=0, required=False)
+    speaker = forms.IntegerField(label='MC', min_value=0, initial=0, required=False)
+    arbiter = forms.IntegerField(label='Arbitres', min_value=0, initial=0, required=False)
+    disk_jockey = forms.IntegerField(label='DJ', min_value=0, initial=0, required=False)
 
-GroupCandidacyFormSet = forms.formset_factory(IndividualCandidacyForm, extra=10)
+    def targets(self) -> dict:
+        return {role: target or 0 for role, target in self.cleaned_data.items()}
@@ -0,0 +1,412 @@
+"""
+Lineup engine: select which candidacies play an event.
+
+Each candidacy is selected as a whole or not at all, within the event seats (`max_participants`).
+The selection first maximises the number of role slots filled among the targets (players, speakers,
+arbiters, DJs), each selected candidate filling at most one slot of a role they wished for; then the
+number of participants; then the earliest sign-ups.
+
+Filled slots are a max flow from the candidates to the roles. With four roles it is computed with the
+min cut formula over the 16 subsets of roles, maintained incrementally as candidates come and go:
+
+    filled slots = min over role subsets A of (targets of A + candidates wishing a role outside of A)
+
+This coverage is submodular, so candidacies are first picked with a lazy greedy on filled slots per
+seat (and, separately, on filled slots per candidacy, the best of both being kept), the remaining
+seats are then filled with a subset sum over the candidacy sizes, and 1-for-1 swaps repair the
+knapsack effects of the greedy.
+"""
+import heapq
+from collections import defaultdict, deque
+from itertools import count, islice
+
+from attrs import field, frozen
+
+from .core import Role
+from .models import Event, CandidacyCandidate
+
+ROLES = CandidacyCandidate.ROLES
+ROLE_BITS = {role.field_name: role.value for role in Role}
+ROLE_SUBSETS = range(1 << len(ROLES))
+MAX_SWAP_EVALUATIONS = 20000
+
+
+@frozen
+class LineupMember:
+    user_pk: object
+    username: str
+    roles: frozenset
+    # Same bitmask as CandidacyCandidate.roles.
+    wishes_mask: int = field(init=False, eq=False, repr=False)
+
+    @wishes_mask.default
+    def _wishes_mask(self) -> int:
+        return sum(ROLE_BITS[role] for role in self.roles)
+
+
+@frozen
+class LineupCandidacy:
+    uuid: object
+    members: tuple[LineupMember, ...]
+    # For each subset of roles, how many members wish a role outside of it.
+    wishing_outside: tuple[int, ...] = field(init=False, eq=False, repr=False)
+
+    @wishing_outside.default
+    def _wishing_outside(self) -> tuple[int, ...]:
+        return tuple(
+            sum(1 for member in self.members if member.wishes_mask & ~subset)
+            for subset in ROLE_SUBSETS
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+
+@frozen
+class Lineup:
+    candidacies: tuple[LineupCandidacy, ...]
+    assignments: tuple[tuple[LineupMember, str | None], ...]
+    targets: dict
+    filled: dict
+    max_participants: int
+
+    @property
+    def participants(self) -> int:
+        return len(self.assignments)
+
+    @property
+    def filled_slots(self) -> int:
+        return sum(self.filled.values())
+
+    @property
+    def missing(self) -> dict:
+        return {role: self.targets[role] - self.filled[role] for role in ROLES}
+
+    @property
+    def candidacy_assignments(self) -> list[tuple[LineupCandidacy, tuple[tuple[LineupMember, str | None], ...]]]:
+        """
+        The selected candidacies with the roles assigned to their members.
+        """
+        assignments = iter(self.assignments)
+        return [
+            (candidacy, tuple(next(assignments) for _ in candidacy.members))
+            for candidacy in self.candidacies
+        ]
+
+    @property
+    def role_summaries(self) -> list[tuple[str, int, int, int]]:
+        """
+        (role, target, filled, missing) for each role.
+        """
+        return [(role, self.targets[role], self.filled[role], self.missing[role]) for role in ROLES]
+
+
+class Coverage:
+    """
+    Number of target role slots the selected candidates can fill, maintained incrementally.
+    """
+
+    def __init__(self, targets: dict):
+        self.targets_of_subset = tuple(
+            sum(targets.get(role, 0) for role, bit in ROLE_BITS.items() if subset & bit)
+            for subset in ROLE_SUBSETS
+        )
+        self.wishing_outside = [0] * len(ROLE_SUBSETS)
+
+    @property
+    def total_slots(self) -> int:
+        return self.targets_of_subset[-1]
+
+    def value(self, added: LineupCandidacy | None = None, removed: LineupCandidacy | None = None) -> int:
+        cuts = map(sum, zip(self.targets_of_subset, self.wishing_outside))
+        if added is not None:
+            cuts = map(sum, zip(cuts, added.wishing_outside))
+        if removed is not None:
+            cuts = (cut - removed_count for cut, removed_count in zip(cuts, removed.wishing_outside))
+        return min(cuts)
+
+    def add(self, candidacy: LineupCandidacy) -> None:
+        self.wishing_outside = [count + added for count, added in zip(self.wishing_outside, candidacy.wishing_outside)]
+
+    def remove(self, candidacy: LineupCandidacy) -> None:
+        self.wishing_outside = [count - removed for count, removed in zip(self.wishing_outside, candidacy.wishing_outside)]
+
+
+class LineupSolver:
+    """
+    Greedy-with-repair selection of the candidacies of a lineup.
+    The greedy either picks the candidacies filling the most slots per seat (`per_seat`), or the most slots.
+    """
+
+    def __init__(self, candidacies: list[LineupCandidacy], max_participants: int, targets: dict, per_seat: bool = True):
+        self.candidacies = candidacies
+        self.max_participants = max_participants
+        self.targets = targets
+        self.per_seat = per_seat
+        self.coverage = Coverage(targets)
+        self.selected = set()
+        self.selected_users = set()
+        self.seats_left = max_participants
+
+    def solve(self) -> Lineup:
+        self.select_greedily()
+        self.fill_remaining_seats()
+        if self.repair():
+            self.fill_remaining_seats()
+        return self.lineup()
+
+    def fits(self, index: int, freed_index: int | None = None) -> bool:
+        candidacy = self.candidacies[index]
+        seats_left = self.seats_left
+        selected_users = self.selected_users
+        if freed_index is not None:
+            freed_candidacy = self.candidacies[freed_index]
+            seats_left += freed_candidacy.size
+            selected_users = selected_users - {member.user_pk for member in freed_candidacy.members}
+        return candidacy.size <= seats_left and not any(member.user_pk in selected_users for member in candidacy.members)
+
+    def select(self, index: int) -> None:
+        candidacy = self.candidacies[index]
+        self.selected.add(index)
+        self.selected_users.update(member.user_pk for member in candidacy.members)
+        self.seats_left -= candidacy.size
+        self.coverage.add(candidacy)
+
+    def unselect(self, index: int) -> None:
+        candidacy = self.candidacies[index]
+        self.selected.remove(index)
+        self.selected_users.difference_update(member.user_pk for member in candidacy.members)
+        self.seats_left += candidacy.size
+        self.coverage.remove(candidacy)
+
+    def priority(self, gain: int, index: int) -> tuple:
+        size = self.candidacies[index].size
+        return (-gain / size, index) if self.per_seat else (-gain, size, index)
+
+    def select_greedily(self) -> None:
+        # Gains only decrease as candidates get selected: stale heap entries are re-evaluated when popped.
+        current = self.coverage.value()
+        heap = []
+        for index, candidacy in enumerate(self.candidacies):
+            if 0 < candidacy.size <= self.max_participants:
+                gain = self.coverage.value(added=candidacy) - current
+                if gain > 0:
+                    heap.append((self.priority(gain, index), gain))
+        heapq.heapify(heap)
+
+        while heap and self.seats_left:
+            priority, stale_gain = heapq.heappop(heap)
+            index = priority[-1]
+            if not self.fits(index):
+                continue
+            gain = self.coverage.value(added=self.candidacies[index]) - current
+            if gain <= 0:
+                continue
+            if gain != stale_gain and heap and self.priority(gain, index) > heap[0][0]:
+                heapq.heappush(heap, (self.priority(gain, index), gain))
+                continue
+            self.select(index)
+            current += gain
+
+    def fill_remaining_seats(self) -> None:
+        """
+        Fill as many of the remaining seats as possible (subset sum over the candidacy sizes), preferring the earliest sign-ups.
+        Adding candidates never empties a role slot, so the filled slots are kept.
+        """
+        free = [index for index in range(len(self.candidacies)) if index not in self.selected and self.candidacies[index].size and self.fits(index)]
+        seats_mask = (1 << self.seats_left + 1) - 1
+        # reachable[position] has bit n set when n seats can be taken by the candidacies free[:position].
+        reachable = [1]
+        for index in free:
+            reachable.append((reachable[-1] | reachable[-1] << self.candidacies[index].size) & seats_mask)
+
+        seats = reachable[-1].bit_length() - 1
+        chosen = []
+        for position in reversed(range(len(free))):
+            if not reachable[position] >> seats & 1:
+                chosen.append(free[position])
+                seats -= self.candidacies[free[position]].size
+        for index in reversed(chosen):
+            if self.fits(index):
+                self.select(index)
+
+        # A candidate signed up in several candidacies can only be selected once, fill what such conflicts left.
+        for index in free:
+            if not self.seats_left:
+                return
+            if index not in self.selected and self.fits(index):
+                self.select(index)
+
+    def repair(self) -> bool:
+        """
+        Swap a selected candidacy for an unselected one while it fills more role slots, or as many slots with more participants.
+        Return whether any swap was made.
+        """
+        evaluations = count()
+        repaired = False
+        improved = True
+        while improved:
+            improved = False
+            current = (self.coverage.value(), self.max_participants - self.seats_left)
+            for added_index, added in enumerate(self.candidacies):
+                if current[0] == self.coverage.total_slots:
+                    return repaired
+                if added_index in self.selected or not added.size:
+                    continue
+                if self.coverage.value(added=added) <= current[0]:
+                    # Removing candidates never fills more slots: a candidacy filling none on top of the lineup is not worth a swap.
+                    continue
+                for removed_index in sorted(self.selected):
+                    if next(evaluations) >= MAX_SWAP_EVALUATIONS:
+                        return repaired
+                    if not self.fits(added_index, freed_index=removed_index):
+                        continue
+                    removed = self.candidacies[removed_index]
+                    swapped = (
+                        self.coverage.value(added=added, removed=removed),
+                        current[1] + added.size - removed.size,
+                    )
+                    if swapped > current:
+                        self.unselect(removed_index)
+                        self.select(added_index)
+                        current = swapped
+                        repaired = improved = True
+                        break
+        return repaired
+
+    def lineup(self) -> Lineup:
+        candidacies = tuple(self.candidacies[index] for index in sorted(self.selected))
+        members = [member for candidacy in candidacies for member in candidacy.members]
+        assignments = assign_roles(members, self.targets)
+        filled = {role: 0 for role in ROLES}
+        for role, fills_slot in assignments:
+            if fills_slot:
+                filled[role] += 1
+        return Lineup(
+            candidacies=candidacies,
+            assignments=tuple((member, role) for member, (role, _) in zip(members, assignments)),
+            targets={role: self.targets.get(role, 0) for role in ROLES},
+            filled=filled,
+            max_participants=self.max_participants,
+        )
+
+
+def assign_roles(members: list[LineupMember], targets: dict) -> list[tuple[str | None, bool]]:
+    """
+    Assign each member to a role they wished for, filling as many target slots as possible.
+    Return, for each member, the assigned role and whether it fills a target slot.
+    Members who wished for no role, e.g. edited so from the admin, still take their seat but are assigned None.
+    """
+    indexes_by_mask = defaultdict(list)
+    for index, member in enumerate(members):
+        indexes_by_mask[member.wishes_mask].append(index)
+    flows = role_flows({mask: len(indexes) for mask, indexes in indexes_by_mask.items()}, targets)
+
+    assignments = [None] * len(members)
+    for mask, indexes in indexes_by_mask.items():
+        unassigned = iter(indexes)
+        for role in ROLES:
+            for index in islice(unassigned, flows.get((mask, role), 0)):
+                assignments[index] = (role, True)
+    return [
+        assignment or (next((role for role in ROLES if role in member.roles), None), False)
+        for member, assignment in zip(members, assignments)
+    ]
+
+
+def role_flows(members_by_mask: dict[int, int], targets: dict) -> dict[tuple[int, str], int]:
+    """
+    Max flow from the members, grouped by wishes mask, to the role targets: how many members of each mask fill
+    a slot of each role.
+    The network has at most 16 masks and 4 roles whatever the number of members and slots, so that the augmenting
+    paths (Edmonds-Karp, shortest first) are few and short.
+    """
+    source, sink = 'source', 'sink'
+    capacities = defaultdict(int)
+    # Lists rather than sets, so that ties between roles are always broken the same way.
+    neighbours = defaultdict(list)
+
+    def add_edge(start, end, capacity: int) -> None:
+        if capacity > 0:
+            capacities[start, end] += capacity
+            neighbours[start].append(end)
+            neighbours[end].append(start)
+
+    for mask, nb_members in members_by_mask.items():
+        add_edge(source, mask, nb_members)
+        for role in ROLES:
+            if mask & ROLE_BITS[role]:
+                add_edge(mask, role, nb_members)
+    for role in ROLES:
+        add_edge(role, sink, targets.get(role, 0))
+
+    flows = defaultdict(int)
+    while True:
+        parents = {source: None}
+        queue = deque([source])
+        while queue and sink not in parents:
+            node = queue.popleft()
+            for neighbour in neighbours[node]:
+                if neighbour not in parents and capacities[node, neighbour] > flows[node, neighbour]:
+                    parents[neighbour] = node
+                    queue.append(neighbour)
+        if sink not in parents:
+            break
+
+        path = []
+        node = sink
+        while parents[node] is not None:
+            path.append((parents[node], node))
+            node = parents[node]
+        pushed = min(capacities[edge] - flows[edge] for edge in path)
+        for start, end in path:
+            flows[start, end] += pushed
+            flows[end, start] -= pushed
+
+    return {(mask, role): flows[mask, role] for mask in members_by_mask for role in ROLES if flows[mask, role] > 0}
+
+
+def solve_lineup(candidacies: list[LineupCandidacy], max_participants: int, targets: dict) -> Lineup:
+    """
+    Return the best lineup of the greedy per seat and of the greedy per candidacy, both repaired.
+    The candidacies are expected in sign-up order.
+    """
+    unknown_roles = set(targets) - set(ROLES)
+    if unknown_roles:
+        raise ValueError(f'Unknown roles: {", ".join(sorted(unknown_roles))}')
+    if any(target < 0 for target in targets.values()):
+        raise ValueError('Role targets cannot be negative')
+    if max_participants < 0:
+        raise ValueError('The number of participants cannot be negative')
+
+    lineups = [
+        LineupSolver(candidacies, max_participants, targets, per_seat=per_seat).solve()
+        for per_seat in (True, False)
+    ]
+    return max(lineups, key=lambda lineup: (lineup.filled_slots, lineup.participants))
+
+
+def load_lineup_candidacies(event: Event) -> list[LineupCandidacy]:
+    """
+    Load the candidacies holding seats on an event in sign-up order, from a single query.
+    """
+    rows = CandidacyCandidate.objects.filter(event=event, candidacy__is_waitlisted=False).order_by(
+        'candidacy__created_at', 'candidacy', 'created_at',
+    ).values_list('candidacy', 'candidate', 'candidate__username', 'roles')
+
+    members_by_candidacy = {}
+    for candidacy, user_pk, username, roles in rows:
+        members_by_candidacy.setdefault(candidacy, []).append(LineupMember(
+            user_pk=user_pk,
+            username=username,
+            roles=frozenset(role for role, wished in Role.wishes(roles).items() if wished),
+        ))
+    return [
+        LineupCandidacy(uuid=candidacy, members=tuple(members))
+        for candidacy, members in members_by_candidacy.items()
+    ]
+
+
+def build_event_lineup(event: Event, targets: dict) -> Lineup:
+    return solve_lineup(load_lineup_candidacies(event), event.max_participants, targets)
@@ -0,0 +1,22 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from events.roster import open_roster_csv
+
+
+class Command(BaseCommand):
+    help = 'Export the roster of an event as CSV, one row per candidate of each candidacy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_uuid')
+
+    def handle(self, *args, **options):
+        try:
+            lines = open_roster_csv(options['event_uuid'])
+        except ValidationError:
+            lines = None
+        if lines is None:
+            raise CommandError(f"Event {options['event_uuid']} does not exist")
+
+        for line in lines:
+            self.stdout.write(line, ending='')
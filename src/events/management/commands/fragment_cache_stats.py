@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from events.cache import get_fragment_stats, reset_fragment_stats
+
+
+class Command(BaseCommand):
+    help = 'Display the hit and miss counters of the events page fragment cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after displaying them')
+
+    def handle(self, *args, **options):
+        stats = get_fragment_stats()
+        nb_lookups = stats['hits'] + stats['misses']
+        hit_ratio = stats['hits'] / nb_lookups if nb_lookups else 0
+        self.stdout.write(f"hits: {stats['hits']}, misses: {stats['misses']}, hit ratio: {hit_ratio:.1%}")
+        if options['reset']:
+            reset_fragment_stats()
@@ -0,0 +1,35 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from events.lineup import ROLES, build_event_lineup
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Select the candidacies playing an event, filling its seats and the role targets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_uuid')
+        for role in ROLES:
+            parser.add_argument(f'--{role.replace("_", "-")}s', dest=role, type=int, default=0, help=f'Target number of {role}s')
+
+    def handle(self, *args, **options):
+        try:
+            event = Event.objects.filter(pk=options['event_uuid']).first()
+        except ValidationError:
+            event = None
+        if event is None:
+            raise CommandError(f"Event {options['event_uuid']} does not exist")
+
+        try:
+            lineup = build_event_lineup(event, {role: options[role] for role in ROLES})
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for candidacy, assignments in lineup.candidacy_assignments:
+            self.stdout.write(str(candidacy.uuid))
+            for member, role in assignments:
+                self.stdout.write(f'  {member.username}: {role or "no role"}')
+        for role, target, filled, missing in lineup.role_summaries:
+            self.stdout.write(f'{role}: {filled}/{target}')
+        self.stdout.write(f'participants: {lineup.participants}/{lineup.max_participants}')
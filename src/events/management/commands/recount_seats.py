@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from events.cache import bump_all_event_versions
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Recompute the seats taken on every event from its candidacy candidates'
+
+    def handle(self, *args, **options):
+        nb_events = Event.objects.recount_seats()
+        bump_all_event_versions()
+        self.stdout.write(self.style.SUCCESS(f'Recounted seats of {nb_events} event(s)'))
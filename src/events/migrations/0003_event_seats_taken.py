@@ -0,0 +1,29 @@
+# Generated by Django 4.0.10 on 2026-10-18 15:59
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def recount_seats(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    CandidacyCandidate = apps.get_model('events', 'CandidacyCandidate')
+    seats_taken = CandidacyCandidate.objects.filter(
+        candidacy__event=models.OuterRef('pk'),
+    ).values('candidacy__event').annotate(nb_seats=models.Count('pk')).values('nb_seats')
+    Event.objects.update(seats_taken=Coalesce(models.Subquery(seats_taken), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_candidacycandidate_disk_jockey_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(recount_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.10 on 2026-10-18 16:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_seats_taken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['date_and_time', 'uuid'], name='event_date_and_time_uuid_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:12
+
+from django.db import migrations, models
+
+ROLE_BITS = {'player': 1, 'speaker': 2, 'arbiter': 4, 'disk_jockey': 8}
+
+
+def roles_from_booleans(apps, schema_editor):
+    CandidacyCandidate = apps.get_model('events', 'CandidacyCandidate')
+    CandidacyCandidate.objects.update(roles=sum(
+        models.Case(models.When(**{role: True}, then=models.Value(bit)), default=models.Value(0))
+        for role, bit in ROLE_BITS.items()
+    ))
+
+
+def booleans_from_roles(apps, schema_editor):
+    CandidacyCandidate = apps.get_model('events', 'CandidacyCandidate')
+    CandidacyCandidate.objects.update(**{
+        role: models.Case(
+            models.When(roles__in=[mask for mask in range(16) if mask & bit], then=models.Value(True)),
+            default=models.Value(False),
+        )
+        for role, bit in ROLE_BITS.items()
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_keyset_pagination_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidacycandidate',
+            name='roles',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(roles_from_booleans, booleans_from_roles),
+        migrations.RemoveField(
+            model_name='candidacycandidate',
+            name='arbiter',
+        ),
+        migrations.RemoveField(
+            model_name='candidacycandidate',
+            name='disk_jockey',
+        ),
+        migrations.RemoveField(
+            model_name='candidacycandidate',
+            name='player',
+        ),
+        migrations.RemoveField(
+            model_name='candidacycandidate',
+            name='speaker',
+        ),
+        migrations.AddIndex(
+            model_name='candidacycandidate',
+            index=models.Index(fields=['candidacy', 'roles'], name='candidacy_candidate_roles_idx'),
+        ),
+    ]
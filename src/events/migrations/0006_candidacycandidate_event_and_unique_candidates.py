@@ -0,0 +1,51 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_candidacy_candidate_events(apps, schema_editor):
+    Candidacy = apps.get_model('events', 'Candidacy')
+    CandidacyCandidate = apps.get_model('events', 'CandidacyCandidate')
+    CandidacyCandidate.objects.update(event=models.Subquery(
+        Candidacy.objects.filter(pk=models.OuterRef('candidacy')).values('event')[:1],
+    ))
+
+    duplicated_registrations = CandidacyCandidate.objects.values('event', 'candidate').annotate(
+        nb_registrations=models.Count('pk'),
+    ).filter(nb_registrations__gt=1).count()
+    if duplicated_registrations:
+        raise ValueError(
+            f'{duplicated_registrations} candidates are registered more than once on the same event, '
+            'remove their extra candidacies before migrating.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0001_initial'),
+        ('events', '0005_candidacycandidate_roles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidacycandidate',
+            name='event',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='detailed_candidates', to='events.event'),
+        ),
+        migrations.RunPython(fill_candidacy_candidate_events, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='candidacycandidate',
+            name='event',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='detailed_candidates', to='events.event'),
+        ),
+        migrations.AddConstraint(
+            model_name='candidacycandidate',
+            constraint=models.UniqueConstraint(fields=('candidacy', 'candidate'), name='candidacy_candidate_unique_candidate'),
+        ),
+        migrations.AddConstraint(
+            model_name='candidacycandidate',
+            constraint=models.UniqueConstraint(fields=('event', 'candidate'), name='candidacy_candidate_unique_event_candidate'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_candidacycandidate_event_and_unique_candidates'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [
+                "CREATE VIRTUAL TABLE event_search USING fts5("
+                "uuid, name, description, location, tokenize = 'unicode61 remove_diacritics 2')",
+                'CREATE TRIGGER event_search_insert AFTER INSERT ON event BEGIN '
+                'INSERT INTO event_search (uuid, name, description, location) '
+                'VALUES (new.uuid, new.name, new.description, new.location); END',
+                # Only fires when an indexed column is written, not on the seat counter updates for instance.
+                'CREATE TRIGGER event_search_update AFTER UPDATE OF uuid, name, description, location ON event BEGIN '
+                """DELETE FROM event_search WHERE uuid MATCH '"' || old.uuid || '"'; """
+                'INSERT INTO event_search (uuid, name, description, location) '
+                'VALUES (new.uuid, new.name, new.description, new.location); END',
+                'CREATE TRIGGER event_search_delete AFTER DELETE ON event BEGIN '
+                """DELETE FROM event_search WHERE uuid MATCH '"' || old.uuid || '"'; END""",
+                'INSERT INTO event_search (uuid, name, description, location) SELECT uuid, name, description, location FROM event',
+            ],
+            reverse_sql=[
+                'DROP TRIGGER event_search_delete',
+                'DROP TRIGGER event_search_update',
+                'DROP TRIGGER event_search_insert',
+                'DROP TABLE event_search',
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.0.10 on 2026-10-18 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidacy',
+            name='is_waitlisted',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='candidacy',
+            index=models.Index(condition=models.Q(('is_waitlisted', True)), fields=['event', 'created_at', 'uuid'], name='candidacy_waitlist_idx'),
+        ),
+    ]
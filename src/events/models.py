@@ -1,9 +1,64 @@
+from collections import Counter
+from contextvars import ContextVar
 from uuid import uuid4
 from datetime import datetime
 
-from django.db import models, transaction
+from django.db import IntegrityError, models, transaction
+from django.dispatch import receiver
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from common.models import User, BaseModel
-from .core import CandidateCandidacyRequest
+from .core import CandidateAlreadyRegistered, CandidateCandidacyRequest, EventIsFull, Role
+from .signals import candidacies_created, candidacies_promoted
+
+
+class EventQuerySet(models.QuerySet):
+    def with_candidate_counts(self) -> "EventQuerySet":
+        """
+        Annotate each event with `nb_candidates`, the number of distinct users in its candidacies.
+        """
+        return self.annotate(
+            nb_candidates=models.Count('detailed_candidates__candidate', distinct=True),
+        )
+
+    def with_role_counts(self) -> "EventQuerySet":
+        """
+        Annotate each event with the number of distinct users wishing to take each role:
+        `nb_players`, `nb_speakers`, `nb_arbiters` and `nb_disk_jockeys`.
+        """
+        return self.annotate(**{
+            f'nb_{role.field_name}s': models.Count(
+                'detailed_candidates__candidate',
+                filter=has_role(role, prefix='detailed_candidates__'),
+                distinct=True,
+            )
+            for role in Role
+        })
+
+    def take_seats(self, event_pk, nb_seats: int) -> None:
+        """
+        Book `nb_seats` seats on an event with a single conditional UPDATE,
+        so that concurrent registrations can never overbook it.
+        Seats left free while candidacies wait for them are not available: the waitlist goes first.
+        Must run in the same transaction as the candidacy insert.
+        """
+        nb_updated_events = self.filter(
+            ~models.Exists(Candidacy.objects.filter(event=models.OuterRef('pk'), is_waitlisted=True)),
+            pk=event_pk,
+            seats_taken__lte=models.F('max_participants') - nb_seats,
+        ).update(seats_taken=models.F('seats_taken') + nb_seats)
+        if not nb_updated_events:
+            raise EventIsFull('Not enough seats left on this event for this candidacy')
+
+    def recount_seats(self) -> int:
+        """
+        Recompute every `seats_taken` counter from the candidacy candidates, in a single UPDATE.
+        """
+        seats_taken = CandidacyCandidate.objects.filter(
+            event=models.OuterRef('pk'),
+            candidacy__is_waitlisted=False,
+        ).values('event').annotate(nb_seats=models.Count('pk')).values('nb_seats')
+        return self.update(seats_taken=Coalesce(models.Subquery(seats_taken), 0))
 
 
 class Event(BaseModel):
@@ -13,24 +68,36 @@ class Event(BaseModel):
     date_and_time = models.DateTimeField()
     location = models.TextField()
     max_participants = models.PositiveIntegerField()
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = EventQuerySet.as_manager()
 
     @property
     def date_french_format(self):
         return self.date_and_time.strftime('%d/%m/%Y %H:%M')
 
+    @property
+    def is_full(self) -> bool:
+        return self.seats_taken >= self.max_participants
+
     @property
     def candidates(self) -> set[User]:
-        candidates = set()
-        for candidacy in self.candidacies.all():
-            for user in candidacy.candidates.all():
-                candidates.add(user)
-        return candidates
+        return set(User.objects.filter(candidacies__event=self).distinct())
+
+    @property
+    def candidates_count(self) -> int:
+        if hasattr(self, 'nb_candidates'):
+            return self.nb_candidates
+        return User.objects.filter(candidacies__event=self).distinct().count()
 
     def __str__(self):
         return self.name
 
     class Meta:
         db_table = 'event'
+        indexes = [
+            models.Index(fields=['date_and_time', 'uuid'], name='event_date_and_time_uuid_idx'),
+        ]
 
     @classmethod
     @transaction.atomic()
@@ -47,43 +114,175 @@ class Event(BaseModel):
         return event
 
 
+class CandidacyQuerySet(models.QuerySet):
+    def waitlist(self, event_pk) -> "CandidacyQuerySet":
+        """
+        The candidacies waiting for seats on an event, in sign-up order.
+        """
+        return self.filter(event=event_pk, is_waitlisted=True).order_by('created_at', 'uuid')
+
+    def promote_waitlisted(self, event_pk) -> list["Candidacy"]:
+        """
+        Give the free seats of an event to its waitlist, in sign-up order, and return the promoted candidacies.
+
+        A group is promoted only if all its candidates fit, and the candidacies behind it wait for it:
+        the promoted candidacies are the longest head of the waitlist whose running total of seats fits,
+        read with a single query off the waitlist index.
+        Must run in the same transaction as the seats recount, whose UPDATE locks the event row until the commit,
+        so that concurrent cancellations promote one after the other.
+        """
+        nb_seats = models.Subquery(
+            CandidacyCandidate.objects.filter(candidacy=models.OuterRef('pk'))
+            .values('candidacy').annotate(nb_seats=models.Count('pk')).values('nb_seats'),
+        )
+        waitlist = self.waitlist(event_pk).annotate(
+            nb_seats=nb_seats,
+            seats_needed=models.Window(models.Sum(nb_seats), order_by=[models.F('created_at').asc(), models.F('uuid').asc()]),
+            free_seats=models.F('event__max_participants') - models.F('event__seats_taken'),
+        ).values('uuid', 'nb_seats', 'seats_needed', 'free_seats')
+        # Filtering on a window function needs an outer query.
+        sql, params = waitlist.query.sql_with_params()
+        promoted = list(self.raw(f'SELECT * FROM ({sql}) AS waitlist WHERE seats_needed <= free_seats', params))
+        if not promoted:
+            return []
+
+        self.filter(pk__in=[candidacy.pk for candidacy in promoted]).update(is_waitlisted=False, updated_at=timezone.now())
+        # Counted by the query above, under the event row lock: take_seats would refuse them, the waitlist being busy.
+        Event.objects.filter(pk=event_pk).update(
+            seats_taken=models.F('seats_taken') + sum(candidacy.nb_seats for candidacy in promoted),
+        )
+        candidate_pks = list(
+            CandidacyCandidate.objects.filter(candidacy__in=[candidacy.pk for candidacy in promoted]).values_list('candidate', flat=True),
+        )
+        candidacies_promoted.send(sender=self.model, event_pk=event_pk, candidacies=promoted, candidate_pks=candidate_pks)
+        return promoted
+
+
 class Candidacy(BaseModel):
     uuid = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='candidacies')
     candidates = models.ManyToManyField(User, related_name='candidacies', through='CandidacyCandidate')
+    # Waiting for seats, which its candidates do not take yet. The waitlist position is the sign-up time.
+    is_waitlisted = models.BooleanField(default=False, editable=False)
+
+    objects = CandidacyQuerySet.as_manager()
 
     class Meta:
         db_table = 'candidacy'
+        indexes = [
+            models.Index(
+                fields=['event', 'created_at', 'uuid'],
+                condition=models.Q(is_waitlisted=True),
+                name='candidacy_waitlist_idx',
+            ),
+        ]
 
     @classmethod
     @transaction.atomic()
-    def from_event_and_candidate_candidacy_requests(cls, event: Event, candidate_candidacy_requests: list[CandidateCandidacyRequest]) -> "Candidacy":
+    def from_event_and_candidate_candidacy_requests(
+        cls,
+        event: Event,
+        candidate_candidacy_requests: list[CandidateCandidacyRequest],
+        waitlist_when_full: bool = False,
+    ) -> "Candidacy":
+        return cls.from_events_and_candidate_candidacy_requests(
+            [(event, candidate_candidacy_requests)], waitlist_when_full=waitlist_when_full,
+        )[0]
+
+    @classmethod
+    @transaction.atomic()
+    def from_events_and_candidate_candidacy_requests(
+        cls,
+        events_and_candidate_candidacy_requests: list[tuple[Event, list[CandidateCandidacyRequest]]],
+        waitlist_when_full: bool = False,
+    ) -> list["Candidacy"]:
+        """
+        Create one candidacy per (event, candidate candidacy requests) pair
+        with a single INSERT for the candidacies and a single INSERT for all their candidates.
+        A candidate registered twice on an event is refused by the unique constraints of the candidacy candidates.
+        With `waitlist_when_full`, the candidacies of an event without enough seats left join its waitlist
+        instead of raising EventIsFull, unless they could never fit in it.
+        """
+        for event, candidate_candidacy_requests in events_and_candidate_candidacy_requests:
+            cls.check_candidate_candidacy_requests(event, candidate_candidacy_requests)
+
+        seats_to_take = Counter()
+        for event, candidate_candidacy_requests in events_and_candidate_candidacy_requests:
+            seats_to_take[event.pk] += len(candidate_candidacy_requests)
+        max_participants = {event.pk: event.max_participants for event, _ in events_and_candidate_candidacy_requests}
+        waitlisted_event_pks = set()
+        for event_pk, nb_seats in seats_to_take.items():
+            try:
+                Event.objects.take_seats(event_pk, nb_seats)
+            except EventIsFull:
+                if not waitlist_when_full or nb_seats > max_participants[event_pk]:
+                    raise
+                waitlisted_event_pks.add(event_pk)
+
+        candidacies = cls.objects.bulk_create(
+            cls(event=event, is_waitlisted=event.pk in waitlisted_event_pks)
+            for event, _ in events_and_candidate_candidacy_requests
+        )
+        try:
+            with transaction.atomic():
+                candidacy_candidates = CandidacyCandidate.objects.bulk_create(
+                    CandidacyCandidate.build_from_candidate_candidacy_request_and_candidacy(
+                        candidate_candidacy_request=candidate_candidacy_request,
+                        candidacy=candidacy,
+                    )
+                    for candidacy, (_, candidate_candidacy_requests) in zip(candidacies, events_and_candidate_candidacy_requests)
+                    for candidate_candidacy_request in candidate_candidacy_requests
+                )
+        except IntegrityError as e:
+            raise CandidateAlreadyRegistered('A candidate cannot be registered on an event more than once.') from e
+        candidacies_created.send(sender=cls, candidacies=candidacies, candidacy_candidates=candidacy_candidates)
+
+        return candidacies
+
+    @staticmethod
+    def check_candidate_candidacy_requests(event: Event, candidate_candidacy_requests: list[CandidateCandidacyRequest]) -> None:
         if not event:
             raise ValueError('An event is required to create a candidacy')
         if not candidate_candidacy_requests:
             raise ValueError('At least one CandidacyCandidateRequest is required to create a candidacy')
 
-        if len(candidate_candidacy_requests) > len({candidate_candidacy_request.candidate for candidate_candidacy_request in candidate_candidacy_requests}):
-            raise ValueError('A candidate cannot be added to a candidacy more than once.')
-
-        candidacy = cls(event=event)
-        candidacy.save()
-        for candidate_candidacy_request in candidate_candidacy_requests:
-            CandidacyCandidate.from_candidate_candidacy_request_and_candidacy(
-                candidate_candidacy_request=candidate_candidacy_request,
-                candidacy=candidacy,
-            )
-
-        return candidacy
-
     def __str__(self) -> str:
+        # A single evaluation, served by `prefetch_related('candidates')` when the caller used it.
+        candidates = self.candidates.all()
         return (
             f'Candidacy for {self.event.name} with >>'
-            f'{", ".join(candidate.username for candidate in self.candidates.all())}<< '
-            f'as candidate{"s" if len(self.candidates.all()) > 1 else ""}'
+            f'{", ".join(candidate.username for candidate in candidates)}<< '
+            f'as candidate{"s" if len(candidates) > 1 else ""}'
         )
 
 
+def has_role(role: Role, prefix: str = '') -> models.Q:
+    """
+    Condition on the candidacy candidates (reached through `prefix`) wishing to take `role`,
+    written as an IN over the matching bitmasks so that it runs off the (candidacy, roles) index.
+    """
+    return models.Q(**{f'{prefix}roles__in': role.masks()})
+
+
+class CandidacyCandidateQuerySet(models.QuerySet):
+    def with_role(self, role: Role) -> "CandidacyCandidateQuerySet":
+        return self.filter(has_role(role))
+
+
+def role_flag(role: Role) -> property:
+    """
+    Boolean view over one role of the `roles` bitmask, for the forms, templates and candidacy requests.
+    """
+    def get_flag(candidacy_candidate) -> bool:
+        return bool(candidacy_candidate.roles & role)
+
+    def set_flag(candidacy_candidate, wished: bool) -> None:
+        roles = candidacy_candidate.roles | role if wished else candidacy_candidate.roles & ~role
+        candidacy_candidate.roles = int(roles)
+
+    return property(get_flag, set_flag)
+
+
 class CandidacyCandidate(BaseModel):
     uuid = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     candidacy = models.ForeignKey(
@@ -96,13 +295,40 @@ class CandidacyCandidate(BaseModel):
         on_delete=models.CASCADE,
         related_name="detailed_candidacies",
     )
-    player = models.BooleanField(default=False)
-    speaker = models.BooleanField(default=False)
-    arbiter = models.BooleanField(default=False)
-    disk_jockey = models.BooleanField(default=False)
+    # Denormalised from the candidacy, so that a candidate can be made unique per event. Indexed by that constraint.
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name="detailed_candidates",
+        editable=False,
+        db_index=False,
+    )
+    roles = models.PositiveSmallIntegerField(default=0)
+
+    ROLES = tuple(role.field_name for role in Role)
+
+    player = role_flag(Role.PLAYER)
+    speaker = role_flag(Role.SPEAKER)
+    arbiter = role_flag(Role.ARBITER)
+    disk_jockey = role_flag(Role.DISK_JOCKEY)
+
+    objects = CandidacyCandidateQuerySet.as_manager()
 
     class Meta:
         db_table = 'candidacy_candidate'
+        indexes = [
+            models.Index(fields=['candidacy', 'roles'], name='candidacy_candidate_roles_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['candidacy', 'candidate'], name='candidacy_candidate_unique_candidate'),
+            models.UniqueConstraint(fields=['event', 'candidate'], name='candidacy_candidate_unique_event_candidate'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Denormalised once, when the candidate joins the candidacy: the admin allows changing neither
+        # the candidacy of a candidate nor the event of a candidacy.
+        self.event_id = self.candidacy.event_id
+        super().save(*args, **kwargs)
 
     @classmethod
     def from_candidate_candidacy_request_and_candidacy(
@@ -110,25 +336,71 @@ class CandidacyCandidate(BaseModel):
         candidate_candidacy_request: CandidateCandidacyRequest,
         candidacy: Candidacy,
     ) -> "CandidacyCandidate":
+        candidacy_candidate = cls.build_from_candidate_candidacy_request_and_candidacy(
+            candidate_candidacy_request=candidate_candidacy_request,
+            candidacy=candidacy,
+        )
+        candidacy_candidate.save()
+        return candidacy_candidate
+
+    @classmethod
+    def build_from_candidate_candidacy_request_and_candidacy(
+        cls,
+        candidate_candidacy_request: CandidateCandidacyRequest,
+        candidacy: Candidacy,
+    ) -> "CandidacyCandidate":
+        """
+        Same as from_candidate_candidacy_request_and_candidacy but leaves the instance unsaved,
+        so that several of them can be written with a single bulk_create.
+        """
         if not candidacy:
             raise ValueError('A candidacy is required to create a candidacy candidate')
         if not candidate_candidacy_request:
             raise ValueError('At least one candidate candidacy request is required to create a candidacy candidate')
 
-        candidacy_candidate = cls(
+        return cls(
             candidacy=candidacy,
+            event_id=candidacy.event_id,
             candidate=candidate_candidacy_request.candidate,
-            player=candidate_candidacy_request.as_player,
-            speaker=candidate_candidacy_request.as_speaker,
-            arbiter=candidate_candidacy_request.as_arbiter,
-            disk_jockey=candidate_candidacy_request.as_disk_jockey,
+            roles=int(candidate_candidacy_request.roles),
         )
-        candidacy_candidate.save()
-        return candidacy_candidate
 
 
     def __str__(self) -> str:
         return (
-            f'Detailed candidacy for {self.candidacy.event.name} with >>'
+            f'Detailed candidacy for {self.event.name} with >>'
             f'{self.candidate.username}<< as candidate'
         )
+
+
+# Candidacies being deleted: the seats of their candidates are released once for the candidacy, after the cascade.
+deleting_candidacy_pks: ContextVar[frozenset] = ContextVar('deleting_candidacy_pks', default=frozenset())
+
+
+def release_event_seats(event_pk) -> None:
+    """
+    Give the seats freed on an event back. A recount rather than a decrement, as a deleted candidate may have held none.
+    """
+    Event.objects.filter(pk=event_pk).recount_seats()
+    Candidacy.objects.promote_waitlisted(event_pk)
+
+
+@receiver(models.signals.pre_delete, sender=Candidacy)
+def defer_deleted_candidacy_seats(sender, instance, **kwargs):
+    deleting_candidacy_pks.set(deleting_candidacy_pks.get() | {instance.pk})
+
+
+@receiver(models.signals.post_delete, sender=Candidacy)
+def release_deleted_candidacy_seats(sender, instance, **kwargs):
+    deleting_candidacy_pks.set(deleting_candidacy_pks.get() - {instance.pk})
+    release_event_seats(instance.event_id)
+
+
+@receiver(models.signals.post_delete, sender=CandidacyCandidate)
+def release_deleted_candidate_seat(sender, instance, **kwargs):
+    """
+    Give the seat of a candidacy candidate deleted on its own back, e.g. with its user.
+    Those deleted with their candidacy, by remove_candidacy or the admin, are released once by release_deleted_candidacy_seats.
+    """
+    if instance.candidacy_id not in deleting_candidacy_pks.get():
+        release_event_seats(instance.event_id)
@@ -0,0 +1,134 @@
+import traceback
+from collections import defaultdict
+from uuid import UUID
+
+from django.core.mail import EmailMessage, get_connection
+from django.dispatch import receiver
+
+from common.jobs import PartialBatchFailure, enqueue_many_on_commit, enqueue_on_commit, job_handler
+from common.models import User
+from .core import Role
+from .models import Candidacy, CandidacyCandidate, Event
+from .signals import candidacies_promoted
+
+REGISTERED_CANDIDACY_JOB = 'events.notify_registered_candidacy'
+CANCELLED_CANDIDACY_JOB = 'events.notify_cancelled_candidacy'
+PROMOTED_CANDIDACY_JOB = 'events.notify_promoted_candidacy'
+
+
+def notify_registered_candidacy_on_commit(candidacy: Candidacy) -> None:
+    enqueue_on_commit(REGISTERED_CANDIDACY_JOB, {'candidacy': str(candidacy.pk)})
+
+
+def notify_registered_candidacies_on_commit(candidacies: list[Candidacy]) -> None:
+    enqueue_many_on_commit(REGISTERED_CANDIDACY_JOB, [{'candidacy': str(candidacy.pk)} for candidacy in candidacies])
+
+
+def notify_cancelled_candidacy_on_commit(event_pk, candidate_pks) -> None:
+    # The candidacy is gone once the job runs, its event and candidates travel in the payload.
+    enqueue_on_commit(CANCELLED_CANDIDACY_JOB, {
+        'event': str(event_pk),
+        'candidates': [str(candidate_pk) for candidate_pk in candidate_pks],
+    })
+
+
+@receiver(candidacies_promoted)
+def notify_promoted_candidacies_on_commit(sender, event_pk, candidacies, candidate_pks, **kwargs) -> None:
+    enqueue_on_commit(PROMOTED_CANDIDACY_JOB, {
+        'event': str(event_pk),
+        'candidates': [str(candidate_pk) for candidate_pk in candidate_pks],
+    })
+
+
+def send_emails(messages_by_payload: list[list[EmailMessage]]) -> None:
+    """
+    Send the messages of every payload of a batch through one connection.
+    A payload whose messages fail does not stop the others, only its job is retried.
+    """
+    if not any(messages_by_payload):
+        return
+    errors = {}
+    with get_connection() as connection:
+        for index, messages in enumerate(messages_by_payload):
+            try:
+                connection.send_messages(messages)
+            except Exception:
+                errors[index] = traceback.format_exc()
+    if errors:
+        raise PartialBatchFailure(errors)
+
+
+@job_handler(REGISTERED_CANDIDACY_JOB)
+def send_registered_candidacy_emails(payloads: list[dict]) -> None:
+    candidacy_candidates = CandidacyCandidate.objects.filter(
+        candidacy__in=[payload['candidacy'] for payload in payloads],
+    ).exclude(candidate__email='').select_related('event', 'candidate', 'candidacy')
+    messages_by_candidacy = defaultdict(list)
+    for candidacy_candidate in candidacy_candidates:
+        messages_by_candidacy[candidacy_candidate.candidacy_id].append(EmailMessage(
+            subject=f'Candidature enregistrée : {candidacy_candidate.event.name}',
+            body=registered_candidacy_body(candidacy_candidate),
+            to=[candidacy_candidate.candidate.email],
+        ))
+    send_emails([messages_by_candidacy[UUID(payload['candidacy'])] for payload in payloads])
+
+
+def registered_candidacy_body(candidacy_candidate: CandidacyCandidate) -> str:
+    event = candidacy_candidate.event
+    roles = Role.labels(candidacy_candidate.roles)
+    body = (
+        f'Bonjour {candidacy_candidate.candidate.username},\n\n'
+        f'Votre candidature pour {event.name} le {event.date_french_format} est enregistrée, en tant que {roles}.\n'
+    )
+    if candidacy_candidate.candidacy.is_waitlisted:
+        body += "\nL'évènement est complet : vous êtes en liste d'attente, et serez prévenu si une place se libère.\n"
+    return body
+
+
+@job_handler(CANCELLED_CANDIDACY_JOB)
+def send_cancelled_candidacy_emails(payloads: list[dict]) -> None:
+    send_event_emails(
+        payloads,
+        subject='Candidature annulée : {event.name}',
+        body='Bonjour {candidate.username},\n\nVotre candidature pour {event.name} le {event.date_french_format} est annulée.\n',
+    )
+
+
+@job_handler(PROMOTED_CANDIDACY_JOB)
+def send_promoted_candidacy_emails(payloads: list[dict]) -> None:
+    send_event_emails(
+        payloads,
+        subject='Place libérée : {event.name}',
+        body=(
+            'Bonjour {candidate.username},\n\nUne place s\'est libérée pour {event.name} le {event.date_french_format} : '
+            'votre candidature quitte la liste d\'attente.\n'
+        ),
+    )
+
+
+def send_event_emails(payloads: list[dict], subject: str, body: str) -> None:
+    """
+    Send `subject` and `body`, formatted with the event and the candidate, to the candidates of each payload.
+    """
+    events = Event.objects.in_bulk({payload['event'] for payload in payloads})
+    candidates = User.objects.exclude(email='').in_bulk({
+        candidate_pk for payload in payloads for candidate_pk in payload['candidates']
+    })
+    messages_by_payload = []
+    for payload in payloads:
+        messages = []
+        messages_by_payload.append(messages)
+        event = events.get(UUID(payload['event']))
+        if event is None:
+            # Deleted since, with its candidacies.
+            continue
+        for candidate_pk in payload['candidates']:
+            candidate = candidates.get(UUID(candidate_pk))
+            if candidate is None:
+                continue
+            messages.append(EmailMessage(
+                subject=subject.format(event=event),
+                body=body.format(event=event, candidate=candidate),
+                to=[candidate.email],
+            ))
+    send_emails(messages_by_payload)
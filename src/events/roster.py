@@ -0,0 +1,60 @@
+import csv
+from itertools import chain
+
+from .core import Role
+from .models import CandidacyCandidate, Event
+
+CHUNK_SIZE = 2000
+ROSTER_HEADER = ('candidacy', 'username', 'email', *CandidacyCandidate.ROLES, 'is_waitlisted')
+
+
+class Echo:
+    """
+    File-like object handing back what is written to it, so that csv.writer can feed a streaming response.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def fetch_roster(event_pk):
+    """
+    One row per candidate of each candidacy of the event, read from the event so that the same query tells
+    a missing event (no row) from an event without candidates (a single row of None).
+    The candidacies still on the waitlist are listed after the others, flagged, as they hold no seat.
+    """
+    candidate = 'detailed_candidates__'
+    return Event.objects.filter(pk=event_pk).order_by(
+        f'{candidate}candidacy__is_waitlisted', f'{candidate}candidacy__created_at', f'{candidate}candidacy', f'{candidate}created_at',
+    ).values_list(
+        f'{candidate}candidacy',
+        f'{candidate}candidate__username',
+        f'{candidate}candidate__email',
+        f'{candidate}roles',
+        f'{candidate}candidacy__is_waitlisted',
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def roster_rows(rows):
+    yield ROSTER_HEADER
+    for candidacy, username, email, roles, is_waitlisted in rows:
+        if candidacy is not None:
+            yield (candidacy, username, email, *(int(wished) for wished in Role.wishes(roles).values()), int(is_waitlisted))
+
+
+def open_roster_csv(event_pk):
+    """
+    Return the CSV lines of the roster of an event, or None if the event does not exist.
+    The single roster query is run before returning, so that a view can still answer a 404 instead of a stream.
+    """
+    rows = fetch_roster(event_pk)
+    first_row = next(rows, None)
+    if first_row is None:
+        return None
+    return stream_roster_csv(chain([first_row], rows))
+
+
+def stream_roster_csv(rows):
+    writer = csv.writer(Echo())
+    for row in roster_rows(rows):
+        yield writer.writerow(row)
@@ -0,0 +1,10 @@
+from common.search import FullTextIndex
+
+from .models import Event
+
+EVENT_SEARCH_INDEX = FullTextIndex(
+    table='event_search',
+    model=Event,
+    fields=('name', 'description', 'location'),
+    weights=(10.0, 1.0, 3.0),
+)
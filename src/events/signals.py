@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .cache import bump_candidate_names_version, bump_event_version, invalidate_user_calendars
+
+# Sent once the candidacies of a bulk registration and their candidacy candidates are written,
+# as bulk_create does not send post_save.
+candidacies_created = Signal()
+# Sent with `event_pk`, `candidacies` and their `candidate_pks` once waitlisted candidacies are given seats, as update() does not send post_save.
+candidacies_promoted = Signal()
+
+
+def invalidate_event_fragments_on_commit(event_pk) -> None:
+    transaction.on_commit(lambda: bump_event_version(event_pk))
+
+
+def invalidate_user_calendars_on_commit(user_pks) -> None:
+    user_pks = set(user_pks)
+    transaction.on_commit(lambda: invalidate_user_calendars(user_pks))
+
+
+@receiver(post_save, sender='events.Event')
+@receiver(post_delete, sender='events.Event')
+def invalidate_event(sender, instance, **kwargs):
+    invalidate_event_fragments_on_commit(instance.pk)
+
+
+@receiver(post_save, sender='events.Event')
+def invalidate_event_candidates_calendars(sender, instance, created, **kwargs):
+    # A deleted event deletes its candidacy candidates, which invalidate their calendars one by one.
+    if not created:
+        invalidate_user_calendars_on_commit(instance.detailed_candidates.values_list('candidate', flat=True))
+
+
+@receiver(post_save, sender='common.User')
+def invalidate_user_events(sender, instance, created, update_fields=None, **kwargs):
+    # Fragments show the username of every candidate of the candidacies, e.g. on logins only last_login changes.
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    event_pks = set(instance.detailed_candidacies.values_list('event', flat=True))
+    for event_pk in event_pks:
+        invalidate_event_fragments_on_commit(event_pk)
+    if event_pks:
+        transaction.on_commit(bump_candidate_names_version)
+
+
+@receiver(post_save, sender='events.Candidacy')
+@receiver(post_delete, sender='events.Candidacy')
+def invalidate_candidacy_event(sender, instance, **kwargs):
+    invalidate_event_fragments_on_commit(instance.event_id)
+
+
+@receiver(post_save, sender='events.CandidacyCandidate')
+@receiver(post_delete, sender='events.CandidacyCandidate')
+def invalidate_candidacy_candidate_event(sender, instance, **kwargs):
+    invalidate_event_fragments_on_commit(instance.event_id)
+    invalidate_user_calendars_on_commit([instance.candidate_id])
+
+
+@receiver(candidacies_created)
+def invalidate_created_candidacies_events(sender, candidacies, candidacy_candidates, **kwargs):
+    for event_pk in {candidacy.event_id for candidacy in candidacies}:
+        invalidate_event_fragments_on_commit(event_pk)
+    invalidate_user_calendars_on_commit(candidacy_candidate.candidate_id for candidacy_candidate in candidacy_candidates)
+
+
+@receiver(candidacies_promoted)
+def invalidate_promoted_candidacies_event(sender, event_pk, candidacies, candidate_pks, **kwargs):
+    invalidate_event_fragments_on_commit(event_pk)
+    invalidate_user_calendars_on_commit(candidate_pks)
@@ -0,0 +1,56 @@
+from django import template
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+
+from events.cache import (
+    EVENT_FRAGMENT_TIMEOUT,
+    event_fragment_key,
+    record_fragment_hit,
+    record_fragment_miss,
+)
+
+register = template.Library()
+
+
+class EventFragmentCacheNode(template.Node):
+    def __init__(self, nodelist, event, versions):
+        self.nodelist = nodelist
+        self.event = event
+        self.versions = versions
+
+    def render(self, context):
+        event = self.event.resolve(context)
+        versions = self.versions.resolve(context)
+        request = context['request']
+        get_token(request)
+        key = event_fragment_key(
+            event.pk,
+            versions[event.pk],
+            request.user.pk,
+            request.META['CSRF_COOKIE'],
+        )
+
+        fragment = cache.get(key)
+        if fragment is not None:
+            record_fragment_hit()
+            return fragment
+
+        record_fragment_miss()
+        fragment = self.nodelist.render(context)
+        cache.set(key, fragment, EVENT_FRAGMENT_TIMEOUT)
+        return fragment
+
+
+@register.tag(name='cache_event_fragment')
+def cache_event_fragment(parser, token):
+    """
+    Cache the enclosed fragment for an event and the current user, until the event version changes.
+
+    Usage: {% cache_event_fragment event event_fragment_versions %} ... {% endcache_event_fragment %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires an event and the event fragment versions.")
+    nodelist = parser.parse(('endcache_event_fragment',))
+    parser.delete_first_token()
+    return EventFragmentCacheNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
@@ -0,0 +1,11 @@
+from django.template import Library
+
+from events.core import UserCandidacy, UserCandidacyIndex
+from events.models import Event
+
+register = Library()
+
+
+@register.filter(name='candidacies_of')
+def candidacies_of(user_candidacy_index: UserCandidacyIndex, event: Event) -> tuple[UserCandidacy, ...]:
+    return user_candidacy_index.candidacies_of(event.pk)
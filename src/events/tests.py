@@ -1,10 +1,36 @@
-from django.test import TestCase
-from datetime import datetime, timezone
-
-from events.models import Event, Candidacy
-from common.models import User
-from .app import register_new_candidacy
-from .core import CandidateCandidacyRequest
+import json
+import time
+from io import StringIO
+from uuid import uuid4
+
+from asgiref.sync import sync_to_async
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.checks.urls import check_url_namespaces_unique
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+from events.models import Event, Candidacy, CandidacyCandidate
+from common.jobs import run_due_jobs
+from common.models import Job, User
+from .cache import bump_all_event_versions, get_fragment_stats, get_event_versions
+from .app import build_user_candidacy_index, register_new_candidacy, register_new_candidacies, remove_candidacy
+from .forms import GroupCandidacyFormSet
+from .core import CandidateAlreadyRegistered, CandidateCandidacyRequest, EventIsFull, Role
+from .roster import ROSTER_HEADER
+from .lineup import LineupCandidacy, LineupMember, assign_roles, build_event_lineup, solve_lineup
+from .search import EVENT_SEARCH_INDEX
+from .calendar import build_user_calendar, fold_line
+from . import notifications
 
 
 class TestObjectSequence:
@@ -100,10 +126,55 @@ class TestEvent(TestCase):
         with self.assertRaises(ValueError) as e:
             register_new_candidacy(event, [candidate_candidacy_request, candidate_candidacy_request])
 
-        self.assertEqual(str(e.exception), 'A candidate cannot be added to a candidacy more than once.')
+        self.assertEqual(str(e.exception), 'A candidate cannot be registered on an event more than once.')
         self.assertEqual(self.default_user.candidacies.count(), 0)
 
 
+class TestEventCounts(TestCase):
+    def setUp(self) -> None:
+        self.user = User(username='test_user')
+        self.user.save()
+        self.co_candidate = User(username='test_co_candidate')
+        self.co_candidate.save()
+        self.arbiter = User(username='test_arbiter')
+        self.arbiter.save()
+        self.event = new_test_event(
+            candidate_candidacy_requests=[CandidateCandidacyRequest(candidate=self.user, as_player=True)],
+        )
+        register_new_candidacy(self.event, [
+            CandidateCandidacyRequest(candidate=self.arbiter, as_arbiter=True),
+            CandidateCandidacyRequest(candidate=self.co_candidate, as_player=True, as_speaker=True),
+        ])
+        self.empty_event = new_test_event()
+
+    def test_candidates_are_the_users_of_all_candidacies(self):
+        self.assertEqual(self.event.candidates, {self.user, self.co_candidate, self.arbiter})
+        self.assertEqual(self.empty_event.candidates, set())
+
+    def test_counts_are_annotated_in_a_single_query(self):
+        with self.assertNumQueries(1):
+            events = {
+                event.uuid: event
+                for event in Event.objects.with_candidate_counts().with_role_counts()
+            }
+            event = events[self.event.uuid]
+            empty_event = events[self.empty_event.uuid]
+
+            self.assertEqual(event.candidates_count, 3)
+            self.assertEqual(event.nb_players, 2)
+            self.assertEqual(event.nb_speakers, 1)
+            self.assertEqual(event.nb_arbiters, 1)
+            self.assertEqual(event.nb_disk_jockeys, 0)
+            self.assertEqual(empty_event.candidates_count, 0)
+            self.assertEqual(empty_event.nb_players, 0)
+
+    def test_candidates_count_without_annotation_is_computed_by_the_database(self):
+        event = Event.objects.get(pk=self.event.pk)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(event.candidates_count, 3)
+
+
 class TestAllEvents(TestCase):
     def setUp(self) -> None:
         self.view_path = '/events/'
@@ -121,7 +192,7 @@ class TestAllEvents(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response,self.list_event_template)
-        self.assertEqual(response.context['events'].count(), 0)
+        self.assertEqual(len(response.context['events']), 0)
 
     def test_with_events_returns_events(self):
         nb_events = 2
@@ -131,7 +202,7 @@ class TestAllEvents(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, self.list_event_template)
-        self.assertEqual(response.context['events'].count(), nb_events)
+        self.assertEqual(len(response.context['events']), nb_events)
 
     def test_login_required(self):
         self.client.logout()
@@ -152,11 +223,763 @@ class TestAllEvents(TestCase):
     def test_with_events_display_register_button(self):
         new_test_event()
 
-        response = self.client.get(self.view_path)
+        response = self.client.get(self.view_path)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, self.list_event_template)
+        self.assertIn('Postuler', response.content.decode())
+
+
+class TestAllEventsQueryBudget(TestCase):
+    def setUp(self) -> None:
+        self.view_path = '/events/'
+        self.default_user = User(username='test_user')
+        self.default_user.set_password('test_password')
+        self.default_user.save()
+        self.co_candidate = User(username='test_co_candidate')
+        self.co_candidate.save()
+        self.client.login(username=self.default_user.username, password='test_password')
+
+    def tearDown(self) -> None:
+        self.client.logout()
+
+    def seed_events_with_candidacies(self, nb_events: int) -> None:
+        events = Event.objects.bulk_create(
+            Event(
+                name=f'Bulk Event {index}',
+                description=f'Bulk Event {index} description',
+                date_and_time=datetime.utcnow().astimezone(timezone.utc),
+                location=f'Bulk Event {index} location',
+                max_participants=10,
+            ) for index in range(nb_events)
+        )
+        solo_candidacies = Candidacy.objects.bulk_create(Candidacy(event=event) for event in events[::2])
+        group_candidacies = Candidacy.objects.bulk_create(Candidacy(event=event) for event in events[1::2])
+        CandidacyCandidate.objects.bulk_create(
+            [CandidacyCandidate(candidacy=candidacy, event=candidacy.event, candidate=self.default_user, player=True) for candidacy in solo_candidacies]
+            + [CandidacyCandidate(candidacy=candidacy, event=candidacy.event, candidate=self.default_user, arbiter=True) for candidacy in group_candidacies]
+            + [CandidacyCandidate(candidacy=candidacy, event=candidacy.event, candidate=self.co_candidate, speaker=True) for candidacy in group_candidacies]
+        )
+
+    def count_page_queries(self) -> int:
+        # bulk_create sends no signal: render every fragment again, as it would after a signalled change.
+        bump_all_event_versions()
+        with CaptureQueriesContext(connection) as captured_queries:
+            response = self.client.get(self.view_path)
+        self.assertEqual(response.status_code, 200)
+        return len(captured_queries)
+
+    def test_query_count_does_not_depend_on_the_number_of_events(self):
+        query_counts = []
+        for nb_new_events in (10, 90, 900):
+            self.seed_events_with_candidacies(nb_new_events)
+            query_counts.append(self.count_page_queries())
+
+        self.assertEqual(Event.objects.count(), 1000)
+        self.assertEqual(len(set(query_counts)), 1, f'Query counts vary with the number of events: {query_counts}')
+
+
+class TestUserCandidacyIndex(TestCase):
+    def setUp(self) -> None:
+        self.user = User(username='test_user')
+        self.user.save()
+        self.co_candidate = User(username='test_co_candidate')
+        self.co_candidate.save()
+
+    def register_solo_and_group_candidacies(self, solo_event: Event, group_event: Event) -> None:
+        register_new_candidacy(solo_event, [CandidateCandidacyRequest(candidate=self.user, as_player=True)])
+        register_new_candidacy(group_event, [
+            CandidateCandidacyRequest(candidate=self.user, as_arbiter=True),
+            CandidateCandidacyRequest(candidate=self.co_candidate, as_speaker=True),
+        ])
+
+    def test_indexes_solo_and_group_candidacies_with_the_user_roles(self):
+        solo_event = new_test_event(candidate_candidacy_requests=[CandidateCandidacyRequest(candidate=self.user, as_player=True)])
+        group_event = new_test_event(candidate_candidacy_requests=[
+            CandidateCandidacyRequest(candidate=self.co_candidate, as_player=True),
+            CandidateCandidacyRequest(candidate=self.user, as_arbiter=True, as_speaker=True),
+        ])
+        others_event = new_test_event(candidate_candidacy_requests=[CandidateCandidacyRequest(candidate=self.co_candidate, as_player=True)])
+
+        index = build_user_candidacy_index(self.user, [solo_event.pk, group_event.pk, others_event.pk])
+
+        self.assertTrue(index.is_candidating_alone(solo_event.pk))
+        self.assertFalse(index.is_candidating_alone(group_event.pk))
+        self.assertFalse(index.is_candidating_alone(others_event.pk))
+        self.assertEqual(index.candidacies_of(others_event.pk), ())
+
+        [solo_candidacy] = index.candidacies_of(solo_event.pk)
+        self.assertTrue(solo_candidacy.is_solo)
+        self.assertTrue(solo_candidacy.as_player)
+        self.assertEqual(solo_candidacy.candidacy_uuid, solo_event.candidacies.first().pk)
+
+        [group_candidacy] = index.candidacies_of(group_event.pk)
+        self.assertFalse(group_candidacy.is_solo)
+        self.assertFalse(group_candidacy.as_player)
+        self.assertTrue(group_candidacy.as_arbiter)
+        self.assertTrue(group_candidacy.as_speaker)
+        self.assertCountEqual(
+            [detailed_candidate.candidate for detailed_candidate in group_candidacy.detailed_candidates],
+            [self.co_candidate, self.user],
+        )
+
+    def test_is_built_with_a_single_query_whatever_the_number_of_events(self):
+        events = [new_test_event() for _ in range(20)]
+        for solo_event, group_event in zip(events[::2], events[1::2]):
+            self.register_solo_and_group_candidacies(solo_event, group_event)
+
+        for nb_events in (2, 20):
+            with self.assertNumQueries(1):
+                index = build_user_candidacy_index(self.user, [event.pk for event in events[:nb_events]])
+                for event_index, event in enumerate(events[:nb_events]):
+                    self.assertEqual(index.is_candidating_alone(event.pk), event_index % 2 == 0)
+                    for candidacy in index.candidacies_of(event.pk):
+                        [detailed_candidate.candidate.username for detailed_candidate in candidacy.detailed_candidates]
+
+
+class TestAllEventsConditionalGet(TestCase):
+    def setUp(self) -> None:
+        self.view_path = '/events/'
+        self.default_user = User(username='test_user')
+        self.default_user.set_password('test_password')
+        self.default_user.save()
+        self.other_user = User(username='test_other_user')
+        self.other_user.set_password('test_password')
+        self.other_user.save()
+        self.event = new_test_event(candidate_candidacy_requests=[CandidateCandidacyRequest(candidate=self.default_user, as_player=True)])
+        self.client.login(username=self.default_user.username, password='test_password')
+
+    def get_etag(self) -> str:
+        self.client.get(self.view_path)  # sets the CSRF cookie
+        response = self.client.get(self.view_path)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_answers_not_modified_without_rendering(self):
+        # The first visit sets the CSRF cookie, which the next pages are rendered with.
+        self.client.get(self.view_path)
+        response = self.client.get(self.view_path)
+        self.assertIn('private', response['Cache-Control'])
+
+        with self.assertNumQueries(1):  # the freshness probe, the session and its user come from the cache
+            response = self.client.get(self.view_path, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+        self.assertTemplateNotUsed(response, 'events/events.html')
+
+    def test_has_no_last_modified_date_which_deletions_would_not_move(self):
+        register_new_candidacy(self.event, [CandidateCandidacyRequest(candidate=self.other_user, as_arbiter=True)])
+        self.client.get(self.view_path)
+        response = self.client.get(self.view_path)
+        self.assertNotIn('Last-Modified', response)
+
+        remove_candidacy(self.event.candidacies.get(candidates=self.other_user))
+        response = self.client.get(self.view_path, HTTP_IF_MODIFIED_SINCE=http_date(time.time()))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_with_the_candidacies(self):
+        etag = self.get_etag()
+        register_new_candidacy(self.event, [CandidateCandidacyRequest(candidate=self.other_user, as_arbiter=True)])
+        registered_etag = self.get_etag()
+        remove_candidacy(self.event.candidacies.get(candidates=self.other_user))
+        removed_etag = self.get_etag()
+
+        self.assertNotEqual(etag, registered_etag)
+        self.assertNotEqual(registered_etag, removed_etag)
+        self.assertEqual(self.client.get(self.view_path, HTTP_IF_NONE_MATCH=registered_etag).status_code, 200)
+
+    def test_etag_changes_when_a_candidate_is_renamed(self):
+        register_new_candidacy(self.event, [CandidateCandidacyRequest(candidate=self.other_user, as_arbiter=True)])
+        etag = self.get_etag()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_user.username = 'renamed_user'
+            self.other_user.save()
+
+        self.assertNotEqual(etag, self.get_etag())
+
+    def test_etag_changes_when_an_event_is_edited_or_deleted(self):
+        other_event = new_test_event()
+        etag = self.get_etag()
+        self.event.description = 'Nouvelle description'
+        self.event.save()
+        edited_etag = self.get_etag()
+        other_event.delete()
+
+        self.assertNotEqual(etag, edited_etag)
+        self.assertNotEqual(edited_etag, self.get_etag())
+
+    def test_etag_depends_on_the_user(self):
+        etag = self.get_etag()
+        self.client.logout()
+        self.client.login(username=self.other_user.username, password='test_password')
+
+        response = self.client.get(self.view_path, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+
+class TestAllEventsPagination(TestCase):
+    def setUp(self) -> None:
+        self.view_path = '/events/'
+        self.default_user = User(username='test_user')
+        self.default_user.set_password('test_password')
+        self.default_user.save()
+        self.client.login(username=self.default_user.username, password='test_password')
+        now = datetime.utcnow().astimezone(timezone.utc)
+        self.past_events = [new_test_event(date_and_time=now - timedelta(days=days)) for days in range(30, 0, -1)]
+        self.upcoming_events = [new_test_event(date_and_time=now + timedelta(days=days)) for days in range(1, 46)]
+
+    def tearDown(self) -> None:
+        self.client.logout()
+
+    def test_first_page_shows_upcoming_events_first(self):
+        response = self.client.get(self.view_path)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['events'], self.upcoming_events[:20])
+        self.assertTrue(response.context['page_obj'].has_previous())
+        self.assertTrue(response.context['page_obj'].has_next())
+
+    def test_next_and_previous_cursors_walk_through_every_event(self):
+        seen_events = []
+        response = self.client.get(self.view_path)
+        while True:
+            seen_events.extend(response.context['events'])
+            page = response.context['page_obj']
+            if not page.has_next():
+                break
+            response = self.client.get(self.view_path, {'after': page.next_cursor})
+        self.assertEqual(seen_events, self.upcoming_events)
+
+        response = self.client.get(self.view_path)
+        seen_events = []
+        while response.context['page_obj'].has_previous():
+            response = self.client.get(self.view_path, {'before': response.context['page_obj'].previous_cursor})
+            seen_events = list(response.context['events']) + seen_events
+        self.assertEqual(seen_events, self.past_events)
+
+    def test_past_events_stay_reachable_without_upcoming_events(self):
+        Event.objects.filter(pk__in=[event.pk for event in self.upcoming_events]).delete()
+
+        response = self.client.get(self.view_path)
+
+        page = response.context['page_obj']
+        self.assertEqual(list(response.context['events']), [])
+        self.assertTrue(page.has_previous())
+        response = self.client.get(self.view_path, {'before': page.previous_cursor})
+        self.assertEqual(response.context['events'], self.past_events[-20:])
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_every_page_costs_the_same_number_of_queries(self):
+        with CaptureQueriesContext(connection) as first_page_queries:
+            response = self.client.get(self.view_path)
+        with CaptureQueriesContext(connection) as next_page_queries:
+            self.client.get(self.view_path, {'after': response.context['page_obj'].next_cursor})
+
+        self.assertEqual(len(first_page_queries), len(next_page_queries))
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(self.view_path, {'after': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 404)
+
+
+class TestEventsFragmentCache(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.view_path = '/events/'
+        self.default_user = User(username='test_user')
+        self.default_user.set_password('test_password')
+        self.default_user.save()
+        self.other_user = User(username='test_other_user')
+        self.other_user.set_password('test_password')
+        self.other_user.save()
+        self.event = new_test_event()
+        self.other_event = new_test_event()
+        self.client.login(username=self.default_user.username, password='test_password')
+
+    def tearDown(self) -> None:
+        self.client.logout()
+        cache.clear()
+
+    def test_second_visit_is_served_from_the_cache(self):
+        self.client.get(self.view_path)
+        self.assertEqual(get_fragment_stats(), {'hits': 0, 'misses': 2})
+
+        response = self.client.get(self.view_path)
+
+        self.assertEqual(get_fragment_stats(), {'hits': 2, 'misses': 2})
+        self.assertContains(response, self.event.name)
+
+    def test_page_served_from_the_cache_skips_the_candidacy_index_query(self):
+        with CaptureQueriesContext(connection) as first_visit_queries:
+            self.client.get(self.view_path)
+        with CaptureQueriesContext(connection) as second_visit_queries:
+            self.client.get(self.view_path)
+
+        self.assertEqual(len(second_visit_queries), len(first_visit_queries) - 1)
+
+    def test_renaming_a_co_candidate_evicts_the_fragments_of_their_events(self):
+        register_new_candidacy(self.event, [
+            CandidateCandidacyRequest(candidate=self.default_user, as_player=True),
+            CandidateCandidacyRequest(candidate=self.other_user, as_arbiter=True),
+        ])
+        self.assertContains(self.client.get(self.view_path), 'test_other_user')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_user.username = 'test_renamed_user'
+            self.other_user.save()
+        response = self.client.get(self.view_path)
+
+        self.assertContains(response, 'test_renamed_user')
+        self.assertEqual(get_fragment_stats(), {'hits': 1, 'misses': 3})
+
+    def test_fragments_are_not_shared_between_users(self):
+        self.client.get(self.view_path)
+        self.client.logout()
+        self.client.login(username=self.other_user.username, password='test_password')
+
+        self.client.get(self.view_path)
+
+        self.assertEqual(get_fragment_stats(), {'hits': 0, 'misses': 4})
+
+    def test_candidacy_change_only_evicts_its_event_fragments(self):
+        self.client.get(self.view_path)
+        versions = get_event_versions([self.event.pk, self.other_event.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            register_new_candidacy(self.event, [CandidateCandidacyRequest(candidate=self.default_user, as_player=True)])
+        response = self.client.get(self.view_path)
+
+        new_versions = get_event_versions([self.event.pk, self.other_event.pk])
+        self.assertNotEqual(new_versions[self.event.pk], versions[self.event.pk])
+        self.assertEqual(new_versions[self.other_event.pk], versions[self.other_event.pk])
+        self.assertEqual(get_fragment_stats(), {'hits': 1, 'misses': 3})
+        self.assertContains(response, 'Annuler cette candidature')
+
+    def test_candidacy_removal_evicts_its_event_fragments(self):
+        register_new_candidacy(self.event, [CandidateCandidacyRequest(candidate=self.default_user, as_player=True)])
+        self.assertContains(self.client.get(self.view_path), 'Annuler cette candidature')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_candidacy(self.event.candidacies.first())
+
+        self.assertNotContains(self.client.get(self.view_path), 'Annuler cette candidature')
+
+
+class TestEventsApi(TestCase):
+    def setUp(self) -> None:
+        self.events_path = '/events/api/events/'
+        self.candidacies_path = '/events/api/candidacies/'
+        self.default_user = User(username='test_user')
+        self.default_user.set_password('test_password')
+        self.default_user.save()
+        self.co_candidate = User(username='test_co_candidate')
+        self.co_candidate.save()
+        self.client.login(username=self.default_user.username, password='test_password')
+        self.event = new_test_event(candidate_candidacy_requests=[
+            CandidateCandidacyRequest(candidate=self.default_user, as_player=True),
+            CandidateCandidacyRequest(candidate=self.co_candidate, as_arbiter=True),
+        ])
+        self.other_event = new_test_event(candidate_candidacy_requests=[
+            CandidateCandidacyRequest(candidate=self.co_candidate, as_speaker=True),
+        ])
+
+    def tearDown(self) -> None:
+        self.client.logout()
+
+    def get_json(self, path: str, data: dict = None):
+        response = self.client.get(path, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_login_required(self):
+        self.client.logout()
+
+        response = self.client.get(self.events_path)
+
+        self.assertRedirects(response, f'/accounts/login/?next={self.events_path}')
+
+    def test_streams_events(self):
+        events = self.get_json(self.events_path)
+
+        self.assertEqual([event['uuid'] for event in events], [str(self.event.pk), str(self.other_event.pk)])
+        self.assertEqual(events[0]['name'], self.event.name)
+        self.assertEqual(events[0]['seats_taken'], 2)
+
+    def test_fields_filter(self):
+        events = self.get_json(self.events_path, {'fields': 'uuid,name'})
+
+        self.assertEqual(events[0], {'uuid': str(self.event.pk), 'name': self.event.name})
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(self.events_path, {'fields': 'uuid,password'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Unknown fields: password'})
+
+    def test_since_filter(self):
+        Event.objects.filter(pk=self.event.pk).update(updated_at=datetime(2020, 1, 1, tzinfo=timezone.utc))
+
+        events = self.get_json(self.events_path, {'since': '2021-01-01T00:00:00Z'})
+
+        self.assertEqual([event['uuid'] for event in events], [str(self.other_event.pk)])
+
+    def test_invalid_since_is_rejected(self):
+        response = self.client.get(self.events_path, {'since': 'yesterday'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_streams_candidacies_with_role_wishes_in_a_single_query(self):
+        response = self.client.get(self.candidacies_path, {'event': str(self.event.pk)})
+
+        with self.assertNumQueries(1):
+            candidacies = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual(len(candidacies), 1)
+        self.assertEqual(candidacies[0]['uuid'], str(self.event.candidacies.first().pk))
+        self.assertEqual(candidacies[0]['event'], str(self.event.pk))
+        self.assertCountEqual(candidacies[0]['candidates'], [
+            {'username': 'test_user', 'player': True, 'speaker': False, 'arbiter': False, 'disk_jockey': False},
+            {'username': 'test_co_candidate', 'player': False, 'speaker': False, 'arbiter': True, 'disk_jockey': False},
+        ])
+
+    def test_flags_waitlisted_candidacies(self):
+        Event.objects.filter(pk=self.event.pk).update(max_participants=2)
+        waitlisted_user = User.objects.create(username='test_waitlisted')
+        waitlisted = register_new_candidacy(
+            self.event, [CandidateCandidacyRequest(candidate=waitlisted_user, as_player=True)], waitlist_when_full=True,
+        )
+
+        candidacies = self.get_json(self.candidacies_path, {'event': str(self.event.pk), 'fields': 'uuid,is_waitlisted'})
+
+        self.assertEqual(candidacies, [
+            {'uuid': str(self.event.candidacies.exclude(pk=waitlisted.pk).get().pk), 'is_waitlisted': False},
+            {'uuid': str(waitlisted.pk), 'is_waitlisted': True},
+        ])
+
+    def test_candidacies_since_filter_includes_updated_role_wishes(self):
+        old = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        Candidacy.objects.update(updated_at=old)
+        CandidacyCandidate.objects.update(updated_at=old)
+        wishes = CandidacyCandidate.objects.get(candidate=self.co_candidate, candidacy__event=self.other_event)
+        wishes.player = True
+        wishes.save()
+
+        candidacies = self.get_json(self.candidacies_path, {'since': '2021-01-01T00:00:00Z', 'fields': 'event'})
+
+        self.assertEqual(candidacies, [{'event': str(self.other_event.pk)}])
+
+
+class TestRosterExport(TestCase):
+    def setUp(self) -> None:
+        self.staff_user = User(username='test_staff', email='staff@example.com', is_staff=True)
+        self.staff_user.set_password('test_password')
+        self.staff_user.save()
+        self.co_candidate = User(username='test_co_candidate', email='co@example.com')
+        self.co_candidate.save()
+        self.event = new_test_event(candidate_candidacy_requests=[
+            CandidateCandidacyRequest(candidate=self.staff_user, as_player=True, as_disk_jockey=True),
+            CandidateCandidacyRequest(candidate=self.co_candidate, as_arbiter=True),
+        ])
+        new_test_event(candidate_candidacy_requests=[CandidateCandidacyRequest(candidate=self.co_candidate, as_speaker=True)])
+        self.candidacy = self.event.candidacies.first()
+        self.view_path = f'/events/{self.event.pk}/roster.csv'
+        self.expected_rows = {
+            'candidacy,username,email,player,speaker,arbiter,disk_jockey,is_waitlisted',
+            f'{self.candidacy.pk},test_staff,staff@example.com,1,0,0,1,0',
+            f'{self.candidacy.pk},test_co_candidate,co@example.com,0,0,1,0,0',
+        }
+
+    def test_streams_one_row_per_candidate(self):
+        self.client.login(username=self.staff_user.username, password='test_password')
+
+        # The session and its user come from the cache: the roster query checks the event too.
+        with self.assertNumQueries(1):
+            response = self.client.get(self.view_path)
+            content = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(set(content.splitlines()), self.expected_rows)
+
+    def test_flags_waitlisted_candidacies_after_the_seated_ones(self):
+        self.client.login(username=self.staff_user.username, password='test_password')
+        Event.objects.filter(pk=self.event.pk).update(max_participants=2)
+        waitlisted_user = User.objects.create(username='test_waitlisted', email='waitlisted@example.com')
+        waitlisted = register_new_candidacy(
+            self.event, [CandidateCandidacyRequest(candidate=waitlisted_user, as_player=True)], waitlist_when_full=True,
+        )
+
+        lines = b''.join(self.client.get(self.view_path).streaming_content).decode().splitlines()
+
+        self.assertEqual(set(lines[:3]), self.expected_rows)
+        self.assertEqual(lines[3:], [f'{waitlisted.pk},test_waitlisted,waitlisted@example.com,1,0,0,0,1'])
+
+    def test_event_without_candidates_has_an_empty_roster(self):
+        self.client.login(username=self.staff_user.username, password='test_password')
+        event = new_test_event()
+
+        response = self.client.get(f'/events/{event.pk}/roster.csv')
+
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), [','.join(ROSTER_HEADER)])
+
+    def test_missing_or_malformed_events_are_not_found(self):
+        self.client.login(username=self.staff_user.username, password='test_password')
+
+        self.assertEqual(self.client.get(f'/events/{uuid4()}/roster.csv').status_code, 404)
+        self.assertEqual(self.client.get('/events/not-an-event/roster.csv').status_code, 404)
+
+    def test_is_reserved_to_staff(self):
+        self.co_candidate.set_password('test_password')
+        self.co_candidate.save()
+        self.client.login(username=self.co_candidate.username, password='test_password')
+
+        response = self.client.get(self.view_path)
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_roster_command(self):
+        output = StringIO()
+
+        call_command('export_roster', str(self.event.pk), stdout=output)
+
+        self.assertEqual(set(output.getvalue().splitlines()), self.expected_rows)
+
+    def test_export_roster_command_requires_an_existing_event(self):
+        with self.assertRaises(CommandError):
+            call_command('export_roster', 'not-an-event', stdout=StringIO())
+
+
+def new_lineup_candidacy(*members_roles: tuple[str, ...]) -> LineupCandidacy:
+    return LineupCandidacy(uuid=len(members_roles), members=tuple(
+        LineupMember(user_pk=object(), username=f'member {index}', roles=frozenset(roles))
+        for index, roles in enumerate(members_roles)
+    ))
+
+
+class TestLineup(TestCase):
+    def setUp(self) -> None:
+        self.staff_user = User(username='test_staff', is_staff=True)
+        self.staff_user.set_password('test_password')
+        self.staff_user.save()
+        self.co_candidate = User(username='test_co_candidate')
+        self.co_candidate.save()
+        self.arbiter = User(username='test_arbiter')
+        self.arbiter.save()
+        self.event = new_test_event(max_participants=3, candidate_candidacy_requests=[
+            CandidateCandidacyRequest(candidate=self.staff_user, as_player=True),
+            CandidateCandidacyRequest(candidate=self.co_candidate, as_player=True),
+        ])
+        Candidacy.from_event_and_candidate_candidacy_requests(self.event, [CandidateCandidacyRequest(candidate=self.arbiter, as_arbiter=True)])
+
+    def test_fills_the_seats_by_sign_up_order_without_targets(self):
+        candidacies = [new_lineup_candidacy(('player',)) for _ in range(5)]
+
+        lineup = solve_lineup(candidacies, 3, {})
+
+        self.assertEqual(lineup.candidacies, tuple(candidacies[:3]))
+        self.assertEqual(lineup.participants, 3)
+
+    def test_selects_whole_candidacies_only(self):
+        group = new_lineup_candidacy(('player',), ('player',), ('player',))
+        solo = new_lineup_candidacy(('player',))
+
+        lineup = solve_lineup([group, solo], 2, {'player': 2})
+
+        self.assertEqual(lineup.candidacies, (solo,))
+
+    def test_fills_role_targets_before_sign_up_order(self):
+        players = [new_lineup_candidacy(('player',)) for _ in range(3)]
+        late_arbiter = new_lineup_candidacy(('arbiter',))
+        late_disk_jockey_or_player = new_lineup_candidacy(('player', 'disk_jockey'))
+
+        lineup = solve_lineup([*players, late_arbiter, late_disk_jockey_or_player], 4, {'player': 2, 'arbiter': 1, 'disk_jockey': 1})
+
+        self.assertEqual(set(lineup.candidacies), {*players[:2], late_arbiter, late_disk_jockey_or_player})
+        self.assertEqual(lineup.filled, {'player': 2, 'speaker': 0, 'arbiter': 1, 'disk_jockey': 1})
+        self.assertEqual(dict(lineup.assignments)[late_disk_jockey_or_player.members[0]], 'disk_jockey')
+
+    def test_prefers_the_group_filling_more_roles(self):
+        early_players = [new_lineup_candidacy(('player',)) for _ in range(2)]
+        group = new_lineup_candidacy(('player',), ('speaker',), ('arbiter',))
+
+        lineup = solve_lineup([*early_players, group], 3, {'player': 1, 'speaker': 1, 'arbiter': 1})
+
+        self.assertEqual(lineup.candidacies, (group,))
+        self.assertEqual(lineup.missing, {'player': 0, 'speaker': 0, 'arbiter': 0, 'disk_jockey': 0})
+
+    def test_members_without_roles_take_a_seat_without_a_role(self):
+        group = new_lineup_candidacy(('player',), ())
+
+        lineup = solve_lineup([group], 2, {'player': 1})
+
+        self.assertEqual(lineup.participants, 2)
+        self.assertEqual(dict(lineup.assignments), {group.members[0]: 'player', group.members[1]: None})
+        self.assertEqual(lineup.filled_slots, 1)
+
+    def test_scales_to_thousands_of_candidacies(self):
+        roles = [('player',), ('speaker', 'arbiter'), ('disk_jockey',), ('player', 'arbiter')]
+        candidacies = [
+            new_lineup_candidacy(*(roles[(index + member) % len(roles)] for member in range(1 + index % 3)))
+            for index in range(3000)
+        ]
+
+        for seats in (50, 1000, 2500):
+            with self.subTest(seats=seats):
+                start = time.perf_counter()
+                lineup = solve_lineup(
+                    candidacies, seats,
+                    {'player': seats * 2 // 5, 'speaker': seats // 10, 'arbiter': seats // 5, 'disk_jockey': seats // 10},
+                )
+                elapsed = time.perf_counter() - start
+
+                self.assertEqual(lineup.filled_slots, seats * 4 // 5)
+                self.assertEqual(lineup.participants, seats)
+                self.assertLess(elapsed, 1)
+
+    def test_assigns_roles_by_capacity_whatever_the_number_of_slots(self):
+        members = [
+            LineupMember(user_pk=index, username=f'member {index}', roles=frozenset(roles))
+            for index, roles in enumerate([('player', 'arbiter'), ('arbiter',), ('player',)] * 2000)
+        ]
+
+        assignments = assign_roles(members, {'player': 3000, 'arbiter': 2500})
+
+        self.assertEqual(sum(fills_slot for _, fills_slot in assignments), 5500)
+        self.assertEqual(sum(role == 'arbiter' and fills_slot for role, fills_slot in assignments), 2500)
+        self.assertTrue(all(role in member.roles for member, (role, _) in zip(members, assignments)))
+
+    def test_rejects_invalid_targets(self):
+        with self.assertRaises(ValueError):
+            solve_lineup([], 2, {'juggler': 1})
+        with self.assertRaises(ValueError):
+            solve_lineup([], 2, {'player': -1})
+
+    def test_builds_the_event_lineup_from_one_query(self):
+        with self.assertNumQueries(1):
+            lineup = build_event_lineup(self.event, {'player': 1, 'arbiter': 1})
+
+        self.assertEqual(lineup.filled, {'player': 1, 'speaker': 0, 'arbiter': 1, 'disk_jockey': 0})
+        self.assertEqual(
+            [[member.username for member, _ in assignments] for _, assignments in lineup.candidacy_assignments],
+            [['test_staff', 'test_co_candidate'], ['test_arbiter']],
+        )
+
+    def test_view_is_reserved_to_staff(self):
+        self.arbiter.set_password('test_password')
+        self.arbiter.save()
+        self.client.login(username=self.arbiter.username, password='test_password')
+
+        response = self.client.get(f'/events/{self.event.pk}/lineup/')
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_view_renders_the_lineup(self):
+        self.client.login(username=self.staff_user.username, password='test_password')
+
+        response = self.client.get(f'/events/{self.event.pk}/lineup/', {'player': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['lineup'].participants, 3)
+        self.assertContains(response, 'test_co_candidate => player')
+        self.assertContains(response, 'test_arbiter => arbiter')
+
+    def test_view_renders_members_without_roles(self):
+        self.client.login(username=self.staff_user.username, password='test_password')
+        CandidacyCandidate.objects.filter(candidate=self.arbiter).update(roles=0)
+
+        response = self.client.get(f'/events/{self.event.pk}/lineup/', {'arbiter': 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'test_arbiter => sans rôle')
+
+    def test_lineup_command(self):
+        output = StringIO()
+
+        call_command('lineup', str(self.event.pk), arbiter=1, stdout=output)
+
+        self.assertIn('test_arbiter: arbiter', output.getvalue())
+        self.assertIn('arbiter: 1/1', output.getvalue())
+
+    def test_lineup_command_requires_an_existing_event(self):
+        with self.assertRaises(CommandError):
+            call_command('lineup', 'not-an-event', stdout=StringIO())
+
+
+@override_settings(ROOT_URLCONF='ludigestion.async_urls')
+class TestAsyncEventsViews(TestCase):
+    def setUp(self) -> None:
+        self.default_user = User(username='test_user')
+        self.default_user.set_password('test_password')
+        self.default_user.save()
+        self.event = new_test_event()
+        self.async_client.login(username=self.default_user.username, password='test_password')
+
+    async def test_all_events_is_served_by_the_async_view(self):
+        response = await self.async_client.get('/events/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.resolver_match.func.__module__, 'events.async_views')
+        self.assertTemplateUsed(response, 'events/events.html')
+        self.assertContains(response, self.event.name)
+
+    def test_url_namespaces_are_unique(self):
+        self.assertEqual(check_url_namespaces_unique(None), [])
+
+    async def test_login_required(self):
+        await sync_to_async(self.async_client.logout)()
+
+        response = await self.async_client.get('/events/')
+
+        self.assertRedirects(response, '/accounts/login/?next=/events/', fetch_redirect_response=False)
+
+    async def test_register_and_unregister_candidacy(self):
+        # Django 4.0's AsyncClient cannot read multipart bodies, post the form urlencoded
+        response = await self.async_client.post(
+            f'/events/{self.event.pk}/candidacies/',
+            'player=on',
+            content_type='application/x-www-form-urlencoded',
+        )
+
+        self.assertRedirects(response, '/events/', fetch_redirect_response=False)
+        candidacy = await sync_to_async(self.event.candidacies.get)()
+        self.assertEqual(await sync_to_async(candidacy.candidates.get)(), self.default_user)
+
+        response = await self.async_client.post(f'/events/{self.event.pk}/candidacies/{candidacy.pk}/cancel')
+
+        self.assertRedirects(response, '/events/', fetch_redirect_response=False)
+        self.assertEqual(await sync_to_async(self.event.candidacies.count)(), 0)
+
+    async def test_only_its_candidates_can_unregister_a_candidacy(self):
+        other_user = await sync_to_async(User.objects.create)(username='test_other_user')
+        await sync_to_async(register_new_candidacy)(
+            self.event, [CandidateCandidacyRequest(candidate=other_user, as_player=True)],
+        )
+        candidacy = await sync_to_async(self.event.candidacies.get)()
+
+        response = await self.async_client.post(f'/events/{self.event.pk}/candidacies/{candidacy.pk}/cancel')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(await sync_to_async(self.event.candidacies.count)(), 1)
+
+    async def test_full_events_register_on_the_waitlist(self):
+        await sync_to_async(Event.objects.filter(pk=self.event.pk).update)(max_participants=1, seats_taken=1)
 
-        self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, self.list_event_template)
-        self.assertIn('Postuler', response.content.decode())
+        for _ in range(2):
+            # The second registration is refused, not turned into a server error.
+            response = await self.async_client.post(
+                f'/events/{self.event.pk}/candidacies/',
+                'player=on',
+                content_type='application/x-www-form-urlencoded',
+            )
+            self.assertRedirects(response, '/events/', fetch_redirect_response=False)
+
+        candidacy = await sync_to_async(self.event.candidacies.get)()
+        self.assertTrue(candidacy.is_waitlisted)
 
 
 class TestEventRegisterCandidacy(TestCase):
@@ -213,6 +1036,34 @@ class TestEventRegisterCandidacy(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(self.event_to_register_to.candidacies.count(), 0)
 
+    def test_group_candidates_are_not_offered_an_individual_candidacy(self):
+        co_candidate = User(username='test_co_candidate')
+        co_candidate.save()
+        register_new_candidacy(self.event_to_register_to, [
+            CandidateCandidacyRequest(candidate=co_candidate, as_player=True),
+            CandidateCandidacyRequest(candidate=self.default_user, as_arbiter=True),
+        ])
+
+        response = self.client.get('/events/')
+
+        self.assertNotContains(response, f'action="{self.view_path}"')
+
+    def test_registration_on_an_event_without_seats_is_explained(self):
+        Event.objects.filter(pk=self.event_to_register_to.pk).update(max_participants=0)
+
+        response = self.client.post(self.view_path, {'player': ['on']}, follow=True)
+
+        self.assertContains(response, "Il n&#x27;y a plus assez de places sur cet évènement")
+        self.assertEqual(self.event_to_register_to.candidacies.count(), 0)
+
+    def test_refused_registration_is_explained(self):
+        register_new_candidacy(self.event_to_register_to, [CandidateCandidacyRequest(candidate=self.default_user, as_player=True)])
+
+        response = self.client.post(self.view_path, {'player': ['on']}, follow=True)
+
+        self.assertContains(response, 'Vous êtes déjà candidat à cet évènement')
+        self.assertEqual(self.event_to_register_to.candidacies.count(), 1)
+
 
 class TestEventUnregisterCandidacy(TestCase):
     def setUp(self) -> None:
@@ -245,6 +1096,19 @@ class TestEventUnregisterCandidacy(TestCase):
         event_with_registration = Event.objects.get(uuid=self.event_to_unregister_from.uuid)
         self.assertEqual(event_with_registration.candidacies.count(), 0)
 
+    def test_only_its_candidates_can_remove_a_candidacy(self):
+        other_user = User(username='test_other_user')
+        other_user.set_password('test_password')
+        other_user.save()
+        self.client.login(username=other_user.username, password='test_password')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.view_path)
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.event_to_unregister_from.candidacies.count(), 1)
+        self.assertFalse(Job.objects.exists())
+
 
 class TestCandidacyModel(TestCase):
     def setUp(self) -> None:
@@ -285,6 +1149,342 @@ class TestCandidacyModel(TestCase):
         self.assertEqual(str(e.exception), 'At least one CandidacyCandidateRequest is required to create a candidacy')
 
 
+class TestCandidacyCandidateRoles(TestCase):
+    def setUp(self) -> None:
+        self.player = User(username='test_player')
+        self.player.save()
+        self.arbiter = User(username='test_arbiter')
+        self.arbiter.save()
+        self.event = new_test_event(candidate_candidacy_requests=[
+            CandidateCandidacyRequest(candidate=self.player, as_player=True, as_disk_jockey=True),
+            CandidateCandidacyRequest(candidate=self.arbiter, as_arbiter=True, as_speaker=True),
+        ])
+        self.candidacy = self.event.candidacies.get()
+
+    def test_roles_are_stored_as_a_bitmask(self):
+        roles = dict(CandidacyCandidate.objects.values_list('candidate__username', 'roles'))
+
+        self.assertEqual(roles, {
+            'test_player': Role.PLAYER | Role.DISK_JOCKEY,
+            'test_arbiter': Role.ARBITER | Role.SPEAKER,
+        })
+
+    def test_role_flags_read_and_write_the_bitmask(self):
+        candidacy_candidate = CandidacyCandidate.objects.get(candidate=self.player)
+        self.assertTrue(candidacy_candidate.player)
+        self.assertFalse(candidacy_candidate.arbiter)
+
+        candidacy_candidate.player = False
+        candidacy_candidate.arbiter = True
+        candidacy_candidate.save()
+
+        candidacy_candidate.refresh_from_db()
+        self.assertEqual(candidacy_candidate.roles, Role.ARBITER | Role.DISK_JOCKEY)
+
+    def test_with_role(self):
+        arbiters = CandidacyCandidate.objects.with_role(Role.ARBITER)
+        player_disk_jockeys = CandidacyCandidate.objects.with_role(Role.PLAYER | Role.DISK_JOCKEY)
+
+        self.assertEqual([candidacy_candidate.candidate for candidacy_candidate in arbiters], [self.arbiter])
+        self.assertEqual([candidacy_candidate.candidate for candidacy_candidate in player_disk_jockeys], [self.player])
+        self.assertFalse(CandidacyCandidate.objects.with_role(Role.PLAYER | Role.ARBITER).exists())
+
+    def test_role_filtered_candidacy_queries_use_the_roles_index(self):
+        query_plan = CandidacyCandidate.objects.filter(candidacy=self.candidacy).with_role(Role.ARBITER).explain()
+
+        self.assertIn('candidacy_candidate_roles_idx', query_plan)
+
+
+class TestBulkCandidacyRegistration(TestCase):
+    def setUp(self) -> None:
+        self.candidates = [User(username=f'test_user{index}') for index in range(5)]
+        User.objects.bulk_create(self.candidates)
+        self.candidate_candidacy_requests = [
+            CandidateCandidacyRequest(
+                candidate=candidate,
+                as_player=True,
+            ) for candidate in self.candidates
+        ]
+
+    def test_group_candidacy_candidates_are_written_with_a_single_insert(self):
+        event = new_test_event()
+
+        with CaptureQueriesContext(connection) as captured_queries:
+            Candidacy.from_event_and_candidate_candidacy_requests(event, self.candidate_candidacy_requests)
+
+        candidacy_candidate_inserts = [
+            query for query in captured_queries
+            if query['sql'].startswith('INSERT INTO "candidacy_candidate"')
+        ]
+        self.assertEqual(len(candidacy_candidate_inserts), 1)
+        self.assertEqual(event.candidacies.first().candidates.count(), len(self.candidates))
+
+    def test_register_new_candidacies_registers_every_pair(self):
+        events = [new_test_event() for _ in range(3)]
+
+        candidacies = register_new_candidacies(
+            [(event, self.candidate_candidacy_requests) for event in events],
+            batch_size=2,
+        )
+
+        self.assertEqual(len(candidacies), len(events))
+        for event in events:
+            self.assertEqual(event.candidacies.count(), 1)
+            self.assertEqual(event.candidacies.first().candidates.count(), len(self.candidates))
+
+    def test_register_new_candidacies_rolls_back_an_invalid_batch(self):
+        events = [new_test_event() for _ in range(3)]
+        duplicated_candidate_requests = self.candidate_candidacy_requests[:1] * 2
+
+        with self.assertRaises(ValueError) as e:
+            register_new_candidacies(
+                [
+                    (events[0], self.candidate_candidacy_requests),
+                    (events[1], self.candidate_candidacy_requests),
+                    (events[2], duplicated_candidate_requests),
+                ],
+                batch_size=2,
+            )
+
+        self.assertEqual(str(e.exception), 'A candidate cannot be registered on an event more than once.')
+        self.assertEqual(events[0].candidacies.count(), 1)
+        self.assertEqual(events[1].candidacies.count(), 1)
+        self.assertEqual(events[2].candidacies.count(), 0)
+
+
+class TestEventSeats(TestCase):
+    def setUp(self) -> None:
+        self.candidates = [User(username=f'test_user{index}') for index in range(3)]
+        User.objects.bulk_create(self.candidates)
+        self.candidate_candidacy_requests = [
+            CandidateCandidacyRequest(candidate=candidate, as_player=True) for candidate in self.candidates
+        ]
+        self.event = new_test_event(max_participants=4)
+
+    def test_registering_takes_one_seat_per_candidate(self):
+        register_new_candidacy(self.event, self.candidate_candidacy_requests)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 3)
+        self.assertFalse(self.event.is_full)
+
+    def test_candidacy_is_refused_when_it_does_not_fit(self):
+        register_new_candidacy(self.event, self.candidate_candidacy_requests[:2])
+
+        with self.assertRaises(EventIsFull):
+            register_new_candidacy(self.event, self.candidate_candidacy_requests)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+        self.assertEqual(self.event.candidacies.count(), 1)
+
+    def test_stale_event_instance_cannot_overbook(self):
+        stale_event = Event.objects.get(pk=self.event.pk)
+        register_new_candidacy(self.event, self.candidate_candidacy_requests)
+
+        with self.assertRaises(EventIsFull):
+            register_new_candidacy(stale_event, self.candidate_candidacy_requests[:2])
+
+    def test_event_is_full_once_every_seat_is_taken(self):
+        late_candidate = User(username='test_late_user')
+        late_candidate.save()
+        register_new_candidacy(self.event, self.candidate_candidacy_requests)
+        register_new_candidacy(self.event, [CandidateCandidacyRequest(candidate=late_candidate, as_arbiter=True)])
+
+        self.event.refresh_from_db()
+        self.assertTrue(self.event.is_full)
+
+    def test_removing_a_candidacy_releases_its_seats(self):
+        register_new_candidacy(self.event, self.candidate_candidacy_requests)
+
+        remove_candidacy(self.event.candidacies.first())
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 0)
+
+    def test_removing_a_group_candidacy_releases_its_seats_at_once(self):
+        register_new_candidacy(self.event, self.candidate_candidacy_requests)
+        candidacy = self.event.candidacies.get()
+
+        with self.assertNumQueries(8):
+            remove_candidacy(candidacy)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 0)
+
+    def test_deleting_candidates_outside_remove_candidacy_releases_their_seats(self):
+        register_new_candidacy(self.event, self.candidate_candidacy_requests)
+
+        CandidacyCandidate.objects.get(candidate=self.candidates[0]).delete()
+        self.candidates[1].delete()
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 1)
+
+    def test_recount_seats_command_repairs_counters(self):
+        register_new_candidacy(self.event, self.candidate_candidacy_requests)
+        Event.objects.filter(pk=self.event.pk).update(seats_taken=0)
+        empty_event = new_test_event()
+        Event.objects.filter(pk=empty_event.pk).update(seats_taken=5)
+
+        call_command('recount_seats', stdout=StringIO())
+
+        self.event.refresh_from_db()
+        empty_event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 3)
+        self.assertEqual(empty_event.seats_taken, 0)
+
+
+class TestWaitlist(TestCase):
+    def setUp(self) -> None:
+        self.candidates = [User(username=f'test_user{index}', email=f'test_user{index}@example.com') for index in range(6)]
+        User.objects.bulk_create(self.candidates)
+        self.event = new_test_event(max_participants=3)
+        self.seated_candidacy = self.register(self.candidates[:2])
+
+    def register(self, candidates: list[User]) -> Candidacy:
+        return register_new_candidacy(
+            self.event,
+            [CandidateCandidacyRequest(candidate=candidate, as_player=True) for candidate in candidates],
+            waitlist_when_full=True,
+        )
+
+    def waitlist(self) -> list[Candidacy]:
+        return list(Candidacy.objects.waitlist(self.event.pk))
+
+    def test_candidacies_that_do_not_fit_join_the_waitlist_in_sign_up_order(self):
+        group = self.register(self.candidates[2:4])
+        solo = self.register(self.candidates[4:5])
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+        self.assertEqual(self.waitlist(), [group, solo])
+
+    def test_free_seats_are_kept_for_the_waitlist(self):
+        group = self.register(self.candidates[2:4])
+
+        # The last seat would fit this candidacy, but the group signed up first.
+        solo = self.register(self.candidates[4:5])
+
+        self.assertTrue(solo.is_waitlisted)
+        self.assertEqual(self.waitlist(), [group, solo])
+
+    def test_groups_larger_than_the_event_are_refused(self):
+        with self.assertRaises(EventIsFull):
+            self.register(self.candidates[2:6])
+
+        self.assertEqual(self.waitlist(), [])
+
+    def test_cancellation_promotes_the_waitlist_head_that_fits(self):
+        group = self.register(self.candidates[2:4])
+        solo = self.register(self.candidates[4:5])
+        other_solo = self.register(self.candidates[5:6])
+
+        remove_candidacy(self.seated_candidacy)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 3)
+        self.assertEqual(self.waitlist(), [other_solo])
+        group.refresh_from_db()
+        solo.refresh_from_db()
+        self.assertFalse(group.is_waitlisted)
+        self.assertFalse(solo.is_waitlisted)
+
+    def test_groups_are_promoted_only_when_they_fit_entirely(self):
+        solo = self.register(self.candidates[2:3])
+        group = self.register(self.candidates[3:6])
+        self.assertEqual(self.waitlist(), [group])
+
+        remove_candidacy(solo)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+        self.assertEqual(self.waitlist(), [group])
+
+        remove_candidacy(self.seated_candidacy)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 3)
+        self.assertEqual(self.waitlist(), [])
+
+    def test_waitlisted_candidacies_release_no_seats(self):
+        waitlisted = self.register(self.candidates[2:4])
+
+        remove_candidacy(waitlisted)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+        self.assertEqual(self.waitlist(), [])
+
+    def test_a_waitlisted_group_leaving_promotes_the_candidacies_behind_it(self):
+        group = self.register(self.candidates[3:5])
+        solo = self.register(self.candidates[5:6])
+        self.assertEqual(self.waitlist(), [group, solo])
+
+        remove_candidacy(group)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 3)
+        self.assertEqual(self.waitlist(), [])
+
+    def test_a_stale_waitlisted_instance_still_releases_its_promoted_seats(self):
+        group = self.register(self.candidates[2:4])
+        remove_candidacy(self.seated_candidacy)
+
+        remove_candidacy(group)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 0)
+
+    def test_promotion_reads_the_waitlist_with_a_single_query(self):
+        for index in range(2, 6):
+            self.register(self.candidates[index:index + 1])
+        # Two of the three seats freed.
+        Event.objects.filter(pk=self.event.pk).update(seats_taken=1)
+
+        # The waitlist, the promotion, the seats and the promoted candidates.
+        with self.assertNumQueries(4):
+            promoted = Candidacy.objects.promote_waitlisted(self.event.pk)
+
+        self.assertEqual(len(promoted), 2)
+        self.assertEqual([candidacy.nb_seats for candidacy in promoted], [1, 1])
+
+    def test_recount_leaves_the_waitlist_out(self):
+        self.register(self.candidates[2:4])
+        Event.objects.filter(pk=self.event.pk).update(seats_taken=0)
+
+        Event.objects.filter(pk=self.event.pk).recount_seats()
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+
+    def test_promoted_candidates_are_notified(self):
+        self.register(self.candidates[4:5])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.register(self.candidates[2:3])
+        run_due_jobs()
+        self.assertIn("liste d'attente", mail.outbox[-1].body)
+        mail.outbox.clear()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_candidacy(self.seated_candidacy)
+        run_due_jobs()
+
+        subjects = {message.to[0]: message.subject for message in mail.outbox}
+        self.assertEqual(subjects['test_user2@example.com'], f'Place libérée : {self.event.name}')
+        self.assertEqual(subjects['test_user0@example.com'], f'Candidature annulée : {self.event.name}')
+
+    def test_full_events_offer_to_join_the_waitlist(self):
+        self.register(self.candidates[2:3])
+        self.client.force_login(self.candidates[5])
+
+        response = self.client.get('/events/')
+
+        self.assertContains(response, "Rejoindre la liste d'attente")
+        self.client.post(f'/events/{self.event.pk}/candidacies/', {'player': ['on']})
+        self.assertEqual(len(self.waitlist()), 1)
+
+
 class TestCandidateCandidacyRequest(TestCase):
     def setUp(self) -> None:
         self.user = User(username='test_user')
@@ -337,6 +1537,176 @@ class TestCandidateCandidacyRequest(TestCase):
         self.assertEqual(str(e.exception), 'At least one role is required to create a candidacy request')
 
 
+class TestCandidateUniquenessPerEvent(TestCase):
+    def setUp(self) -> None:
+        self.default_user = User(username='test_user')
+        self.default_user.set_password('test_password')
+        self.default_user.save()
+        self.co_candidate = User(username='test_co_candidate')
+        self.co_candidate.save()
+        self.registered_candidate = User(username='test_registered_candidate')
+        self.registered_candidate.save()
+        self.event = new_test_event(candidate_candidacy_requests=[
+            CandidateCandidacyRequest(candidate=self.registered_candidate, as_player=True),
+        ])
+        self.view_path = f'/events/{self.event.pk}/candidacies/bulk/'
+        self.client.login(username=self.default_user.username, password='test_password')
+
+    def post_group_candidacy(self, *co_candidates: User):
+        data = {'player': ['on'], 'form-TOTAL_FORMS': ['10'], 'form-INITIAL_FORMS': ['0']}
+        for index, co_candidate in enumerate(co_candidates):
+            data[f'form-{index}-candidate'] = [co_candidate.uuid]
+            data[f'form-{index}-player'] = ['on']
+        return self.client.post(self.view_path, data=data)
+
+    def test_a_candidate_cannot_hold_two_candidacies_on_an_event(self):
+        with self.assertRaises(CandidateAlreadyRegistered):
+            register_new_candidacy(self.event, [
+                CandidateCandidacyRequest(candidate=self.co_candidate, as_player=True),
+                CandidateCandidacyRequest(candidate=self.registered_candidate, as_arbiter=True),
+            ])
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.candidacies.count(), 1)
+        self.assertEqual(self.event.seats_taken, 1)
+
+    def test_a_candidate_can_hold_candidacies_on_several_events(self):
+        other_event = new_test_event()
+
+        register_new_candidacy(other_event, [CandidateCandidacyRequest(candidate=self.registered_candidate, as_arbiter=True)])
+
+        self.assertEqual(self.registered_candidate.candidacies.count(), 2)
+
+    def test_candidacy_candidates_are_denormalised_with_their_event(self):
+        register_new_candidacy(self.event, [CandidateCandidacyRequest(candidate=self.co_candidate, as_player=True)])
+
+        self.assertEqual(
+            set(CandidacyCandidate.objects.values_list('event', flat=True)),
+            {self.event.pk},
+        )
+
+    def test_registration_does_not_read_existing_candidacies(self):
+        with CaptureQueriesContext(connection) as captured_queries:
+            register_new_candidacy(self.event, [CandidateCandidacyRequest(candidate=self.co_candidate, as_player=True)])
+
+        self.assertFalse([
+            query for query in captured_queries
+            if query['sql'].startswith('SELECT') and 'candidacy_candidate' in query['sql']
+        ])
+
+    def test_single_registration_of_an_already_registered_candidate_is_ignored(self):
+        self.client.logout()
+        self.registered_candidate.set_password('test_password')
+        self.registered_candidate.save()
+        self.client.login(username=self.registered_candidate.username, password='test_password')
+
+        response = self.client.post(f'/events/{self.event.pk}/candidacies/', data={'arbiter': ['on']})
+
+        self.assertRedirects(response, '/events/', fetch_redirect_response=False)
+        self.assertEqual(self.event.candidacies.count(), 1)
+
+    def test_already_registered_co_candidate_is_reported_on_its_form(self):
+        response = self.post_group_candidacy(self.co_candidate, self.registered_candidate)
+
+        self.assertEqual(response.status_code, 200)
+        formset = response.context['form']
+        self.assertEqual(formset.forms[0].errors, {})
+        self.assertEqual(formset.forms[1].errors['candidate'], ['Déjà candidat à cet évènement'])
+        self.assertEqual(self.event.candidacies.count(), 1)
+
+    def test_co_candidate_selected_twice_is_reported_on_its_form(self):
+        response = self.post_group_candidacy(self.co_candidate, self.co_candidate)
+
+        formset = response.context['form']
+        self.assertEqual(formset.forms[1].errors['candidate'], ['Candidat sélectionné plusieurs fois'])
+        self.assertEqual(self.event.candidacies.count(), 1)
+
+    def test_already_registered_user_is_reported_on_the_group(self):
+        register_new_candidacy(self.event, [CandidateCandidacyRequest(candidate=self.default_user, as_player=True)])
+
+        response = self.post_group_candidacy(self.co_candidate)
+
+        self.assertEqual(response.context['form'].non_form_errors(), ['Vous êtes déjà candidat à cet évènement'])
+        self.assertContains(response, 'Vous êtes déjà candidat à cet évènement')
+
+
+class TestGroupCandidacyFormSet(TestCase):
+    def setUp(self) -> None:
+        self.default_user = User(username='test_user')
+        self.default_user.set_password('test_password')
+        self.default_user.save()
+        self.co_candidates = [User(username=f'test_co_candidate{index}') for index in range(8)]
+        User.objects.bulk_create(self.co_candidates)
+        self.client.login(username=self.default_user.username, password='test_password')
+
+    def group_candidacy_data(self, *candidate_pks) -> dict:
+        data = {'player': 'on', 'form-TOTAL_FORMS': '10', 'form-INITIAL_FORMS': '0'}
+        for index, candidate_pk in enumerate(candidate_pks):
+            data[f'form-{index}-candidate'] = str(candidate_pk)
+            data[f'form-{index}-arbiter'] = 'on'
+        return data
+
+    def count_sign_up_queries(self, nb_co_candidates: int) -> int:
+        event = new_test_event()
+        data = self.group_candidacy_data(*(co_candidate.pk for co_candidate in self.co_candidates[:nb_co_candidates]))
+        with CaptureQueriesContext(connection) as captured_queries:
+            response = self.client.post(f'/events/{event.pk}/candidacies/bulk/', data=data)
+        self.assertRedirects(response, '/events/', fetch_redirect_response=False)
+        self.assertEqual(CandidacyCandidate.objects.filter(event=event).count(), nb_co_candidates + 1)
+        return len(captured_queries)
+
+    def test_group_sign_up_costs_a_constant_number_of_queries(self):
+        self.assertEqual(self.count_sign_up_queries(1), self.count_sign_up_queries(8))
+
+    def test_candidates_are_resolved_with_a_single_query(self):
+        formset = GroupCandidacyFormSet(self.group_candidacy_data(*(co_candidate.pk for co_candidate in self.co_candidates)))
+
+        with self.assertNumQueries(1):
+            self.assertTrue(formset.is_valid())
+
+        self.assertEqual([form.cleaned_data['candidate'] for form in formset.forms], self.co_candidates)
+
+    def test_only_submitted_forms_are_built(self):
+        data = self.group_candidacy_data(self.co_candidates[0].pk)
+        data['form-3-candidate'] = str(self.co_candidates[1].pk)
+        data['form-3-player'] = 'on'
+
+        formset = GroupCandidacyFormSet(data)
+
+        self.assertEqual([form.prefix for form in formset.forms], ['form-0', 'form-3'])
+        self.assertEqual(len(GroupCandidacyFormSet().forms), 10)
+
+    def test_rows_posted_empty_by_the_browser_are_not_built(self):
+        data = self.group_candidacy_data(self.co_candidates[0].pk)
+        for index in range(1, 10):
+            data[f'form-{index}-candidate'] = ''
+            data[f'form-{index}-candidate_search'] = ''
+
+        formset = GroupCandidacyFormSet(QueryDict(urlencode(data)))
+
+        self.assertEqual([form.prefix for form in formset.forms], ['form-0'])
+        self.assertTrue(formset.is_valid())
+
+    def test_unknown_candidates_are_reported(self):
+        formset = GroupCandidacyFormSet(self.group_candidacy_data(self.co_candidates[0].pk, uuid4(), 'not-a-uuid'))
+
+        self.assertFalse(formset.is_valid())
+        self.assertEqual(formset.forms[0].errors, {})
+        self.assertEqual(list(formset.forms[1].errors), ['candidate'])
+        self.assertEqual(list(formset.forms[2].errors), ['candidate'])
+
+    def test_duplicated_candidates_are_reported(self):
+        formset = GroupCandidacyFormSet(
+            self.group_candidacy_data(self.co_candidates[0].pk, self.default_user.pk, self.co_candidates[0].pk),
+            main_candidate=self.default_user,
+        )
+
+        self.assertFalse(formset.is_valid())
+        self.assertEqual(formset.forms[0].errors, {})
+        self.assertEqual(formset.forms[1].errors['candidate'], ['Candidat sélectionné plusieurs fois'])
+        self.assertEqual(formset.forms[2].errors['candidate'], ['Candidat sélectionné plusieurs fois'])
+
+
 class TestCandidacyAsAGroup(TestCase):
     def setUp(self) -> None:
         self.default_user = User(username='test_user')
@@ -366,6 +1736,27 @@ class TestCandidacyAsAGroup(TestCase):
 
         self.assertEqual(response.status_code, 200)
 
+    def test_page_does_not_embed_the_users(self):
+        User.objects.bulk_create(User(username=f'test_member_{index}') for index in range(50))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.view_path)
+
+        self.assertNotContains(response, 'test_member_')
+        self.assertContains(response, 'data-search-url="/users/search/"', count=10)
+        self.assertContains(response, 'js/user_autocomplete.js')
+
+    def test_picked_users_are_shown_again_when_the_form_has_errors(self):
+        response = self.client.post(self.view_path, {
+            'player': 'on', 'form-TOTAL_FORMS': '10', 'form-INITIAL_FORMS': '0',
+            'form-0-candidate': str(self.co_candidate.pk), 'form-0-candidate_search': self.co_candidate.username, 'form-0-player': 'on',
+            'form-1-candidate': str(self.co_candidate.pk), 'form-1-candidate_search': self.co_candidate.username, 'form-1-player': 'on',
+        })
+
+        self.assertContains(response, 'Candidat sélectionné plusieurs fois')
+        self.assertContains(response, f'name="form-0-candidate_search" id="id_form-0-candidate_search" value="{self.co_candidate.username}"')
+        self.assertContains(response, f'name="form-1-candidate_search" id="id_form-1-candidate_search" value="{self.co_candidate.username}"')
+
     def test_user_is_preselected_as_part_of_the_group(self):
         response = self.client.get(self.view_path)
 
@@ -505,3 +1896,296 @@ class TestCandidacyAsAGroup(TestCase):
 
         event_with_registration = Event.objects.get(uuid=self.event_to_register_to.uuid)
         self.assertEqual(event_with_registration.candidacies.count(), 0)
+
+
+class TestEventSearch(TestCase):
+    def setUp(self) -> None:
+        self.default_user = User(username='test_user')
+        self.default_user.set_password('test_password')
+        self.default_user.save()
+        self.client.login(username=self.default_user.username, password='test_password')
+        self.final = new_test_event(name='Grande finale', description='Match de clôture', location='Théâtre Sorano')
+        self.match = new_test_event(name='Match amical', description='Contre la troupe voisine', location='Salle des fêtes')
+        self.workshop = new_test_event(name='Atelier', description='Échauffements', location='Théâtre du Pavé')
+
+    def test_ranks_name_matches_first(self):
+        self.assertEqual(EVENT_SEARCH_INDEX.search('match'), [self.match, self.final])
+
+    def test_matches_every_word_prefix_and_ignores_accents(self):
+        self.assertEqual(EVENT_SEARCH_INDEX.search('theatre sor'), [self.final])
+        self.assertEqual(EVENT_SEARCH_INDEX.search('ECHAUFF'), [self.workshop])
+
+    def test_user_input_never_reaches_the_query_syntax(self):
+        self.assertEqual(EVENT_SEARCH_INDEX.search('"match" OR NEAR(*'), [])
+        self.assertEqual(EVENT_SEARCH_INDEX.search('match*)'), [self.match, self.final])
+        self.assertEqual(EVENT_SEARCH_INDEX.search(' !? '), [])
+
+    def test_does_not_match_the_primary_key(self):
+        self.assertEqual(EVENT_SEARCH_INDEX.search(self.match.pk.hex), [])
+
+    def test_is_kept_in_sync_with_the_events(self):
+        self.match.name = 'Cabaret'
+        self.match.save()
+        Event.objects.filter(pk=self.workshop.pk).delete()
+        [bulk_event] = Event.objects.bulk_create([Event(
+            name='Cabaret de printemps', description='', date_and_time=self.final.date_and_time, location='', max_participants=10,
+        )])
+
+        self.assertCountEqual(EVENT_SEARCH_INDEX.search('cabaret'), [self.match, bulk_event])
+        self.assertEqual(EVENT_SEARCH_INDEX.search('atelier'), [])
+
+    def test_view_lists_the_ranked_events_with_one_query(self):
+        new_test_event(name='Match retour')
+        with CaptureQueriesContext(connection) as captured_queries:
+            response = self.client.get('/events/search/', {'q': 'match'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['events'][-1], self.final)
+        self.assertContains(response, 'Match amical')
+        self.assertEqual(len([query for query in captured_queries if 'event_search' in query['sql']]), 1)
+
+    def test_view_requires_a_login(self):
+        self.client.logout()
+        response = self.client.get('/events/search/', {'q': 'match'})
+
+        self.assertEqual(response.status_code, 302)
+
+
+class TestUserCalendar(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.default_user = User(username='test_user')
+        self.default_user.save()
+        self.co_candidate = User(username='test_co_candidate')
+        self.co_candidate.save()
+        self.event = new_test_event(
+            name='Match, de gala',
+            description='Ouverture des portes à 20h; entrée libre',
+            date_and_time=datetime(2100, 5, 1, 19, 30, tzinfo=timezone.utc),
+            candidate_candidacy_requests=[
+                CandidateCandidacyRequest(candidate=self.default_user, as_player=True, as_speaker=True),
+                CandidateCandidacyRequest(candidate=self.co_candidate, as_arbiter=True),
+            ],
+        )
+        self.other_event = new_test_event(
+            name='Cabaret',
+            candidate_candidacy_requests=[CandidateCandidacyRequest(candidate=self.co_candidate, as_player=True)],
+        )
+        self.view_path = f'/events/calendar/{self.default_user.calendar_token}.ics'
+
+    def test_lists_the_events_of_the_user_candidacies(self):
+        response = self.client.get(self.view_path)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertIn('SUMMARY:Match\\, de gala\r\n', body)
+        self.assertIn('DTSTART:21000501T193000Z\r\n', body)
+        unfolded_body = body.replace('\r\n ', '')
+        self.assertIn('Ouverture des portes à 20h\\; entrée libre\\n\\nRôles : joueur\\, MC', unfolded_body)
+        self.assertNotIn('Cabaret', unfolded_body)
+
+    def test_folds_long_lines_without_cutting_characters(self):
+        line = 'DESCRIPTION:' + 'é' * 100
+
+        folded_lines = fold_line(line).split('\r\n')
+
+        self.assertTrue(all(len(folded_line.encode()) <= 75 for folded_line in folded_lines))
+        self.assertEqual(''.join(folded_line[1:] if index else folded_line for index, folded_line in enumerate(folded_lines)), line)
+
+    def test_is_built_with_one_query(self):
+        with self.assertNumQueries(1):
+            build_user_calendar(self.default_user)
+
+    def test_answers_not_modified_to_a_matching_strong_etag(self):
+        response = self.client.get(self.view_path)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.view_path, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_is_cached_until_the_user_candidacies_change(self):
+        first_response = self.client.get(self.view_path)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.view_path).content, first_response.content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            register_new_candidacy(self.other_event, [CandidateCandidacyRequest(candidate=self.default_user, as_arbiter=True)])
+        registered_response = self.client.get(self.view_path, HTTP_IF_NONE_MATCH=first_response['ETag'])
+
+        self.assertEqual(registered_response.status_code, 200)
+        self.assertIn('SUMMARY:Cabaret', registered_response.content.decode())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_candidacy(self.other_event.candidacies.get(candidates=self.default_user))
+        removed_response = self.client.get(self.view_path, HTTP_IF_NONE_MATCH=registered_response['ETag'])
+
+        self.assertEqual(removed_response.status_code, 200)
+        self.assertNotIn('Cabaret', removed_response.content.decode())
+
+    def test_has_no_last_modified_date_which_removals_would_not_move(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            register_new_candidacy(self.other_event, [CandidateCandidacyRequest(candidate=self.default_user, as_arbiter=True)])
+        response = self.client.get(self.view_path)
+        self.assertNotIn('Last-Modified', response)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_candidacy(self.other_event.candidacies.get(candidates=self.default_user))
+        response = self.client.get(self.view_path, HTTP_IF_MODIFIED_SINCE=http_date(time.time()))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Cabaret', response.content.decode())
+
+    def test_is_invalidated_when_an_event_of_the_user_changes(self):
+        first_response = self.client.get(self.view_path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.location = 'Théâtre Sorano'
+            self.event.save()
+        response = self.client.get(self.view_path, HTTP_IF_NONE_MATCH=first_response['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('LOCATION:Théâtre Sorano', response.content.decode())
+
+    def test_is_not_invalidated_by_other_users_candidacies(self):
+        self.client.get(self.view_path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_candidacy(self.other_event.candidacies.get())
+
+        with self.assertNumQueries(1):
+            self.client.get(self.view_path)
+
+    def test_unknown_token_is_not_found(self):
+        response = self.client.get(f'/events/calendar/{uuid4()}.ics')
+
+        self.assertEqual(response.status_code, 404)
+
+
+class TestCandidacyNotifications(TestCase):
+    def setUp(self) -> None:
+        self.default_user = User(username='test_user', email='test_user@example.com')
+        self.default_user.save()
+        self.co_candidate = User(username='test_co_candidate')
+        self.co_candidate.save()
+        self.event = new_test_event(name='Match de gala')
+
+    def register(self, candidate: User) -> Candidacy:
+        with self.captureOnCommitCallbacks(execute=True):
+            register_new_candidacy(self.event, [CandidateCandidacyRequest(candidate=candidate, as_player=True)])
+        return Candidacy.objects.get(candidates=candidate)
+
+    def test_registration_email_is_sent_by_the_worker_after_the_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            register_new_candidacy(self.event, [
+                CandidateCandidacyRequest(candidate=self.default_user, as_player=True, as_speaker=True),
+                CandidateCandidacyRequest(candidate=self.co_candidate, as_arbiter=True),
+            ])
+            self.assertFalse(Job.objects.exists())
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(run_due_jobs(), 1)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['test_user@example.com'])
+        self.assertEqual(mail.outbox[0].subject, 'Candidature enregistrée : Match de gala')
+        self.assertIn('en tant que joueur, MC', mail.outbox[0].body)
+
+    def test_cancellation_email_is_sent_by_the_worker(self):
+        candidacy = self.register(self.default_user)
+        run_due_jobs()
+        mail.outbox.clear()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_candidacy(candidacy)
+        run_due_jobs()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Candidature annulée : Match de gala')
+
+    def test_cancellation_of_a_deleted_event_sends_nothing(self):
+        candidacy = self.register(self.default_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_candidacy(candidacy)
+        self.event.delete()
+        mail.outbox.clear()
+
+        run_due_jobs()
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertFalse(Job.objects.exists())
+
+    def test_a_batch_of_emails_uses_one_connection(self):
+        for index in range(3):
+            candidate = User(username=f'test_candidate_{index}', email=f'test_candidate_{index}@example.com')
+            candidate.save()
+            self.register(candidate)
+
+        with patch.object(notifications, 'get_connection', wraps=notifications.get_connection) as get_connection:
+            self.assertEqual(run_due_jobs(), 3)
+
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_a_failed_email_only_retries_its_own_job(self):
+        for index in range(2):
+            candidate = User(username=f'test_candidate_{index}', email=f'test_candidate_{index}@example.com')
+            candidate.save()
+            self.register(candidate)
+        send_messages = mail.get_connection().__class__.send_messages
+
+        def fail_for_candidate_0(connection, messages):
+            if any('test_candidate_0@example.com' in message.to for message in messages):
+                raise ConnectionError('Recipient refused')
+            return send_messages(connection, messages)
+
+        with patch.object(mail.get_connection().__class__, 'send_messages', fail_for_candidate_0):
+            with self.assertLogs('ludigestion.jobs', level='ERROR'):
+                self.assertEqual(run_due_jobs(), 2)
+        [job] = Job.objects.all()
+        self.assertEqual(job.status, Job.Status.PENDING)
+        self.assertIn('Recipient refused', job.last_error)
+        Job.objects.update(run_after=datetime.now(timezone.utc))
+
+        self.assertEqual(run_due_jobs(), 1)
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['test_candidate_0@example.com', 'test_candidate_1@example.com'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_bulk_registrations_send_one_email_per_candidacy(self):
+        events = [new_test_event(name=f'Match {index}') for index in range(3)]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            register_new_candidacies(
+                [(event, [CandidateCandidacyRequest(candidate=self.default_user, as_player=True)]) for event in events],
+                batch_size=2,
+            )
+        self.assertEqual(run_due_jobs(), 3)
+
+        self.assertEqual(sorted(message.subject for message in mail.outbox), [f'Candidature enregistrée : Match {index}' for index in range(3)])
+
+    def test_group_registration_form_sends_the_registration_email(self):
+        self.default_user.set_password('test_password')
+        self.default_user.save()
+        self.client.login(username=self.default_user.username, password='test_password')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/events/{self.event.pk}/candidacies/bulk/', data={
+                'player': 'on', 'form-TOTAL_FORMS': '10', 'form-INITIAL_FORMS': '0',
+                'form-0-candidate': str(self.co_candidate.pk), 'form-0-arbiter': 'on',
+            })
+        self.assertRedirects(response, '/events/', fetch_redirect_response=False)
+        run_due_jobs()
+
+        [message] = mail.outbox
+        self.assertEqual(message.to, ['test_user@example.com'])
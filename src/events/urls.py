@@ -1,12 +1,20 @@
-from django.urls import path
+from django.urls import include, path
 
-from .views import AllEventsView, register_candidacy, unregister_candidacy, RegisterBulkCandidacies
+from .views import (
+    AllEventsView, EventSearchView, register_candidacy, unregister_candidacy, RegisterBulkCandidacies, export_roster, event_lineup,
+    user_calendar,
+)
 
 app_name = 'events'
 
 urlpatterns = [
     path('', AllEventsView.as_view(), name='all-events'),
+    path('search/', EventSearchView.as_view(), name='search-events'),
+    path('calendar/<uuid:calendar_token>.ics', user_calendar, name='user-calendar'),
+    path('api/', include('events.api.urls')),
     path('<str:event_uuid>/candidacies/bulk/', RegisterBulkCandidacies.as_view(), name='register-bulk-candidacies'),
     path('<str:event_uuid>/candidacies/', register_candidacy, name='register-member'),
     path('<str:event_uuid>/candidacies/<str:candidacy_uuid>/cancel', unregister_candidacy, name='unregister-candidacy'),
+    path('<uuid:event_uuid>/roster.csv', export_roster, name='export-roster'),
+    path('<str:event_uuid>/lineup/', event_lineup, name='event-lineup'),
 ]
@@ -1,46 +1,113 @@
-from django.shortcuts import redirect
+from uuid import UUID
+
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_safe
 from django.views.generic import ListView, FormView
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 
-from .models import Event, Candidacy
-from .app import remove_candidacy, register_new_candidacy
-from .core import CandidateCandidacyRequest
-from .forms import MainCandidacyForm, GroupCandidacyFormSet
+from common.conditional import ConditionalGetMixin, Freshness, probe_freshness
+from common.models import User
+from common.pagination import KeysetPaginationMixin
+from common.views import FullTextSearchView
+
+from .models import Event, Candidacy, CandidacyCandidate
+from .app import build_user_candidacy_index, find_registered_candidates, remove_candidacy, register_new_candidacy
+from .cache import get_candidate_names_version, get_event_versions
+from .calendar import get_user_calendar
+from .core import CandidateAlreadyRegistered, CandidateCandidacyRequest, EventIsFull
+from .forms import MainCandidacyForm, GroupCandidacyFormSet, LineupTargetsForm
+from .lineup import build_event_lineup
+from .roster import open_roster_csv
+from .search import EVENT_SEARCH_INDEX
 
 
-class AllEventsView(LoginRequiredMixin, ListView):
+class AllEventsView(LoginRequiredMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
     model = Event
     ordering = ['date_and_time']
+    keyset = ('date_and_time', 'uuid')
     template_name = 'events/events.html'
     context_object_name = 'events'
 
+    def get_keyset_start(self):
+        return start_of_today()
+
+    def get_freshness(self) -> Freshness:
+        return get_events_freshness(self.request)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["individual_candidacy_form"] = MainCandidacyForm()
+        context.update(get_events_page_context(self.request, context['events']))
         return context
 
 
-@login_required
-def register_candidacy(request, event_uuid: str):
-    if request.method != 'POST':
-        raise ValueError('Only POST requests are allowed')
+class EventSearchView(LoginRequiredMixin, FullTextSearchView):
+    search_index = EVENT_SEARCH_INDEX
+    template_name = 'events/search.html'
+    context_object_name = 'events'
+
 
+def start_of_today():
+    # Upcoming events first, today's events included; past events are reachable through the previous pages.
+    return timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def get_events_freshness(request) -> Freshness:
+    # The first page starts at today's events: it changes at midnight too.
+    extra_key = f'{start_of_today().isoformat()}:{get_candidate_names_version()}'
+    return probe_freshness(request, (Event, Candidacy, CandidacyCandidate), extra_key=extra_key)
+
+
+def get_events_page_context(request, events: list[Event]) -> dict:
+    return {
+        "individual_candidacy_form": MainCandidacyForm(),
+        "event_fragment_versions": get_event_versions(event.pk for event in events),
+        # Only read by the fragments missing from the cache: a page served from the cache skips its query.
+        "user_candidacy_index": SimpleLazyObject(
+            lambda: build_user_candidacy_index(request.user, [event.pk for event in events]),
+        ),
+    }
+
+
+def candidate_candidacy_request_from_form(candidate, form) -> CandidateCandidacyRequest:
+    return CandidateCandidacyRequest(
+        candidate=candidate,
+        as_player=form.cleaned_data["player"],
+        as_arbiter=form.cleaned_data["arbiter"],
+        as_disk_jockey=form.cleaned_data["disk_jockey"],
+        as_speaker=form.cleaned_data["speaker"],
+    )
+
+
+def register_member_candidacy(request, event_uuid: str) -> None:
+    """
+    Register the individual candidacy posted by `request.user`, shared by the sync and async views.
+    """
     form = MainCandidacyForm(request.POST)
     if form.is_valid():
         event = Event.objects.get(pk=event_uuid)
-        candidate_candidacy_requests = [
-            CandidateCandidacyRequest(
-                candidate=request.user,
-                as_player=form.cleaned_data["player"],
-                as_arbiter=form.cleaned_data["arbiter"],
-                as_disk_jockey=form.cleaned_data["disk_jockey"],
-                as_speaker=form.cleaned_data["speaker"],
-            )
-        ]
-        register_new_candidacy(event, candidate_candidacy_requests)
+        candidate_candidacy_requests = [candidate_candidacy_request_from_form(request.user, form)]
+        try:
+            register_new_candidacy(event, candidate_candidacy_requests, waitlist_when_full=True)
+        except EventIsFull:
+            messages.error(request, "Il n'y a plus assez de places sur cet évènement")
+        except CandidateAlreadyRegistered:
+            messages.error(request, 'Vous êtes déjà candidat à cet évènement')
+
 
+@login_required
+def register_candidacy(request, event_uuid: str):
+    if request.method != 'POST':
+        raise ValueError('Only POST requests are allowed')
+
+    register_member_candidacy(request, event_uuid)
     return redirect('events:all-events')
 
 
@@ -55,49 +122,85 @@ class RegisterBulkCandidacies(LoginRequiredMixin, FormView):
         context["event_uuid"] = self.kwargs['event_uuid']
         return context
 
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'main_candidate': self.request.user}
+
     def form_valid(self, formset):
         main_form = MainCandidacyForm(self.request.POST)
         if not main_form.is_valid():
             return super().form_invalid(formset)
 
         event = Event.objects.get(pk=self.kwargs['event_uuid'])
-        candidate_candidacy_requests = [
-            CandidateCandidacyRequest(
-                candidate=self.request.user,
-                as_player=main_form.cleaned_data["player"],
-                as_arbiter=main_form.cleaned_data["arbiter"],
-                as_disk_jockey=main_form.cleaned_data["disk_jockey"],
-                as_speaker=main_form.cleaned_data["speaker"],
-            )
-        ]
-        candidates = set()
-        for form in formset.forms:
-            if form.cleaned_data and form.is_valid():
-
-                if form.cleaned_data['candidate'] in candidates:
-                    return super().form_invalid(formset)
-                else:
-                    candidates.add(form.cleaned_data['candidate'])
-
-                candidate_candidacy_requests.append(
-                    CandidateCandidacyRequest(
-                        candidate=form.cleaned_data["candidate"],
-                        as_player=form.cleaned_data["player"],
-                        as_arbiter=form.cleaned_data["arbiter"],
-                        as_disk_jockey=form.cleaned_data["disk_jockey"],
-                        as_speaker=form.cleaned_data["speaker"],
-                    )
-                )
-
-        register_new_candidacy(event, candidate_candidacy_requests)
+        candidate_candidacy_requests = [candidate_candidacy_request_from_form(self.request.user, main_form)]
+        candidate_forms = [form for form in formset.forms if form.cleaned_data and form.is_valid()]
+        candidate_candidacy_requests.extend(
+            candidate_candidacy_request_from_form(form.cleaned_data["candidate"], form) for form in candidate_forms
+        )
+
+        try:
+            register_new_candidacy(event, candidate_candidacy_requests, waitlist_when_full=True)
+        except EventIsFull:
+            # Even the waitlist refuses a group larger than the event.
+            formset.non_form_errors().append("Le groupe compte plus de candidats que l'évènement n'a de places")
+            return super().form_invalid(formset)
+        except CandidateAlreadyRegistered:
+            self.add_already_registered_errors(event, formset, candidate_forms)
+            return super().form_invalid(formset)
         return super().form_valid(formset)
 
+    def add_already_registered_errors(self, event: Event, formset, candidate_forms) -> None:
+        # Only read on the failure path: the unique constraints did the check on the way in.
+        registered_candidates = find_registered_candidates(
+            event, [self.request.user, *(form.cleaned_data['candidate'] for form in candidate_forms)],
+        )
+        if self.request.user.pk in registered_candidates:
+            formset.non_form_errors().append('Vous êtes déjà candidat à cet évènement')
+        for form in candidate_forms:
+            if form.cleaned_data['candidate'].pk in registered_candidates:
+                form.add_error('candidate', 'Déjà candidat à cet évènement')
+
+
+def get_member_candidacy(request, event_uuid: str, candidacy_uuid: str) -> Candidacy:
+    # Only its candidates may cancel a candidacy: anyone else gets a 404, as if it did not exist.
+    return get_object_or_404(Candidacy, pk=candidacy_uuid, event=event_uuid, candidates=request.user)
+
 
 @login_required
 def unregister_candidacy(request, event_uuid: str, candidacy_uuid: str):
     if request.method != 'POST':
         raise ValueError('Only POST requests are allowed')
 
-    candidacy = Candidacy.objects.get(pk=candidacy_uuid)
+    candidacy = get_member_candidacy(request, event_uuid, candidacy_uuid)
     remove_candidacy(candidacy)
     return redirect('events:all-events')
+
+
+@staff_member_required
+def export_roster(request, event_uuid: UUID):
+    lines = open_roster_csv(event_uuid)
+    if lines is None:
+        raise Http404('No event matches the given query.')
+    response = StreamingHttpResponse(lines, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="roster-{event_uuid}.csv"'
+    return response
+
+
+@staff_member_required
+def event_lineup(request, event_uuid: str):
+    event = get_object_or_404(Event, pk=event_uuid)
+    form = LineupTargetsForm(request.GET or None)
+    lineup = build_event_lineup(event, form.targets()) if form.is_valid() else None
+    return render(request, 'events/lineup.html', {'event': event, 'form': form, 'lineup': lineup})
+
+
+@require_safe
+def user_calendar(request, calendar_token):
+    # Calendar apps poll without logging in, the token in the URL identifies the user.
+    user = get_object_or_404(User, calendar_token=calendar_token, is_active=True)
+    feed = get_user_calendar(user)
+
+    response = get_conditional_response(request, etag=feed.etag)
+    if response is None:
+        response = HttpResponse(feed.body, content_type='text/calendar; charset=utf-8')
+    response['ETag'] = feed.etag
+    return response
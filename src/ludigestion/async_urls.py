@@ -0,0 +1,13 @@
+"""ludigestion URL Configuration serving the async-native events views, for ASGI deployments.
+
+Selected with LUDIGESTION_ASYNC_VIEWS=True.
+"""
+from django.urls import path, include
+
+from .urls import urlpatterns as sync_urlpatterns
+
+# The sync events include is replaced rather than shadowed, so that its namespaces are only registered once.
+urlpatterns = [
+    path('events/', include('events.async_urls')) if str(pattern.pattern) == 'events/' else pattern
+    for pattern in sync_urlpatterns
+]
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'common.middleware.performance_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,7 +59,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'ludigestion.urls'
+# The async URLconf serves async-native events views, only worth it when running under ASGI.
+ASYNC_VIEWS = env.bool("LUDIGESTION_ASYNC_VIEWS", default=False)
+ROOT_URLCONF = 'ludigestion.async_urls' if ASYNC_VIEWS else 'ludigestion.urls'
 
 TEMPLATES = [
     {
@@ -84,11 +87,53 @@ WSGI_APPLICATION = 'ludigestion.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # django.db.backends.sqlite3, with the transaction mode below.
+        'ENGINE': 'common.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+
+# Production profile applied on every new SQLite connection (see common.db):
+# WAL lets readers work while a writer commits, and the busy timeout makes writers wait for the lock
+# instead of failing with "database is locked".
+SQLITE_PRODUCTION_PROFILE = env.bool("LUDIGESTION_SQLITE_PRODUCTION_PROFILE", default=True)
+SQLITE_PRAGMAS = {
+    'busy_timeout': env.int("LUDIGESTION_SQLITE_BUSY_TIMEOUT_MS", default=5000),
+    'journal_mode': env.str("LUDIGESTION_SQLITE_JOURNAL_MODE", default='WAL'),
+    'synchronous': env.str("LUDIGESTION_SQLITE_SYNCHRONOUS", default='NORMAL'),
+    'mmap_size': env.int("LUDIGESTION_SQLITE_MMAP_SIZE", default=128 * 1024 * 1024),
+    # Negative values are in KiB
+    'cache_size': env.int("LUDIGESTION_SQLITE_CACHE_SIZE", default=-32 * 1024),
+    'temp_store': env.str("LUDIGESTION_SQLITE_TEMP_STORE", default='MEMORY'),
+}
+# Transactions take the write lock when they start (see common.sqlite), so that the busy timeout applies to them too.
+SQLITE_TRANSACTION_MODE = env.str(
+    "LUDIGESTION_SQLITE_TRANSACTION_MODE",
+    default='IMMEDIATE',
+    validate=lambda mode: mode in ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE'),
+)
 AUTH_USER_MODEL = 'common.User'
+# Same as ModelBackend, the users of the sessions are read from the cache (see common.auth).
+AUTHENTICATION_BACKENDS = ['common.auth.CachedModelBackend']
+
+# Cache tier of the fragments, calendar feeds, sessions and session users.
+# locmem is private to each process: with several worker processes, use the file cache that they share.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+CACHE_BACKEND = env.str("LUDIGESTION_CACHE_BACKEND", default='locmem', validate=lambda backend: backend in CACHE_BACKENDS)
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': env.str("LUDIGESTION_CACHE_LOCATION", default=str(BASE_DIR / 'cache') if CACHE_BACKEND == 'file' else 'ludigestion'),
+        'OPTIONS': {
+            'MAX_ENTRIES': env.int("LUDIGESTION_CACHE_MAX_ENTRIES", default=10000),
+        },
+    },
+}
+# Sessions are read from the cache, and written through to the database so that they survive a cache clear.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -128,6 +173,33 @@ LOGOUT_REDIRECT_URL = "home"
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = BASE_DIR / "sent_emails"
 
+# Requests exceeding one of these thresholds are logged by common.middleware.performance_middleware
+PERFORMANCE_SLOW_REQUEST_MS = env.int("LUDIGESTION_PERFORMANCE_SLOW_REQUEST_MS", default=500)
+PERFORMANCE_MAX_QUERIES = env.int("LUDIGESTION_PERFORMANCE_MAX_QUERIES", default=30)
+PERFORMANCE_MAX_DUPLICATED_QUERIES = env.int("LUDIGESTION_PERFORMANCE_MAX_DUPLICATED_QUERIES", default=5)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'ludigestion.performance': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'ludigestion.jobs': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
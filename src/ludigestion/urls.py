@@ -23,6 +23,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('events/', include('events.urls')),
     path('tasks/', include('tasks.urls')),
+    path('users/', include('common.urls')),
     path('accounts/', include('django.contrib.auth.urls')),
     path('register/', CreateView.as_view(
             template_name='register.html',
@@ -0,0 +1,36 @@
+// Suggest users while typing in the autocomplete inputs, and submit the uuid of the picked one.
+const SEARCH_DELAY_MS = 200;
+
+function renderSuggestions(suggestions, users) {
+  suggestions.replaceChildren(...users.map((user) => {
+    const option = document.createElement('option');
+    option.value = user.username;
+    option.label = `${user.first_name} ${user.last_name}`.trim() || user.username;
+    option.dataset.uuid = user.uuid;
+    return option;
+  }));
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+  document.querySelectorAll('[data-user-autocomplete]').forEach((searchInput) => {
+    const valueInput = document.getElementById(searchInput.dataset.userAutocomplete);
+    const suggestions = document.getElementById(searchInput.getAttribute('list'));
+    let pendingSearch = null;
+
+    searchInput.addEventListener('input', () => {
+      const picked = [...suggestions.options].find((option) => option.value === searchInput.value);
+      valueInput.value = picked ? picked.dataset.uuid : '';
+      clearTimeout(pendingSearch);
+      if (picked || !searchInput.value) {
+        return;
+      }
+      pendingSearch = setTimeout(async () => {
+        const url = `${searchInput.dataset.searchUrl}?q=${encodeURIComponent(searchInput.value)}`;
+        const response = await fetch(url, { credentials: 'same-origin' });
+        if (response.ok) {
+          renderSuggestions(suggestions, (await response.json()).results);
+        }
+      }, SEARCH_DELAY_MS);
+    });
+  });
+});
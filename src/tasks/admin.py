@@ -1,5 +1,19 @@
 from django.contrib import admin
+from django.db.models import Count
 
 from .models import Task
 
-admin.site.register(Task)
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'created_at', 'nb_contributers')
+    search_fields = ('name',)
+    ordering = ('-created_at',)
+    autocomplete_fields = ('contributers',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(nb_contributers=Count('contributers'))
+
+    @admin.display(description='contributers', ordering='nb_contributers')
+    def nb_contributers(self, task: Task) -> int:
+        return task.nb_contributers
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.10 on 2026-10-18 16:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_contributers'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_at', 'uuid'], name='task_created_at_uuid_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_keyset_pagination_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [
+                "CREATE VIRTUAL TABLE task_search USING fts5("
+                "uuid, name, description, tokenize = 'unicode61 remove_diacritics 2')",
+                'CREATE TRIGGER task_search_insert AFTER INSERT ON task BEGIN '
+                'INSERT INTO task_search (uuid, name, description) VALUES (new.uuid, new.name, new.description); END',
+                'CREATE TRIGGER task_search_update AFTER UPDATE OF uuid, name, description ON task BEGIN '
+                """DELETE FROM task_search WHERE uuid MATCH '"' || old.uuid || '"'; """
+                'INSERT INTO task_search (uuid, name, description) VALUES (new.uuid, new.name, new.description); END',
+                'CREATE TRIGGER task_search_delete AFTER DELETE ON task BEGIN '
+                """DELETE FROM task_search WHERE uuid MATCH '"' || old.uuid || '"'; END""",
+                'INSERT INTO task_search (uuid, name, description) SELECT uuid, name, description FROM task',
+            ],
+            reverse_sql=[
+                'DROP TRIGGER task_search_delete',
+                'DROP TRIGGER task_search_update',
+                'DROP TRIGGER task_search_insert',
+                'DROP TABLE task_search',
+            ],
+        ),
+    ]
@@ -13,6 +13,9 @@ class Task(BaseModel):
 
     class Meta:
         db_table = 'task'
+        indexes = [
+            models.Index(fields=['created_at', 'uuid'], name='task_created_at_uuid_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -0,0 +1,10 @@
+from common.search import FullTextIndex
+
+from .models import Task
+
+TASK_SEARCH_INDEX = FullTextIndex(
+    table='task_search',
+    model=Task,
+    fields=('name', 'description'),
+    weights=(10.0, 1.0),
+)
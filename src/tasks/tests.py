@@ -1,5 +1,6 @@
 from django.test import TestCase
 from .models import Task
+from .search import TASK_SEARCH_INDEX
 from common.models import BaseModel, User
 
 
@@ -41,6 +42,40 @@ class TestTasksDisplay(TestCase):
         self.assertContains(response, 'Test task 2')
 
 
+class TestTasksConditionalGet(TestCase):
+    def test_answers_not_modified_until_the_tasks_change(self):
+        task = Task.objects.create(name='Test task')
+        etag = self.client.get("/tasks/")['ETag']
+
+        self.assertEqual(self.client.get("/tasks/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        task.delete()
+        response = self.client.get("/tasks/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Test task')
+
+
+class TestTasksPagination(TestCase):
+    def test_tasks_are_paginated_newest_first(self):
+        Task.objects.bulk_create(Task(name=f'Test task {index}') for index in range(25))
+        tasks = list(Task.objects.order_by('-created_at', '-uuid'))
+
+        response = self.client.get("/tasks/")
+
+        self.assertEqual(response.context['tasks'], tasks[:20])
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+        response = self.client.get("/tasks/", {'after': response.context['page_obj'].next_cursor})
+
+        self.assertEqual(response.context['tasks'], tasks[20:])
+        self.assertFalse(response.context['page_obj'].has_next())
+
+        response = self.client.get("/tasks/", {'before': response.context['page_obj'].previous_cursor})
+
+        self.assertEqual(response.context['tasks'], tasks[:20])
+
+
 class TestTaskCanBeClaimedByUser(TestCase):
     def setUp(self):
         self.task = Task(name='Test task')
@@ -57,3 +92,24 @@ class TestTaskCanBeClaimedByUser(TestCase):
         self.task.contributers.add(self.user)
         self.assertEqual(self.task.contributers.count(), 1)
         self.assertEqual(self.task.contributers.first(), self.user)
+
+
+class TestTaskSearch(TestCase):
+    def setUp(self):
+        self.posters = Task.objects.create(name='Coller les affiches', description='Dans le quartier Saint-Cyprien')
+        self.bar = Task.objects.create(name='Tenir la buvette', description='Prévoir des affiches pour les prix')
+
+    def test_ranks_name_matches_first(self):
+        self.assertEqual(TASK_SEARCH_INDEX.search('affiche'), [self.posters, self.bar])
+
+    def test_view_lists_the_ranked_tasks(self):
+        response = self.client.get('/tasks/search/', {'q': 'buvette'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['tasks'], [self.bar])
+
+    def test_view_without_search_text_lists_nothing(self):
+        response = self.client.get('/tasks/search/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['tasks'], [])
@@ -1,9 +1,10 @@
 from django.urls import path
 
-from .views import TaskListView
+from .views import TaskListView, TaskSearchView
 
 app_name = 'tasks'
 
 urlpatterns = [
     path('', TaskListView.as_view(), name='all-tasks'),
+    path('search/', TaskSearchView.as_view(), name='search-tasks'),
 ]
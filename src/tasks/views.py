@@ -1,9 +1,21 @@
 from django.views.generic import ListView
 
+from common.conditional import ConditionalGetMixin
+from common.pagination import KeysetPaginationMixin
+from common.views import FullTextSearchView
 from .models import Task
+from .search import TASK_SEARCH_INDEX
 
 
-class TaskListView(ListView):
+class TaskListView(ConditionalGetMixin, KeysetPaginationMixin, ListView):
     model = Task
+    freshness_models = (Task,)
+    keyset = ('-created_at', '-uuid')
     template_name: str = 'tasks/tasks.html'
     context_object_name = 'tasks'
+
+
+class TaskSearchView(FullTextSearchView):
+    search_index = TASK_SEARCH_INDEX
+    template_name = 'tasks/search.html'
+    context_object_name = 'tasks'